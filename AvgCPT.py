@@ -9,11 +9,17 @@ import sys
 import os
 import pyperclip
 import pandas as pd
-import pyodbc
-import statistics
 import numpy as np
 import configparser
 import openpyxl
+from common.gintdata import depth_key
+from common.datasource import FILE_FILTER
+from common.project import load_project, prepare_cpt, load_columns, rolling_table, cpt_index
+from common.loader import Loader
+from common.prefetch import SoundingCache, neighbours, prefetch_cpt
+from common.edits import PointEdits
+from common.averaging import WINDOWS, window_extent, robust_names, segment_rows
+from common.tablecache import TableCache
 from openpyxl.styles import Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 import warnings
@@ -32,8 +38,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.config = configparser.ConfigParser()
         self.config.read('assets/settings.ini')
         self.dark_mode_button.setChecked(bool(self.config.get('Theme','dark')))
+        self.table_cache = TableCache(self.config.get('Cache','dir',fallback='') or None, self.config.getint('Cache','max_size_mb',fallback=2048) * 1024 * 1024)
 
         self.cpt_value = ""
+        self.gint_request = 0
+        self.cpt_request = 0
+        self.cpt_loader = None
+        self.column_request = 0
+        self.prefetch_request = 0
+        self.prefetch_loader = None
+        self.prefetch_count = self.config.getint('Prefetch','neighbours',fallback=2)
+        self.sounding_cache = SoundingCache(self.config.getint('Prefetch','cache_size',fallback=16))
 
         self.button_copy_actual.setIcon(QtGui.QIcon('assets/images/copy.png'))
         self.button_copy_avg.setIcon(QtGui.QIcon('assets/images/copy.png'))
@@ -46,9 +61,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.dark_mode_button.clicked.connect(self.dark_toggle)
         self.full_bh.clicked.connect(self.plot_full_bh)
         self.file_open.triggered.connect(self.get_file_location)
+        self.file_refresh = QAction('Refresh gINT (ignore cache)', self)
+        self.menuFile.insertAction(self.actionExport_Averages_for_All, self.file_refresh)
+        self.file_refresh.triggered.connect(self.refresh_gint)
+        self.file_rolling = QAction('Export Rolling Average...', self)
+        self.menuFile.insertAction(self.actionExport_Averages_for_All, self.file_rolling)
+        self.file_rolling.triggered.connect(self.export_rolling_average)
         self.unit_selector.valueChanged.connect(self.change_unit)
         self.button_gint.clicked.connect(self.get_file_location)
         self.button_depth.clicked.connect(self.get_cpt_depths)
+        self.point_table.currentItemChanged.connect(self.bh_selected)
+        self.cpt_table.currentTextChanged.connect(self.column_selected)
         self.button_cpt_val.clicked.connect(self.get_avg_val)
         self.button_copy_actual.clicked.connect(self.copy_actual_value)
         self.button_copy_avg.clicked.connect(self.copy_average_value)
@@ -58,9 +81,39 @@ class MainWindow(QtWidgets.QMainWindow):
         self.re_plot.clicked.connect(self.recalc_avg)
         self.increment.clicked.connect(self.strain_num_incr)
         self.decrement.clicked.connect(self.strain_num_decr)
+        self.undo_shortcut = QShortcut(QKeySequence("Ctrl+Z"), self)
+        self.undo_shortcut.activated.connect(self.undo_edit)
+        self.redo_shortcut = QShortcut(QKeySequence("Ctrl+Y"), self)
+        self.redo_shortcut.activated.connect(self.redo_edit)
+        self.points_curve = None
         self.full_export.clicked.connect(self.export_full_averages)
         self.actionExport_Averages_for_All.triggered.connect(self.export_full_averages)
         
+        #averaging window - a preset or any distance above/below the depth, the pile diameter scales the D presets
+        self.window_box = QComboBox(self)
+        self.window_box.addItems(list(WINDOWS) + ['Custom'])
+        self.window_up = QDoubleSpinBox(self)
+        self.window_down = QDoubleSpinBox(self)
+        self.pile_diameter = QDoubleSpinBox(self)
+        for (spin, prefix) in [(self.window_up, 'Above '), (self.window_down, 'Below '), (self.pile_diameter, 'D ')]:
+            spin.setPrefix(prefix)
+            spin.setSuffix(' m')
+            spin.setDecimals(2)
+            spin.setRange(0.01, 50.0)
+            spin.setSingleStep(0.05)
+            spin.setMaximumWidth(125)
+        self.window_box.setMaximumWidth(125)
+        for widget in [self.window_box, self.window_up, self.window_down, self.pile_diameter]:
+            self.verticalLayout_12.insertWidget(self.verticalLayout_12.count() - 1, widget)
+        self.pile_diameter.setValue(self.config.getfloat('Averaging','pile_diameter',fallback=1.0))
+        self.window_up.setValue(self.config.getfloat('Averaging','up',fallback=0.5))
+        self.window_down.setValue(self.config.getfloat('Averaging','down',fallback=0.5))
+        self.window_box.setCurrentText(self.config.get('Averaging','window',fallback='+/- 0.5m'))
+        self.window_box.currentTextChanged.connect(self.set_window)
+        self.pile_diameter.valueChanged.connect(self.set_window)
+        self.window_up.valueChanged.connect(self.window_edited)
+        self.window_down.valueChanged.connect(self.window_edited)
+
         #set window size and graph
         self.installEventFilter(self)
         self.set_size()
@@ -86,13 +139,12 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def get_file_location(self):
         #get gint location
-        self.gint = ""
-        self.cpt_data = ""
+        self.sounding = None
         self.reset_graph()
         if not self.config.get('LastFolder','dir') == "":
-            self.file_location = QtWidgets.QFileDialog.getOpenFileNames(self,'Open gINT Project', self.config.get('LastFolder','dir'), '*.gpj')
+            self.file_location = QtWidgets.QFileDialog.getOpenFileNames(self,'Open gINT Project', self.config.get('LastFolder','dir'), FILE_FILTER)
         else:
-            self.file_location = QtWidgets.QFileDialog.getOpenFileNames(self,'Open gINT Project', os.getcwd(), '*.gpj')
+            self.file_location = QtWidgets.QFileDialog.getOpenFileNames(self,'Open gINT Project', os.getcwd(), FILE_FILTER)
         try:
             self.file_location = self.file_location[0][0]
             self.point_table.setEnabled(True)
@@ -123,30 +175,71 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             raise ValueError("Please check the directory is correct.")
 
-        #establish connection to sql database (gint)
-        try:
-            self.gint = pyodbc.connect(r'Driver={Microsoft Access Driver (*.mdb, *.accdb)};DBQ='+self.file_location+';')
-        except Exception as e:
-            print(f"Couldn't establish connection with gINT. Please ensure you have Access Driver 64-bit installed. {e}")
-            self.disable_buttons()
+        self.load_gint(refresh=False)
+
+    def refresh_gint(self):
+        #throw away the cached tables for the open gINT and read them again
+        if not isinstance(getattr(self, 'file_location', None), str) or not os.path.exists(self.file_location):
+            print("No gINT open to refresh.")
             return
-        
-        print(f"Loaded gINT.")
+        print(f"Refreshing {self.file_location}...")
+        self.load_gint(refresh=True)
+
+    def load_gint(self, refresh):
+        #read the project on a background thread so the window stays responsive, project_loaded fills in the boreholes
+        self.point_table.setEnabled(False)
+        self.full_export.setEnabled(False)
+        self.button_depth.setEnabled(False)
+        self.gint_request += 1
+        self.start_loader(self.gint_request, self.project_loaded, self.project_failed, load_project, self.file_location, self.table_cache, refresh)
 
-        bh_query = "SELECT PointID FROM POINT"
-        point_list = pd.read_sql(bh_query, self.gint)
-        point_id = point_list['PointID'].tolist()
-        point_id = sorted(point_id)
+    def project_loaded(self, request, project):
+        if not request == self.gint_request or project is None:
+            return
+
+        self.cpt_by_bh = project['cpt_by_bh']
+        self.geol_by_bh = project['geol_by_bh']
+        self.geol_index = project['geol_index']
+        self.cpt_params = project['params']
+        self.cancel_prefetch()
+        self.sounding_cache.clear()
 
         self.point_table.clear()
         self.depth_table.clear()
-        for x in point_id:
+        for x in project['point_id']:
             item = QListWidgetItem(x)
             item.setTextAlignment(Qt.AlignHCenter)
             self.point_table.addItem(item) 
+        self.point_table.setEnabled(True)
+        self.full_export.setEnabled(True)
         self.button_depth.setEnabled(True)
         self.dark_mode()
 
+    def project_failed(self, request, message):
+        if not request == self.gint_request:
+            return
+        self.load_progress(request, message)
+        self.disable_buttons()
+
+    def start_loader(self, request, loaded, failed, func, *args):
+        loader = Loader(request, func, *args, parent=self)
+        loader.loaded.connect(loaded)
+        loader.failed.connect(failed)
+        loader.progress.connect(self.load_progress)
+        loader.finished.connect(loader.deleteLater)
+        loader.start()
+        return loader
+
+    def load_progress(self, request, message):
+        print(message)
+        self.statusBar().showMessage(message, 5000)
+
+    def bh_selected(self, current, previous):
+        #selecting another borehole starts loading it straight away and drops any borehole still loading
+        if current is None:
+            return
+        self.get_cpt_depths()
+
     def get_cpt_depths(self):
         self.reset_graph()
         self.bh_select = ""
@@ -157,6 +250,15 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actual_val.clear()
         self.cpt_table.clear()
         self.depth_table.clear()
+        self.cpt_table.setEnabled(False)
+        self.button_cpt_val.setEnabled(False)
+
+        #stop the borehole that's still loading, whatever it returns is ignored
+        self.cpt_request += 1
+        self.column_request += 1
+        if self.cpt_loader is not None:
+            self.cpt_loader.cancel()
+            self.cpt_loader = None
 
         try:
             self.bh_select = self.point_table.currentItem().text()
@@ -164,47 +266,46 @@ class MainWindow(QtWidgets.QMainWindow):
             print("No borehole selected.")
             return
 
-        query = f"SELECT * FROM STCN_DATA WHERE PointID ='{str(self.bh_select)}'"
-        self.cpt_data = pd.read_sql(query, self.gint)
-
-        if self.cpt_data.empty:
+        if self.cpt_by_bh[self.bh_select].empty:
             print(f'no cpt data for this bh: {self.bh_select}')
             return
-        
-        self.cpt_data.drop(['GintRecID'], axis=1, inplace=True)
-        self.cpt_data.reset_index(inplace=True)
-        self.cpt_data.drop(columns=['index'], inplace=True)
-
-        if 'true_depth' not in self.cpt_data:
-            self.cpt_data.insert(len(list(self.cpt_data.columns)),'true_depth','')
-
-        self.cpt_data['true_depth'] = self.cpt_data['Depth'] + self.cpt_data['STCN_Depth']
-        self.cpt_data['true_depth'] = self.cpt_data['true_depth'].round(2)
-        self.cpt_data.sort_values(by=['true_depth'], inplace=True)
-        self.cpt_data['true_depth'] = self.cpt_data['true_depth'].map('{:,.2f}'.format)
-
-        depth_float = pd.to_numeric(self.cpt_data['true_depth'])
-        self.cpt_data['true_depth'] = depth_float
- 
-        depth_list = list(self.cpt_data['true_depth'])
-        
-        self.full_depth = []
-        for x in range(0,len(depth_list)):
-            self.full_depth.append(round(float(depth_list[x]),2))
 
-        for x in range(0, len(depth_list)):
-            depth_list[x] = str(depth_list[x])
-            item = QListWidgetItem(depth_list[x])
+        #already prepared in the background, no need to wait for a loader
+        cpt = self.sounding_cache.get(self.bh_select)
+        if cpt is not None:
+            self.cpt_loaded(self.cpt_request, cpt)
+            return
+
+        self.statusBar().showMessage(f"Loading {self.bh_select}...")
+        self.cpt_loader = self.start_loader(self.cpt_request, self.cpt_loaded, self.cpt_failed, prepare_cpt, self.cpt_by_bh[self.bh_select], self.cpt_params)
+
+    def cpt_failed(self, request, message):
+        if not request == self.cpt_request:
+            return
+        self.cpt_loader = None
+        self.load_progress(request, f"Couldn't load {self.bh_select}. {message}")
+
+    def cpt_loaded(self, request, cpt):
+        if not request == self.cpt_request or cpt is None:
+            return
+        self.cpt_loader = None
+        self.sounding_cache.put(self.bh_select, cpt)
+
+        self.sounding = cpt['sounding']
+        self.full_depth = self.sounding.depth
+        self.cpt_index = cpt['index']
+
+        for x in cpt['depth_list']:
+            item = QListWidgetItem(x)
             item.setTextAlignment(Qt.AlignHCenter)
             self.depth_table.addItem(item) 
 
-        cpt_headers = list(self.cpt_data.columns)
-        del cpt_headers[-1], cpt_headers[0], cpt_headers[0], cpt_headers[0], cpt_headers[0],
-
-        self.cpt_table.addItems(cpt_headers)
+        self.cpt_table.addItems(cpt['headers'])
         self.cpt_table.setCurrentIndex(0)
         self.cpt_table.setEnabled(True)
-        self.button_cpt_val.setEnabled(True)
+        #stays disabled if the first parameter still has to be read (column_loaded enables it)
+        self.button_cpt_val.setEnabled(self.cpt_table.currentText() in self.sounding)
+        self.statusBar().showMessage(f"Loaded {self.bh_select}.", 5000)
         
         if self.unit_selector.value() == 0:
             self.geol_unit = "GEOL_GEOL"
@@ -217,6 +318,62 @@ class MainWindow(QtWidgets.QMainWindow):
             self.unit_textbox.setText(f'''<p align="center">Geol unit:
 {self.geol_unit}</p>''')
 
+        self.prefetch_neighbours()
+
+    def column_selected(self, column):
+        #only the averaged parameters are loaded with the project, any other column is read for this borehole when it's picked
+        if not column or self.sounding is None or column in self.sounding:
+            return
+        self.button_cpt_val.setEnabled(False)
+        self.column_request += 1
+        self.start_loader(self.column_request, self.column_loaded, self.column_failed, load_columns, self.file_location, self.bh_select, [column])
+
+    def column_loaded(self, request, extra):
+        if not request == self.column_request or extra is None:
+            return
+        #the sounding is shared with cpt_by_bh and the cache, so the column is kept for next time too
+        self.sounding.add_columns(extra)
+        for col in extra.columns:
+            if col in self.sounding:
+                self.cpt_index.add(col, self.sounding[col], self.sounding.blank.get(col))
+        self.button_cpt_val.setEnabled(True)
+
+    def column_failed(self, request, message):
+        if not request == self.column_request:
+            return
+        self.load_progress(request, f"Couldn't read {self.cpt_table.currentText()} for {self.bh_select}. {message}")
+
+    def prefetch_neighbours(self):
+        #prepare the next/previous boreholes in point_table while this one is being looked at, so stepping through the list doesn't wait
+        self.cancel_prefetch()
+        point_ids = [self.point_table.item(x).text() for x in range(self.point_table.count())]
+        todo = {bh: self.cpt_by_bh[bh] for bh in neighbours(point_ids, self.bh_select, self.prefetch_count)
+                if bh not in self.sounding_cache and not self.cpt_by_bh[bh].empty}
+        if not todo:
+            return
+        self.prefetch_request += 1
+        self.prefetch_loader = self.start_loader(self.prefetch_request, self.prefetched, self.prefetch_failed, prefetch_cpt, todo, self.cpt_params)
+
+    def cancel_prefetch(self):
+        if self.prefetch_loader is not None:
+            self.prefetch_loader.cancel()
+            self.prefetch_loader = None
+
+    def prefetched(self, request, prepared):
+        if not request == self.prefetch_request or prepared is None:
+            return
+        self.prefetch_loader = None
+        for (bh, cpt) in prepared.items():
+            if cpt is not None:
+                self.sounding_cache.put(bh, cpt)
+
+    def prefetch_failed(self, request, message):
+        #not fatal, the borehole is just loaded when it's selected
+        if not request == self.prefetch_request:
+            return
+        self.prefetch_loader = None
+        print(f"Couldn't prefetch boreholes. {message}")
+
     def change_unit(self):
         if self.unit_selector.value() == 0:
             self.geol_unit = "GEOL_GEOL"
@@ -229,74 +386,86 @@ class MainWindow(QtWidgets.QMainWindow):
             self.unit_textbox.setText(f'''<p align="center">Geol unit:
 {self.geol_unit}</p>''')
 
+    def set_window(self):
+        #preset picked (or pile diameter changed), fill in the distances above and below
+        if self.window_box.currentText() in WINDOWS:
+            up, down = window_extent(self.window_box.currentText(), self.pile_diameter.value())
+            for (spin, value) in [(self.window_up, up), (self.window_down, down)]:
+                spin.blockSignals(True)
+                spin.setValue(value)
+                spin.blockSignals(False)
+        self.save_window()
+
+    def window_edited(self):
+        #distances typed in that don't match the preset any more
+        name = self.window_box.currentText()
+        if name in WINDOWS and not window_extent(name, self.pile_diameter.value()) == self.averaging_window():
+            self.window_box.blockSignals(True)
+            self.window_box.setCurrentText('Custom')
+            self.window_box.blockSignals(False)
+        self.save_window()
+
+    def averaging_window(self) -> tuple:
+        return (round(self.window_up.value(), 10), round(self.window_down.value(), 10))
+
+    def robust_settings(self) -> tuple:
+        #percentiles and trimmed mean cut reported with the mean, from settings.ini
+        percentiles = [float(p) for p in self.config.get('Averaging','percentiles',fallback='10, 90').split(',') if p.strip()]
+        return (percentiles, self.config.getfloat('Averaging','trim',fallback=0.1))
+
+    def print_robust(self, summary, percentiles):
+        print(f"""Median: {summary['median']} | Trimmed mean: {summary['trimmed_mean']} | MAD: {summary['mad']} | """
+              + " | ".join(f"P{p:g}: {summary[f'p{p:g}']}" for p in percentiles))
+
+    def save_window(self):
+        if not self.config.has_section('Averaging'):
+            self.config.add_section('Averaging')
+        self.config.set('Averaging','window',self.window_box.currentText())
+        self.config.set('Averaging','up',str(self.window_up.value()))
+        self.config.set('Averaging','down',str(self.window_down.value()))
+        self.config.set('Averaging','pile_diameter',str(self.pile_diameter.value()))
+        with open('assets/settings.ini', 'w') as configfile: 
+            self.config.write(configfile)
+
     def get_geol_layers(self, bh, depth):
-        query = f"SELECT * FROM GEOL WHERE PointID ='{str(bh)}'"
-        self.geol = pd.read_sql(query, self.gint)
+        #layers are sorted and unitised once per project (GeolIndex), nothing is rebuilt per depth or unit change
+        layers = self.geol_index.get(bh)
 
-        if self.geol.empty:
+        if layers is None:
             print(f'no geol for this bh: {bh}')
             return
 
-        self.geol.sort_values(by=['Depth'], inplace=True)
-        self.geol.drop(['GintRecID'], axis=1, inplace=True)
-        self.geol.reset_index(inplace=True)
-        self.geol.drop(columns=['index'], inplace=True)
-
-        layer_top = list(self.geol['Depth'])
-        layer_base = list(self.geol['GEOL_BASE'])
-        layer_leg = list(self.geol['GEOL_LEG'])
-
-        for x in range(0, len(layer_leg)):
-            if not str(layer_leg[x]) == "":
-                layer_leg[x] = str(layer_leg[x]).split("-")[1]
-            else:
-                pass
-
-        layers = list(zip(layer_top, layer_base))
-        units = list(self.geol[self.geol_unit])
-
-        if not 'units' in locals():
-            units = list(self.geol[self.geol_unit])
-
-        soil_units = list(zip(units, layer_leg))
-            
-        if not all(v for v in units):
+        if not layers.unitised[self.geol_unit]:
             print("No unitisation - using Geology Legend")
-            self.unitised_layers = dict(zip(layers,soil_units))
-        else:
-            self.unitised_layers = dict(zip(layers,soil_units))
+        self.unitised_layers = layers.unitised_layers[self.geol_unit]
 
         self.geol_layers_list = []
 
         if depth == None:
-            for (layer, unit) in self.unitised_layers.items():
-                qc_list = None
-                fs_list = None
-                u2_list = None
-                qnet_list = None
-                fr_list = None
-                ic_list = None
-
+            #every layer's rows are found in one go and all six parameters reduced together from the prefix sums
+            #mean/std come from the prefix sums, the robust stats from one sorted table of the layers per parameter
+            layer_keys = list(self.unitised_layers)
+            percentiles, trim = self.robust_settings()
+            stats = self.cpt_index.layer_stats(['STCN_QC', 'STCN_FS', 'STCN_U', 'STCN_Qnet', 'STCN_FCRO', 'STCN_SBTi'],
+                                               [float(layer[0]) for layer in layer_keys], [float(layer[1]) for layer in layer_keys],
+                                               robust=True, percentiles=percentiles, trim=trim)
+            names = ['mean', 'std'] + robust_names(percentiles)
+
+            for (x, (layer, unit)) in enumerate(self.unitised_layers.items()):
                 depth = round((float(layer[0]) + float(layer[1])) / 2,2)
-                qc_list = self.cpt_data.loc[(self.cpt_data['true_depth'] >= float(layer[0])) & (self.cpt_data['true_depth'] <= float(layer[1])), 'STCN_QC']
-                fs_list = self.cpt_data.loc[(self.cpt_data['true_depth'] >= float(layer[0])) & (self.cpt_data['true_depth'] <= float(layer[1])), 'STCN_FS']
-                u2_list = self.cpt_data.loc[(self.cpt_data['true_depth'] >= float(layer[0])) & (self.cpt_data['true_depth'] <= float(layer[1])), 'STCN_U']
-                qnet_list = self.cpt_data.loc[(self.cpt_data['true_depth'] >= float(layer[0])) & (self.cpt_data['true_depth'] <= float(layer[1])), 'STCN_Qnet']
-                fr_list = self.cpt_data.loc[(self.cpt_data['true_depth'] >= float(layer[0])) & (self.cpt_data['true_depth'] <= float(layer[1])), 'STCN_FCRO']
-                ic_list = self.cpt_data.loc[(self.cpt_data['true_depth'] >= float(layer[0])) & (self.cpt_data['true_depth'] <= float(layer[1])), 'STCN_SBTi']
-
-                self.fs_dict[f'Layers'] = ['fs mean (MPa)','fs std (MPa)']
-                self.u2_dict[f'Layers'] = ['u mean (kPa)','u std (kPa)']
-                self.qnet_dict[f'Layers'] = ['qnet mean (MPa)','qnet std (MPa)']
-                self.fr_dict[f'Layers'] = ['fr mean (-)','fr std (-)']
-                self.ic_dict[f'Layers'] = ['ic mean (-)','ic std (-)']
-
-                self.qc_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [qc_list.mean(),qc_list.std()]
-                self.fs_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [fs_list.mean(),fs_list.std()]
-                self.u2_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [u2_list.mean(),u2_list.std()]
-                self.qnet_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [qnet_list.mean(),qnet_list.std()]
-                self.fr_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [fr_list.mean(),fr_list.std()]
-                self.ic_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [ic_list.mean(),ic_list.std()]
+
+                self.fs_dict[f'Layers'] = self.stat_columns('fs', '(MPa)', percentiles)
+                self.u2_dict[f'Layers'] = self.stat_columns('u', '(kPa)', percentiles)
+                self.qnet_dict[f'Layers'] = self.stat_columns('qnet', '(MPa)', percentiles)
+                self.fr_dict[f'Layers'] = self.stat_columns('fr', '(-)', percentiles)
+                self.ic_dict[f'Layers'] = self.stat_columns('ic', '(-)', percentiles)
+
+                self.qc_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [stats['STCN_QC'][name][x] for name in names]
+                self.fs_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [stats['STCN_FS'][name][x] for name in names]
+                self.u2_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [stats['STCN_U'][name][x] for name in names]
+                self.qnet_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [stats['STCN_Qnet'][name][x] for name in names]
+                self.fr_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [stats['STCN_FCRO'][name][x] for name in names]
+                self.ic_dict[f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}'] = [stats['STCN_SBTi'][name][x] for name in names]
 
                 if float(depth) >= float(layer[0]) and float(depth) <= float(layer[1]):
                     if unit[0] == "":
@@ -317,23 +486,19 @@ class MainWindow(QtWidgets.QMainWindow):
 LAYERS: {self.geol_layers_list}
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~""")
 
-        for (layer, unit) in self.unitised_layers.items():
-            if float(depth) >= float(layer[0]) and float(depth) <= float(layer[1]):
-                if unit[0] == "":
-                    print(f"The depth {depth}m is in a {unit[1]} layer {layer} and the unitisation has not been done...")
-                    self.layer = layer
-                    self.unit = "Un-unitised"
-                else:
-                    print(f"The depth {depth}m is in a {unit[1]} layer {layer} and the unit is {unit[0]}.")
-                    self.layer = layer
-                    self.unit = unit[0]
-            split_layer_top = str(layer).split(",")[0]
-            split_layer_bot = str(layer).split(",")[1]
-            split_layer_bot = split_layer_bot[:-1]
+        x = layers.find(depth)
+        if x is not None:
+            layer = layers.keys[x]
+            unit = self.unitised_layers[layer]
             if unit[0] == "":
-                self.geol_layers_list.append(str(f"{split_layer_top}m - {split_layer_bot}m) Soil Type: {unit[1]}"))
+                print(f"The depth {depth}m is in a {unit[1]} layer {layer} and the unitisation has not been done...")
+                self.layer = layer
+                self.unit = "Un-unitised"
             else:
-                self.geol_layers_list.append(str(f"{split_layer_top}m - {split_layer_bot}m) Unit: {unit[0]} | Soil Type: {unit[1]}"))
+                print(f"The depth {depth}m is in a {unit[1]} layer {layer} and the unit is {unit[0]}.")
+                self.layer = layer
+                self.unit = unit[0]
+        self.geol_layers_list = list(layers.descriptions[self.geol_unit])
 
         print(f"""~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 LAYERS: {self.geol_layers_list}
@@ -344,6 +509,13 @@ LAYERS: {self.geol_layers_list}
         self.geol_layers.setEnabled(True)
 
 
+    def stat_labels(self, percentiles) -> list:
+        #column label of each statistic in the layer export, same order as the layer_stats names
+        return ['mean', 'std', 'median', 'trimmed mean', 'MAD'] + [f'P{p:g}' for p in percentiles]
+
+    def stat_columns(self, param, unit, percentiles) -> list:
+        return [f'{param} {label} {unit}' for label in self.stat_labels(percentiles)]
+
     def export_full_averages(self):
         self.qc_dict = {}
         self.fs_dict = {}
@@ -355,32 +527,23 @@ LAYERS: {self.geol_layers_list}
     
         bhs_in_gint = [self.point_table.item(x).text() for x in range(self.point_table.count())]
 
+        #STCN_DATA and GEOL were bulk loaded for the whole project when the gINT was opened
         for x in range(0,len(bhs_in_gint)):
+            #already sorted by true depth when the project was loaded
+            self.sounding = self.cpt_by_bh[bhs_in_gint[x]]
 
-            query = f"SELECT * FROM STCN_DATA WHERE PointID ='{str(bhs_in_gint[x])}'"
-            self.cpt_data = pd.read_sql(query, self.gint)
-
-            if self.cpt_data.empty:
+            if self.sounding.empty:
                 print(f'no cpt data for this bh: {bhs_in_gint[x]}')
                 pass
-            
-            #add true depth
-            self.cpt_data.drop(['GintRecID'], axis=1, inplace=True)
-            self.cpt_data.reset_index(inplace=True)
-            self.cpt_data.drop(columns=['index'], inplace=True)
-            self.cpt_data.insert(len(list(self.cpt_data.columns)),'true_depth','')
-            self.cpt_data['true_depth'] = self.cpt_data['Depth'] + self.cpt_data['STCN_Depth']
-            self.cpt_data['true_depth'] = self.cpt_data['true_depth'].round(2)
-            self.cpt_data.sort_values(by=['true_depth'], inplace=True)
-            self.cpt_data['true_depth'] = self.cpt_data['true_depth'].map('{:,.2f}'.format)
-            depth_float = pd.to_numeric(self.cpt_data['true_depth'])
-            self.cpt_data['true_depth'] = depth_float
+
+            self.cpt_index = cpt_index(self.sounding)
 
             #loop through each bh and add vals to dict
             self.get_geol_layers(bh=bhs_in_gint[x], depth=None)
 
         #build dict with keys as index - needs to use these as index for 'scalar array' error
-        self.full_df = pd.DataFrame.from_dict(self.qc_dict, orient='index', columns=['qc mean (MPa)', 'qc std (MPa)'])
+        percentiles, trim = self.robust_settings()
+        self.full_df = pd.DataFrame.from_dict(self.qc_dict, orient='index', columns=self.stat_columns('qc', '(MPa)', percentiles))
         self.full_df['Borehole'] = self.full_df.index
         self.full_df[['Borehole','Geology Layers']] = self.full_df['Borehole'].str.split('|', expand=True)
         move_cols = ['Borehole','Geology Layers']
@@ -391,9 +554,8 @@ LAYERS: {self.geol_layers_list}
             _data = [v for k,v in y.items()]
             df = pd.DataFrame.from_dict(y, orient='index', columns=_data[0])   
             df = df.iloc[1:]         
-            col_list = [x for x in df.columns]
-            self.full_df[col_list[0]] = df[col_list[0]]
-            self.full_df[col_list[1]] = df[col_list[1]]
+            for col in df.columns:
+                self.full_df[col] = df[col]
 
         build_df_from_dict(self.fs_dict)
         build_df_from_dict(self.u2_dict)
@@ -401,12 +563,24 @@ LAYERS: {self.geol_layers_list}
         build_df_from_dict(self.fr_dict)
         build_df_from_dict(self.ic_dict)
 
-        keep_cols = [col for col in self.full_df.columns if 'std' not in col]
-        self.full_df = self.full_df[keep_cols + [col for col in self.full_df.columns if 'std' in col]]
+        #one block of columns per statistic - all the means, then all the stds...
+        labels = self.stat_labels(percentiles)
+        def stat_of(col):
+            return next((label for label in labels if col.split(" ", 1)[-1].startswith(f"{label} (")), None)
+        keep_cols = [col for col in self.full_df.columns if stat_of(col) is None]
+        self.full_df = self.full_df[keep_cols + [col for label in labels for col in self.full_df.columns if stat_of(col) == label]]
 
         self.full_df.replace(to_replace=0, value=np.nan, inplace=True)
         self.full_df.dropna(axis = 1, how="all", inplace= True)
 
+        titles = {'mean': 'Mean Values', 'std': 'Standard Deviation', 'median': 'Median', 'trimmed mean': f'Trimmed Mean ({trim:.0%} cut each end)',
+                  'MAD': 'Median Absolute Deviation'}
+        blocks = []
+        for label in labels:
+            width = len([col for col in self.full_df.columns if stat_of(col) == label])
+            if width:
+                blocks.append((titles.get(label, f'{label[1:]}th Percentile'), width))
+
         fname = QtWidgets.QFileDialog.getSaveFileName(self, "Save export of CPT averages...", os.getcwd(), "Excel file *.xlsx;; CSV *.csv")
         
         if fname[0] == '':
@@ -434,14 +608,17 @@ LAYERS: {self.geol_layers_list}
             ws['B1'] = 'Geology Layers'
             ws['B1'].font = Font(bold=True)
             ws['B1'].alignment = Alignment(horizontal='center')
-            ws.merge_cells('C1:H1')
-            ws['C1'] = 'Mean Values'
-            ws['C1'].font = Font(bold=True) 
-            ws['C1'].alignment = Alignment(horizontal='center')
-            ws.merge_cells('I1:N1')
-            ws['I1'] = 'Standard Deviation'
-            ws['I1'].font = Font(bold=True) 
-            ws['I1'].alignment = Alignment(horizontal='center')
+            #a merged title over each statistic's block of columns, the blocks start after Borehole and Geology Layers
+            block_starts = []
+            first = 3
+            for (title, width) in blocks:
+                start = get_column_letter(first)
+                block_starts.append(start)
+                ws.merge_cells(f'{start}1:{get_column_letter(first + width - 1)}1')
+                ws[f'{start}1'] = title
+                ws[f'{start}1'].font = Font(bold=True) 
+                ws[f'{start}1'].alignment = Alignment(horizontal='center')
+                first += width
 
             def set_border(ws, cell_range):
                 thin = Side(border_style="thin", color="000000")
@@ -455,11 +632,10 @@ LAYERS: {self.geol_layers_list}
                         cell.border = Border(top=None, left=thin, right=None, bottom=None)
 
             end_row = str(len(ws['A']))
-            border_range = 'I1:I' + end_row
-            set_single_border(ws, border_range) 
-            border_range = 'C1:C' + end_row
-            set_single_border(ws, border_range) 
-            set_border(ws, 'A1:N2')
+            for start in block_starts:
+                border_range = f'{start}1:{start}' + end_row
+                set_single_border(ws, border_range) 
+            set_border(ws, f'A1:{get_column_letter(max(first - 1, 2))}2')
             head_row = ws['C3']
             ws.freeze_panes = head_row
 
@@ -475,13 +651,7 @@ LAYERS: {self.geol_layers_list}
     def get_avg_val(self):
         self.full_bh.setChecked(False)
         self.cpt_value = self.cpt_table.currentText()
-        rows = self.cpt_data.shape[0]
-        avg_list = []
         depth_with_value = {}
-        avg_row: int
-        zero_count = 0
-        max_count = 0
-        min_count = 0
 
         try:
             self.cpt_depth = self.depth_table.currentItem().text()
@@ -494,45 +664,21 @@ Querying {self.cpt_value} at {self.cpt_depth}m from {self.bh_select}""")
 
         self.get_geol_layers(bh=self.bh_select, depth=self.cpt_depth)
 
-        min_datapoint = 0
-        if not rows - 1 == -1:
-            max_datapoint = rows - 1
-        for row in range(0, rows):
-            #these nan checks mean that if there is no data in -0.5m (e.g. BHCPT67A 18.90m) it can't define min_datapoint, so its kept as 0 and goes to bottom of hole
-            if self.cpt_data['true_depth'][row] == None or self.cpt_data['true_depth'][row] == "":
-                pass
-            elif np.isnan(float(self.cpt_data['true_depth'][row])) == True:
-                pass
-            else:
-                if float(self.cpt_data['true_depth'][row]) <= (float(self.cpt_depth) - float(0.5)):
-                    min_datapoint = row
-                elif float(self.cpt_data['true_depth'][row]) >= (float(self.cpt_depth) + float(0.5)) and not float(self.cpt_data['true_depth'][row]) > (float(self.cpt_depth) + float(0.51)):
-                    max_datapoint = row
-                elif float(self.cpt_data['true_depth'][row]) > (float(self.cpt_depth) + float(0.51)):
-                    break
-                #need to somehow implement this so it doesnt take the spikes without not plotting anything if the above depths contain no data
-                elif not row == rows -1:
-                    if not float(self.cpt_data['true_depth'][row]) < 0.15:
-                        if float(self.cpt_data['true_depth'][row+1]) % float(self.cpt_data['true_depth'][row]) > 0.15:
-                            if float(self.cpt_data['true_depth'][row]) == float(self.cpt_depth):
-                                self.reset_graph()
-                                return print("this depth is in a data gap")
-                            #need to understand why it cant get avg_row - 22.88m BHCPT67A
-                            min_datapoint += 1 
-                            max_datapoint = row
-                            break
-
-            if str(self.cpt_data['true_depth'][row]) == str(self.cpt_depth):
-                avg_row = row         
-                cpt_result = self.cpt_data[self.cpt_value][row]
-                self.actual_val.clear()
-                self.actual_val.setText(f'''<p align="center">{self.bh_select} value for {self.cpt_value} at {self.cpt_depth}m is: {self.cpt_data[self.cpt_value][row]}</p>''')
-                print(f"The value for {self.cpt_value} at {self.cpt_depth}m is: {self.cpt_data[self.cpt_value][row]}")
-
-        # print(f"min row: {min_datapoint} - data is: {self.cpt_data[self.cpt_value][min_datapoint]} - depth is: {self.cpt_data['true_depth'][min_datapoint]}")
-        # print(f"avg row: {avg_row} - data is: {self.cpt_data[self.cpt_value][avg_row]} - depth is: {self.cpt_data['true_depth'][avg_row]}")
-        # print(f"max row: {max_datapoint} - data is: {self.cpt_data[self.cpt_value][max_datapoint]} - depth is: {self.cpt_data['true_depth'][max_datapoint]}")
+        #rows are in depth order, same as depth_table - the mean comes from the sounding's prefix sums, the values are only read for the list and plot
+        up, down = self.averaging_window()
+        percentiles, trim = self.robust_settings()
+        window = self.cpt_index.window(self.cpt_value, self.cpt_depth, getattr(self, 'layer', None), up, down,
+                                       robust=True, percentiles=percentiles, trim=trim)
 
+        if window['gap']:
+            self.reset_graph()
+            return print("this depth is in a data gap")
+
+        if window['at'] is not None:
+            cpt_result = self.sounding[self.cpt_value][window['at']]
+            self.actual_val.clear()
+            self.actual_val.setText(f'''<p align="center">{self.bh_select} value for {self.cpt_value} at {self.cpt_depth}m is: {cpt_result}</p>''')
+            print(f"The value for {self.cpt_value} at {self.cpt_depth}m is: {cpt_result}")
 
         #can be used in next loops when iterating to check if true_depth[row] is in layer
         for layer in range(0, len(self.geol_layers_list)):
@@ -540,69 +686,21 @@ Querying {self.cpt_value} at {self.cpt_depth}m from {self.bh_select}""")
             if x == str(self.layer[0]):
                 self.geol_layers.setCurrentIndex(layer) 
 
-        for row in range(min_datapoint, max_datapoint):
-            if float(self.cpt_data['true_depth'][row]) < (float(self.cpt_depth) - float(0.51)):
-                min_datapoint += 1
+        if window['cut_below']:
+            print(f"""Average data ranges exceed layer range of {self.layer}, cutting {window['cut_below']} data points...""")
+        if window['cut_above']:
+            print(f"""Average data ranges precede layer range of {self.layer}, cutting {window['cut_above']} data points...""")
 
-        for row in range(min_datapoint, max_datapoint):
-            if row <= 0:
-                zero_count += 1
-                pass
-            elif row >= rows:
-                max_count = row - rows
-                pass
-            #this line means that if there is no data in +0.5m (e.g. BHCPT67A 18.90m) it can't append max_count as value == None (resolved)
-            elif not self.cpt_data[self.cpt_value][row] == None and not self.cpt_data[self.cpt_value][row] == "":
-                if float(self.cpt_data['true_depth'][row]) >= float(self.layer[1]) and not float(self.cpt_data['true_depth'][row]) > (float(self.cpt_depth) + float(0.51)):
-                    print(f"""Average data ranges for {self.cpt_data['true_depth'][row]} exceeds layer range of {self.layer}, cutting data...""")
-                    max_count +=1
-                    pass
-                elif float(self.cpt_data['true_depth'][row]) < float(self.layer[0]) and not float(self.cpt_data['true_depth'][row]) < (float(self.cpt_depth) - float(0.51)):
-                    print(f"""Average data ranges for {self.cpt_data['true_depth'][row]} precedes layer range of {self.layer}, cutting data...""")
-                    min_count += 1
-                    pass
-                # elif float(self.cpt_data['true_depth'][row]) % float(self.cpt_data['true_depth'][avg_row]) < 0.5:
-                #     min_count += 1
-                #does this work? - nope
-                else:
-                    avg_list.append(float(self.cpt_data[self.cpt_value][row]))
-                    depth_with_value[f"{self.cpt_data['true_depth'][row]}m"] = self.cpt_data[self.cpt_value][row]
-
-        #check if layer is less than 1m otherwise the +/- 0.5m range cannot get correct index of vals
-        if self.layer[1] - self.layer[0] < float(0.999):
-            zero_count = 0
-            min_count = 0
-            max_count = 0
-
-        #if -0.5m puts range before zero
-        if not zero_count == 0:
-            for row in range (0 + zero_count, (max_datapoint) + zero_count):
-                if row >= rows:
-                    break
-                elif not self.cpt_data[self.cpt_value][row] == None and not self.cpt_data[self.cpt_value][row] == "":
-                    avg_list.append(float(self.cpt_data[self.cpt_value][row]))
-                    depth_with_value[f"{self.cpt_data['true_depth'][row]}m"] = self.cpt_data[self.cpt_value][row]
-
-        #if -0.5m gets cut because of end of layer, append values from above. min_count = the difference of data points exceeding range + (requested depth + 0.5m)
-        if not min_count == 0:
-            for row in range (min_datapoint + min_count, (max_datapoint) + min_count):
-                if row >= rows or row < 0:
-                    break
-                elif not self.cpt_data[self.cpt_value][row] == None and not self.cpt_data[self.cpt_value][row] == "":
-                    avg_list.append(float(self.cpt_data[self.cpt_value][row]))
-                    depth_with_value[f"{self.cpt_data['true_depth'][row]}m"] = self.cpt_data[self.cpt_value][row]
-
-        #if -0.5m gets cut because of end of layer or hole, append values from above. max_count = the difference of data points exceeding range - (requested depth - 0.5m)
-        if not max_count == 0:
-            for row in range(min_datapoint,(min_datapoint - max_count),-1):
-                if row >= rows:
-                    pass
-                elif not self.cpt_data[self.cpt_value][row] == None:
-                    avg_list.insert(0, float(self.cpt_data[self.cpt_value][row]))
-                    depth_with_value[f"{self.cpt_data['true_depth'][row]}m"] = self.cpt_data[self.cpt_value][row]
+        depth_rows = {}
+        rows = segment_rows(window['segments'])
+        values = self.sounding[self.cpt_value][rows]
+        for (row, value) in zip(rows, values):
+            depth_with_value[f"{self.cpt_index.depth[row]}m"] = float(value)
+            depth_rows[f"{self.cpt_index.depth[row]}m"] = int(row)
 
         depth_with_value = dict(sorted(depth_with_value.items(), key=lambda x: float(str(x[0]).split("m")[0])))
-        avg_list = [x for x in avg_list if not np.isnan(x) and not x == None]
+        #sounding row of each point, kept in step with self.x and self.y when points are removed
+        self.rows = [depth_rows[k] for k in depth_with_value]
 
         depth_with_value_str = [str(x).split("('")[1].replace("',", " -").replace(")", "") for x in depth_with_value.items()]
 
@@ -613,9 +711,10 @@ Querying {self.cpt_value} at {self.cpt_depth}m from {self.bh_select}""")
             y_coord.append(float(str(k).split("m")[0]))
             x_coord.append(float(str(v)))
 
-        for y in range(0, len(y_coord)):
-            if float(y_coord[y]) == float(self.cpt_depth):
-                self.avg_line = y
+        #picked depth among the averaged rows, matched exactly on the depth keys
+        at_depth = np.flatnonzero(self.cpt_index.keys[self.rows] == depth_key(self.cpt_depth)) if self.rows else []
+        if len(at_depth):
+            self.avg_line = int(at_depth[-1])
 
         self.avg_vals.clear()
         self.avg_vals.addItems(depth_with_value_str)
@@ -624,30 +723,27 @@ Querying {self.cpt_value} at {self.cpt_depth}m from {self.bh_select}""")
 
         self.x = x_coord
         self.y = y_coord
+        self.edits = PointEdits(x_coord, y_coord, self.rows)
 
-        print(f"Depths in a 1(m) range: {y_coord}")
-        print(f"Values in a 1(m) range: {x_coord}")
+        print(f"Depths from {up}(m) above to {down}(m) below: {y_coord}")
+        print(f"Values from {up}(m) above to {down}(m) below: {x_coord}")
 
-        if avg_list == []:
+        if window['count'] == 0:
             print(f"No data - check the data (e.g, is there data? Fs has no data at the end of the push.")
             self.actual_val.clear()
             self.actual_val.setText(f'''<p align="center">No data - check the data (e.g, is there data? Fs has no data at the end of the push.</p>''')
             return
         else:
-            for depth, value in depth_with_value.items():
-                if str(depth).split("m")[0] == str(self.cpt_depth):
-                    self.avg_vals.setCurrentText(str(f"{depth} - {value}"))
-                    break
-                else:
-                    self.avg_vals.setCurrentIndex(0)
+            self.avg_vals.setCurrentIndex(int(at_depth[0]) if len(at_depth) else 0)
 
-        avg_val = statistics.mean(avg_list)
+        avg_val = window['mean']
         self.avg_vals.setEnabled(True)
 
         self.average_val.clear()
         self.average_val.setText(f'''<p align="center">{self.bh_select} average value for {self.cpt_value} at {self.cpt_depth}m is: {round(avg_val, 4)}</p>''')
-        print(f"""The average value for {self.cpt_value} at {self.cpt_depth}m is: {avg_val}
-****************************************""")
+        print(f"""The average value for {self.cpt_value} at {self.cpt_depth}m is: {avg_val}""")
+        self.print_robust(window, percentiles)
+        print("****************************************")
         self.reset_graph()
         self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
         self.play_coin()
@@ -678,31 +774,56 @@ Querying {self.cpt_value} at {self.cpt_depth}m from {self.bh_select}""")
         self.dark_mode()
 
         if self.full_bh.isChecked() == True:
-            #need to fix all the empty strings (e.g. beacon gint) otherwise .plot() cannot get min and max bounding values for axis as not real number (convert empty string to nan)
-            x_fixed = list(self.cpt_data[self.cpt_value])
-            for x in range(0, len(x_fixed)):
-                if not x_fixed[x] == None:
-                    if x_fixed[x] == '' or x_fixed[x] == "":
-                        x_fixed[x] = float('nan')
-                    else:
-                        x_fixed[x] = float(x_fixed[x])
-            self.plot_graph(x_fixed, self.full_depth, cpt_value=self.cpt_value)
+            #empty strings (e.g. beacon gint) are already nan in the sounding, so .plot() can get the axis bounds
+            self.plot_graph(self.sounding[self.cpt_value], self.full_depth, cpt_value=self.cpt_value)
+            self.plot_rolling()
         else:
             self.plot_graph(self.x, self.y, cpt_value=self.cpt_value)
     
+    def plot_rolling(self):
+        #rolling average (same window as get_avg_val) at every depth, drawn over the full borehole
+        if not self.cpt_value in self.cpt_index:
+            return
+        layers = self.geol_index.get(self.bh_select)
+        top, base = layers.find_all(self.cpt_index.depth) if layers is not None else (None, None)
+        up, down = self.averaging_window()
+        rolling = self.cpt_index.rolling(self.cpt_value, top, base, up, down)
+        self.graph_plot.plot(rolling['mean'], self.full_depth, pen=pg.mkPen('#58D68D', width=2), connect='finite')
+
+    def export_rolling_average(self):
+        if not hasattr(self, 'cpt_index') or not getattr(self, 'bh_select', ''):
+            print("No borehole selected.")
+            return
+
+        up, down = self.averaging_window()
+        rolling = rolling_table(self.cpt_index, self.geol_index.get(self.bh_select), up, down)
+
+        fname = QtWidgets.QFileDialog.getSaveFileName(self, f"Save rolling average for {self.bh_select}...", os.getcwd(), "Excel file *.xlsx;; CSV *.csv")
+
+        if fname[0] == '':
+            return
+
+        if fname[1] == 'Excel file *.xlsx':
+            rolling.to_excel(fname[0], sheet_name="Rolling Average", index=False)
+        elif fname[1] == 'CSV *.csv':
+            rolling.to_csv(fname[0], index=False)
+
+        print(f"{self.bh_select} rolling averages saved in: {fname[0]}")
+
     def plot_graph(self, x, y, cpt_value):
         if self.dark_mode_button.isChecked() == True and self.full_bh.isChecked() == False:
-            self.graph_plot.plot(x,y, symbol='o', symbolSize='5', pen='w', symbolPen='r', symbolBrush='r', axisx='w', axisy='w')
+            self.points_curve = self.graph_plot.plot(x,y, symbol='o', symbolSize='5', pen='w', symbolPen='r', symbolBrush='r', axisx='w', axisy='w')
         elif self.full_bh.isChecked() == True:
-            self.graph_plot.plot(x,y, pen='r',  axisx='w', axisy='w')
+            self.points_curve = self.graph_plot.plot(x,y, pen='r',  axisx='w', axisy='w')
         else:
             self.plot_area.setBackground("#f0f0f0")
-            self.graph_plot.plot(x,y, symbol='o', symbolSize='5', pen='b', symbolPen='b', symbolBrush='b', axisx='b', axisy='b')
+            self.points_curve = self.graph_plot.plot(x,y, symbol='o', symbolSize='5', pen='b', symbolPen='b', symbolBrush='b', axisx='b', axisy='b')
         self.graph_plot.getAxis('bottom').setLabel(f"{cpt_value}")
         self.graph_plot.getViewBox().invertY(True)
 
     def reset_graph(self):
         self.plot_area.clear()
+        self.points_curve = None
         self.setup_graph()
 
     def copy_actual_value(self):
@@ -714,71 +835,70 @@ Querying {self.cpt_value} at {self.cpt_depth}m from {self.bh_select}""")
         pyperclip.copy(self.average_val.toPlainText())
 
     def remove_data_before(self):
-        if hasattr(self, 'line'):
-            if self.avg_line == 0:
-                del self.y[self.avg_line]
-                del self.x[self.avg_line]
-                delattr(self, 'line')
-            else:
-                if abs(0-self.avg_line) > 5:
-                    confirm = QMessageBox
-                    ask = confirm.question(self, '', f'''You are about to remove a lot of data.
-{abs(0-self.avg_line)} data points in total.
-Are you sure you want to delete this much data?''')
-                    if ask == confirm.Yes:
-                        del self.y[0:self.avg_line]
-                        del self.x[0:self.avg_line]
-                        self.reset_graph()
-                        self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
-                        delattr(self, 'line')
-                    else:
-                        return
-                else:
-                    del self.y[0:self.avg_line]
-                    del self.x[0:self.avg_line]
-                self.reset_graph()
-                self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
-        else:
+        if not hasattr(self, 'line') or not hasattr(self, 'edits'):
             return
-        
+        if self.avg_line == 0:
+            self.edit_points(0, 1, drop_line=True)
+        elif abs(0-self.avg_line) > 5:
+            if self.confirm_remove(abs(0-self.avg_line)):
+                self.edit_points(0, self.avg_line, drop_line=True)
+        else:
+            self.edit_points(0, self.avg_line)
 
     def remove_data_after(self):
-        if hasattr(self, 'line'):
-            if self.avg_line >= len(self.y):
-                del self.y[self.avg_line]
-                del self.x[self.avg_line]
-                delattr(self, 'line')
-            else:
-                if abs(self.avg_line-len(self.y)) > 5:
-                    confirm = QMessageBox
-                    ask = confirm.question(self, '', f'''You are about to remove a lot of data.
-{abs(self.avg_line-len(self.y))} data points in total.
-Are you sure you want to delete this much data?''')
-                    if ask == confirm.Yes:
-                        del self.y[self.avg_line:len(self.y)]
-                        del self.x[self.avg_line:len(self.x)]
-                        self.reset_graph()
-                        self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
-                        delattr(self, 'line')
-                    else:
-                        return
-                else:    
-                    del self.y[self.avg_line:len(self.y)]
-                    del self.x[self.avg_line:len(self.x)]
-            self.reset_graph()
-            self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
-        else:
+        if not hasattr(self, 'line') or not hasattr(self, 'edits'):
             return
-        
+        if self.avg_line >= len(self.y):
+            self.edit_points(self.avg_line, self.avg_line + 1, drop_line=True)
+        elif abs(self.avg_line-len(self.y)) > 5:
+            if self.confirm_remove(abs(self.avg_line-len(self.y))):
+                self.edit_points(self.avg_line, len(self.y), drop_line=True)
+        else:
+            self.edit_points(self.avg_line, len(self.y))
+
     def remove_data_at(self):
-        if hasattr(self, 'line'):
-            del self.y[self.avg_line]
-            del self.x[self.avg_line]
-            self.reset_graph()
-            self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
+        if not hasattr(self, 'line') or not hasattr(self, 'edits'):
+            return
+        self.edit_points(self.avg_line, self.avg_line + 1, drop_line=True)
+
+    def confirm_remove(self, count) -> bool:
+        confirm = QMessageBox
+        ask = confirm.question(self, '', f'''You are about to remove a lot of data.
+{count} data points in total.
+Are you sure you want to delete this much data?''')
+        return ask == confirm.Yes
+
+    def edit_points(self, start, stop, drop_line=False):
+        #points only drop out of the mask (and the running sums), undo puts them back
+        self.edits.remove(start, stop)
+        if drop_line and hasattr(self, 'line'):
+            self.graph_plot.removeItem(self.line)
             delattr(self, 'line')
+        self.points_edited()
+
+    def undo_edit(self):
+        if hasattr(self, 'edits') and self.edits.undo():
+            print("Undo - points put back.")
+            self.points_edited()
+
+    def redo_edit(self):
+        if hasattr(self, 'edits') and self.edits.redo():
+            print("Redo - points removed again.")
+            self.points_edited()
+
+    def points_edited(self):
+        #lists follow the mask and the plotted points are updated in place instead of re-creating the graph
+        self.x = self.edits.x.tolist()
+        self.y = self.edits.y.tolist()
+        self.rows = self.edits.kept_rows.tolist()
+        self.avg_line = min(self.avg_line, max(len(self.y) - 1, 0))
+        if self.points_curve is not None and self.full_bh.isChecked() == False:
+            self.points_curve.setData(self.x, self.y)
         else:
-            return
+            self.reset_graph()
+            self.plot_graph(x=self.x, y=self.y, cpt_value=self.cpt_value)
+        if hasattr(self, 'line'):
+            self.add_line()
         
     def strain_num_incr(self):
         if (self.avg_line + 1) >= len(self.y):
@@ -804,6 +924,8 @@ Are you sure you want to delete this much data?''')
             pass
 
     def recalc_avg(self):
+        if not hasattr(self, 'edits'):
+            return
         x = self.x
         y = self.y
         self.avg_vals.clear()
@@ -815,19 +937,19 @@ Are you sure you want to delete this much data?''')
 
         self.avg_vals.addItems(new_depth_with_val)
         print(new_depth_with_val)
-        for item in range(0, len(new_depth_with_val)):
-            if str(new_depth_with_val[item]).split("m")[0] == str(self.cpt_depth):
-                self.avg_vals.setCurrentText(str(f"{new_depth_with_val[item]}"))
-                break
-            else:
-                self.avg_vals.setCurrentIndex(0)
+        at_depth = np.flatnonzero(self.cpt_index.keys[self.rows] == depth_key(self.cpt_depth)) if self.rows else []
+        self.avg_vals.setCurrentIndex(int(at_depth[0]) if len(at_depth) else 0)
 
-        avg_val = statistics.mean(self.x)
+        #the mean is kept up to date in the edit model's running sums as points are removed
+        percentiles, trim = self.robust_settings()
+        summary = self.edits.stats(robust=True, percentiles=percentiles, trim=trim)
+        avg_val = summary['mean']
 
         self.average_val.clear()
         self.average_val.setText(f'''<p align="center">{self.bh_select} (recalculated) average value for {self.cpt_value} at {self.cpt_depth}m is: {round(avg_val, 4)}</p>''')
-        print(f"""Recalculated average value for {self.cpt_value} at {self.cpt_depth}m is: {avg_val}
-****************************************""")
+        print(f"""Recalculated average value for {self.cpt_value} at {self.cpt_depth}m is: {avg_val}""")
+        self.print_robust(summary, percentiles)
+        print("****************************************")
 
     def dark_toggle(self):
         self.play_nice()
@@ -883,6 +1005,9 @@ Are you sure you want to delete this much data?''')
             self.increment.setStyleSheet(f"{self.config.get('Theme','button_css_sml_light')}")
             self.decrement.setStyleSheet(f"{self.config.get('Theme','button_css_sml_light')}")
             self.cpt_table.setStyleSheet(f"{self.config.get('Theme','combo_css_light')}")
+            self.window_box.setStyleSheet(f"{self.config.get('Theme','combo_css_light')}")
+            for spin in [self.window_up, self.window_down, self.pile_diameter]:
+                spin.setStyleSheet(f"{self.config.get('Theme','spin_css_light')}")
             self.geol_layers.setStyleSheet(f"{self.config.get('Theme','combo_css_light')}")
             self.avg_vals.setStyleSheet(f"{self.config.get('Theme','combo_css_light')}")
             self.dark_mode_button.setStyleSheet(f"{self.config.get('Theme','checkbox_css_light')}")
@@ -947,6 +1072,9 @@ Are you sure you want to delete this much data?''')
             self.increment.setStyleSheet(f"{self.config.get('Theme','button_css_sml')}")
             self.decrement.setStyleSheet(f"{self.config.get('Theme','button_css_sml')}")
             self.cpt_table.setStyleSheet(f"{self.config.get('Theme','combo_css')}")
+            self.window_box.setStyleSheet(f"{self.config.get('Theme','combo_css')}")
+            for spin in [self.window_up, self.window_down, self.pile_diameter]:
+                spin.setStyleSheet(f"{self.config.get('Theme','spin_css')}")
             self.geol_layers.setStyleSheet(f"{self.config.get('Theme','combo_css')}")
             self.avg_vals.setStyleSheet(f"{self.config.get('Theme','combo_css')}")
             self.dark_mode_button.setStyleSheet(f"{self.config.get('Theme','checkbox_css')}")
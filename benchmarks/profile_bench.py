@@ -0,0 +1,82 @@
+"""
+Time profile_batch against DesignProfile.profile run segment by segment, for each model, on synthetic soundings.
+
+    python benchmarks/profile_bench.py [--segments 3000] [--repeat 3] [--seed 0]
+
+Each segment is like one layer of one parameter in the export - a trend with depth, a few outliers and missing readings,
+3 to 400 points. The best of --repeat runs is reported, with the number of segments where the two paths disagree.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+#the app isn't installed, common is imported from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.designprofile import PROFILE_FIELDS, DesignProfile, profile_batch
+
+MODELS = ['DEP', 'IND', 'AUTO']
+
+
+def synthetic_segments(rng, segments) -> tuple:
+    """(param, depth, offsets) of segments laid end to end, segment i being param[offsets[i]:offsets[i + 1]]."""
+    sizes = rng.integers(3, 401, segments)
+    params = []
+    depths = []
+    for (seg, rows) in enumerate(sizes):
+        depth = np.round(seg * 10.0 + np.sort(rng.uniform(0.0, 10.0, rows)), 2)
+        param = rng.normal(10.0, 2.0, rows) + depth * rng.uniform(-0.05, 0.05)
+        param[rng.random(rows) < 0.03] *= 4.0
+        param[rng.random(rows) < 0.05] = np.nan
+        params.append(param)
+        depths.append(depth)
+    return (np.concatenate(params), np.concatenate(depths), np.concatenate(([0], np.cumsum(sizes))))
+
+
+def best_of(repeat, run) -> tuple:
+    #(fastest time in seconds, result of the last run)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        times.append(time.perf_counter() - start)
+    return (min(times), result)
+
+
+def profile_loop(param, depth, offsets, model, zvalue) -> list:
+    return [DesignProfile(param[start:stop], depth[start:stop], '', model, zvalue, False, '').profile()
+            for (start, stop) in zip(offsets[:-1], offsets[1:])]
+
+
+def differences(loop, batch) -> int:
+    """Segments where the record from profile() and the profile_batch row don't agree (to 1e-9)."""
+    differ = 0
+    for (record, row) in zip(loop, batch):
+        if record is None:
+            differ += bool(row['valid'])
+            continue
+        same = row['valid'] and record['dependent'] == row['dependent']
+        differ += not (same and all(np.isclose(record[field], row[field], rtol=1e-9, atol=1e-9, equal_nan=True) for field in PROFILE_FIELDS))
+    return differ
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time profile_batch against DesignProfile.profile per segment.")
+    parser.add_argument('--segments', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--zvalue', type=float, default=95)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    (param, depth, offsets) = synthetic_segments(np.random.default_rng(args.seed), args.segments)
+    print(f"{args.segments} segments, {len(param)} points, best of {args.repeat}")
+    print(f"{'model':<8}{'profile() loop':>16}{'profile_batch':>16}{'speedup':>10}{'differ':>8}")
+    for model in MODELS:
+        loop_time, loop = best_of(args.repeat, lambda: profile_loop(param, depth, offsets, model, args.zvalue))
+        batch_time, batch = best_of(args.repeat, lambda: profile_batch(param, depth, offsets, model, args.zvalue))
+        print(f"{model:<8}{loop_time * 1000:>13.0f} ms{batch_time * 1000:>13.0f} ms{loop_time / batch_time:>9.1f}x{differences(loop, batch):>8}")
+
+
+if __name__ == '__main__':
+    main()
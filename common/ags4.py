@@ -0,0 +1,151 @@
+import csv
+from array import array
+import numpy as np
+
+#app column: AGS4 headings to try, in order
+SCPT_COLUMNS = {'ItemKey': ['SCPG_TESN'],
+                'Depth': ['SCPT_DPTH'],
+                'STCN_QC': ['SCPT_RES'],
+                'STCN_FS': ['SCPT_FRES'],
+                'STCN_U': ['SCPT_PWP2', 'SCPT_PWP1', 'SCPT_PWP3'],
+                'STCN_Qnet': ['SCPT_QNET'],
+                'STCN_FCRO': ['SCPT_FRR'],
+                'STCN_SBTi': ['SCPT_ISBT', 'SCPT_IC']}
+GEOL_COLUMNS = {'Depth': ['GEOL_TOP'],
+                'GEOL_BASE': ['GEOL_BASE'],
+                'GEOL_LEG': ['GEOL_LEG'],
+                'GEOL_GEOL': ['GEOL_GEOL'],
+                'GEOL_GEO2': ['GEOL_GEO2']}
+AGS_GROUPS = {'LOCA': {}, 'SCPT': SCPT_COLUMNS, 'GEOL': GEOL_COLUMNS}
+
+#columns kept as text, everything else is parsed straight to float64
+TEXT_COLUMNS = ['ItemKey', 'GEOL_LEG', 'GEOL_GEOL', 'GEOL_GEO2']
+
+#resistances are MPa in gINT, AGS4 files often give them in kPa
+MPA_COLUMNS = ['STCN_QC', 'STCN_FS', 'STCN_Qnet']
+
+#pore pressure is kPa in gINT (and the exports), AGS4 gives SCPT_PWP1/2/3 in MPa
+KPA_COLUMNS = ['STCN_U']
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def _scale(col, unit) -> float:
+    #factor from the unit in the UNIT row to the unit gINT keeps the column in
+    if col in MPA_COLUMNS and unit.lower() == 'kpa':
+        return 0.001
+    if col in KPA_COLUMNS and unit.lower() == 'mpa':
+        return 1000.0
+    return 1.0
+
+
+class _GroupReader:
+    """Buffers the DATA rows of one group for the current borehole, in typed arrays rather than rows of strings."""
+
+    def __init__(self, headings, units, columns):
+        self.loca = headings.index('LOCA_ID') if 'LOCA_ID' in headings else None
+        self.columns = columns
+        self.position = {}
+        self.scale = {}
+        for col, names in columns.items():
+            heading = next((h for h in names if h in headings), None)
+            if heading is None:
+                continue
+            self.position[col] = headings.index(heading)
+            unit = units[headings.index(heading)] if headings.index(heading) < len(units) else ''
+            self.scale[col] = _scale(col, unit)
+        self.loca_id = None
+        self.reset()
+
+    def reset(self):
+        self.rows = 0
+        self.buffers = {col: [] if col in TEXT_COLUMNS else array('d') for col in self.position}
+
+    def add(self, row):
+        """Add a DATA row, returning the finished borehole if this row starts a new one."""
+        loca_id = row[self.loca] if self.loca is not None and self.loca < len(row) else ''
+        finished = None
+        if loca_id != self.loca_id:
+            finished = self.flush()
+            self.loca_id = loca_id
+
+        for col, x in self.position.items():
+            value = row[x] if x < len(row) else ''
+            if col in TEXT_COLUMNS:
+                self.buffers[col].append(value)
+            else:
+                self.buffers[col].append(_to_float(value))
+        self.rows += 1
+        return finished
+
+    def flush(self):
+        if self.rows == 0:
+            return None
+        arrays = {}
+        for col in self.columns:
+            if col not in self.buffers:
+                arrays[col] = np.full(self.rows, '', dtype=object) if col in TEXT_COLUMNS else np.full(self.rows, np.nan)
+            elif col in TEXT_COLUMNS:
+                arrays[col] = np.array(self.buffers[col], dtype=object)
+            else:
+                arrays[col] = np.frombuffer(self.buffers[col], dtype=np.float64) * self.scale[col]
+        finished = (self.loca_id, self.rows, arrays)
+        self.reset()
+        return finished
+
+
+def iter_boreholes(path, groups=AGS_GROUPS):
+    """
+    Stream an AGS4 file once, line by line, yielding (group, LOCA_ID, n rows, {column: numpy array}) for each borehole in each requested group.
+
+    Only the current borehole of the current group is held in memory, so memory is bounded by the largest borehole rather than the file size.
+    Columns are named as the app uses them (see SCPT_COLUMNS, GEOL_COLUMNS) - numeric ones come back as float64, missing values as nan.
+    If a file lists a borehole's rows in more than one block the borehole is yielded once per block.
+
+    Parameters
+    ----------
+    path : str location of the .ags file
+
+    groups : dict of {AGS4 group: {app column: [AGS4 headings to try]}}
+    """
+    reader = None
+    group = None
+    headings = []
+
+    with open(path, 'r', newline='', encoding='utf-8-sig', errors='replace') as f:
+        for line in csv.reader(f):
+            if not line:
+                continue
+            kind = line[0]
+
+            if kind == 'GROUP':
+                if reader is not None:
+                    finished = reader.flush()
+                    if finished:
+                        yield (group,) + finished
+                group = line[1] if len(line) > 1 else ''
+                reader = None
+                headings = []
+            elif group not in groups:
+                continue
+            elif kind == 'HEADING':
+                headings = line[1:]
+            elif kind == 'UNIT':
+                reader = _GroupReader(headings, line[1:], groups[group])
+            elif kind == 'DATA':
+                if reader is None:
+                    #no UNIT row, shouldn't happen in a valid AGS4 file
+                    reader = _GroupReader(headings, [], groups[group])
+                finished = reader.add(line[1:])
+                if finished:
+                    yield (group,) + finished
+
+        if reader is not None:
+            finished = reader.flush()
+            if finished:
+                yield (group,) + finished
@@ -0,0 +1,554 @@
+import numpy as np
+from common.gintdata import DEPTH_SCALE, depth_keys, depth_key
+
+#default averaging window, data from this far above to this far below the requested depth is averaged
+WINDOW = 0.5
+
+#extra distance past the window that still counts as the edge of the window (the 0.51m in get_avg_val)
+TOLERANCE = 0.01
+
+#preset windows as (up, down, in pile diameters) - up/down are metres, or multiples of the pile diameter D
+WINDOWS = {'+/- 0.5m': (0.5, 0.5, False),
+           '+/- 0.25m': (0.25, 0.25, False),
+           '1.5D above / 4D below': (1.5, 4.0, True)}
+
+#a step between readings bigger than this within the window is treated as a data gap
+GAP = 0.15
+
+#fraction of the values cut from each end for the trimmed mean, and the percentiles reported with the robust stats
+TRIM = 0.1
+PERCENTILES = (10, 90)
+
+#layers thinner than the window (less this margin, i.e. 0.999m for +/- 0.5m) don't have the window shifted back into the layer when it's cut
+LAYER_MARGIN = 0.001
+
+
+def window_extent(name, diameter=1.0) -> tuple:
+    """(up, down) in metres of one of the preset WINDOWS, for a pile diameter in metres."""
+    up, down, in_diameters = WINDOWS[name]
+    if in_diameters:
+        return (round(up * diameter, 10), round(down * diameter, 10))
+    return (up, down)
+
+
+def _rows_between(depth, start, stop, low, high, high_inclusive=True) -> tuple:
+    """(first, last + 1) of the rows in start:stop with low <= depth <= high (or < high), depth must be sorted."""
+    first = max(start, int(np.searchsorted(depth, low, side='left')))
+    last = min(stop, int(np.searchsorted(depth, high, side='right' if high_inclusive else 'left')))
+    return (first, max(first, last))
+
+
+def _subtract(segment, cuts) -> list:
+    """Split a (start, stop) range of rows into the parts not covered by any of the cut ranges."""
+    segments = [segment]
+    for (cut_start, cut_stop) in cuts:
+        if cut_stop <= cut_start:
+            continue
+        kept = []
+        for (start, stop) in segments:
+            if cut_start > start:
+                kept.append((start, min(stop, cut_start)))
+            if cut_stop < stop:
+                kept.append((max(start, cut_stop), stop))
+        segments = [(start, stop) for (start, stop) in kept if stop > start]
+    return segments
+
+
+def _kept(segment, blank) -> int:
+    #rows in a (start, stop) range that aren't blank cells - the loops skipped None and "" before checking the layer
+    (start, stop) = segment
+    if blank is None:
+        return stop - start
+    return int(stop - start - np.count_nonzero(blank[start:stop]))
+
+
+def window_segments(depth, cpt_depth, layer=None, up=WINDOW, down=WINDOW, tolerance=TOLERANCE, blank=None) -> dict:
+    """
+    Find the rows averaged for a depth, using the same rules as the row loops get_avg_val used to have:
+
+    - the window is from up above to down below the depth, up to tolerance further at either edge
+    - if there's a jump of more than GAP between readings within the window, the window stops at the gap
+      (and if the depth itself is at the gap there's nothing to average)
+    - rows outside the geol layer are cut, and the window is shifted back into the layer by the number of rows cut
+      (not for layers thinner than the window) - when the window starts at the top of the hole rows from the top are added again
+    - cells left empty in gINT (None or "") aren't counted as cut, so they don't shift the window
+
+    Rows are positions in depth, which must be sorted (nans last). The rules can include some rows more than once, those rows count
+    more than once in the average, same as before.
+
+    Returns {'segments': [(start, stop)] of rows in the order they're added, 'at': row at the depth (or None), 'gap': True if the depth
+    is in a data gap, 'cut_above'/'cut_below': number of rows cut by the top/base of the layer}.
+
+    Parameters
+    ----------
+    depth : np.array of true depths, sorted
+
+    cpt_depth : float depth to average at
+
+    layer : (top, base) of the geol layer the depth is in - None doesn't cut the window at layers
+
+    up, down : float extent of the window above and below the depth (m) - defaults to +/- WINDOW
+
+    tolerance : float extra distance at either edge still counted as the edge of the window
+
+    blank : np.array of bool, True for the rows whose value is None or "" (gintdata.blank_cells) - None if there are none
+    """
+    depth = np.asarray(depth, dtype=np.float64)
+    rows = len(depth)
+    q = float(cpt_depth)
+    low = q - up
+    high = q + down
+    low_edge = q - round(up + tolerance, 10)
+    high_edge = q + round(down + tolerance, 10)
+    result = {'segments': [], 'at': None, 'gap': False, 'cut_above': 0, 'cut_below': 0}
+
+    #last row at or above the top of the window (or the first row), and the bottom of the hole unless the window ends sooner
+    above = int(np.searchsorted(depth, low, side='right'))
+    min_datapoint = above - 1 if above > 0 else 0
+    max_datapoint = rows - 1
+
+    #readings within the window, a big step to the next reading is a data gap and the window stops there
+    inside = int(np.searchsorted(depth, high, side='left'))
+    gap = None
+    if inside > above:
+        check = np.arange(above, min(inside, rows - 1))
+        if len(check):
+            with np.errstate(invalid='ignore', divide='ignore'):
+                jumps = (depth[check] >= 0.15) & (np.mod(depth[check + 1], depth[check]) > GAP)
+            if jumps.any():
+                gap = int(check[np.argmax(jumps)])
+
+    #rows at the depth, matched on their integer keys - only the rows within half a key of it can match
+    key = depth_key(q)
+    near = int(np.searchsorted(depth, q - 0.5 / DEPTH_SCALE, side='left'))
+    at = near + np.flatnonzero(depth_keys(depth[near:np.searchsorted(depth, q + 0.5 / DEPTH_SCALE, side='right')]) == key)
+    at = at[at < gap] if gap is not None else at
+    result['at'] = int(at[-1]) if len(at) else None
+
+    if gap is not None:
+        if depth_key(depth[gap]) == key:
+            result['gap'] = True
+            return result
+        min_datapoint += 1
+        max_datapoint = gap
+    else:
+        edge = int(np.searchsorted(depth, high_edge, side='right'))
+        if edge > inside:
+            max_datapoint = edge - 1
+
+    #drop rows more than the tolerance above the window
+    min_datapoint += int(np.count_nonzero(depth[min_datapoint:max_datapoint] < low_edge))
+
+    #the window itself, row 0 is never averaged here (see zero_count below)
+    zero_count = 1 if min_datapoint <= 0 < max_datapoint else 0
+    start = max(min_datapoint, 1)
+    window = (start, max(start, max_datapoint))
+
+    cuts = []
+    min_count = 0
+    max_count = 0
+    if layer is not None:
+        top, base = float(layer[0]), float(layer[1])
+        below = _rows_between(depth, window[0], window[1], base, high_edge)
+        cut = _subtract(_rows_between(depth, window[0], window[1], low_edge, top, high_inclusive=False), [below])
+        max_count = _kept(below, blank)
+        min_count = sum(_kept(segment, blank) for segment in cut)
+        cuts = [below] + cut
+    result['cut_above'] = min_count
+    result['cut_below'] = max_count
+
+    segments = _subtract(window, cuts)
+
+    #check if layer is less than 1m otherwise the +/- 0.5m range cannot get correct index of vals
+    if layer is None or float(layer[1]) - float(layer[0]) < round(up + down - LAYER_MARGIN, 10):
+        zero_count = 0
+        min_count = 0
+        max_count = 0
+
+    #if -0.5m puts range before zero
+    if zero_count:
+        segments.append((1, min(max_datapoint + 1, rows)))
+
+    #if the window is cut by the top of the layer, add the same number of rows below it
+    if min_count:
+        segments.append((min_datapoint + min_count, min(max_datapoint + min_count, rows)))
+
+    #if the window is cut by the base of the layer, add the same number of rows above it
+    if max_count:
+        segments.append((max(min_datapoint - max_count + 1, 0), min(min_datapoint + 1, rows)))
+
+    result['segments'] = [(start, stop) for (start, stop) in segments if stop > start]
+    return result
+
+
+def layer_rows(depth, tops, bases) -> tuple:
+    """
+    (starts, stops) arrays of the rows in each layer, tops and bases both included so a reading on a boundary is in both layers.
+
+    The rows are found with one searchsorted per boundary instead of a mask over the sounding per layer and parameter.
+    """
+    depth = np.asarray(depth, dtype=np.float64)
+    starts = np.searchsorted(depth, np.asarray(tops, dtype=np.float64), side='left')
+    stops = np.maximum(starts, np.searchsorted(depth, np.asarray(bases, dtype=np.float64), side='right'))
+    return (starts, stops)
+
+
+def segment_rows(segments) -> np.array:
+    """Every row in a list of (start, stop) ranges, in order and with repeats."""
+    if not segments:
+        return np.array([], dtype=np.int64)
+    return np.concatenate([np.arange(start, stop) for (start, stop) in segments])
+
+
+def row_segments(rows) -> list:
+    """The (start, stop) ranges of consecutive rows in a list of rows, e.g. what's left of a window after points are removed."""
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(rows)]))
+    return [(int(rows[start]), int(rows[stop - 1]) + 1) for (start, stop) in zip(starts, stops)]
+
+
+def sorted_table(values, starts, stops) -> np.array:
+    """
+    The values in each (start, stop) range of rows as the rows of a table, sorted with the nans (and padding) at the end,
+    so robust_stats can reduce every range at once.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.maximum(np.asarray(stops, dtype=np.int64) - starts, 0)
+    width = int(lengths.max()) if len(lengths) and len(values) else 0
+    cols = np.arange(max(width, 1))
+    inside = cols[None, :] < lengths[:, None]
+    rows = np.minimum(starts[:, None] + cols[None, :], max(len(values) - 1, 0))
+    table = np.where(inside, values[rows] if len(values) else np.nan, np.nan)
+    return np.sort(table, axis=1)
+
+
+def _quantile(table, count, q) -> np.array:
+    """Quantile q (0 to 1) of each row of a sorted table with count values, interpolated the same way as np.percentile."""
+    position = (np.maximum(count, 1) - 1) * q
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    rows = np.arange(len(table))
+    value = table[rows, low] + (table[rows, high] - table[rows, low]) * (position - low)
+    return np.where(count > 0, value, np.nan)
+
+
+def robust_names(percentiles=PERCENTILES) -> list:
+    """The keys robust_stats returns, in the order they're reported."""
+    return ['median', 'trimmed_mean', 'mad'] + [f'p{p:g}' for p in percentiles]
+
+
+def robust_stats(table, percentiles=PERCENTILES, trim=TRIM) -> dict:
+    """
+    Median, trimmed mean, median absolute deviation and percentiles of each row of a sorted_table, in one reduction over the table.
+
+    Returns {'median', 'trimmed_mean', 'mad', 'p10'...} as arrays with one value per row, nan where a row has no data.
+    The trimmed mean cuts int(trim * count) values from each end (same as scipy.stats.trim_mean), the MAD isn't scaled.
+
+    Parameters
+    ----------
+    table : np.array from sorted_table, values sorted along each row with nans last
+
+    percentiles : list of percentiles (0 to 100) to report
+
+    trim : float fraction cut from each end for the trimmed mean
+    """
+    count = np.count_nonzero(~np.isnan(table), axis=1)
+    rows = np.arange(len(table))
+    median = _quantile(table, count, 0.5)
+
+    cut = np.floor(count * trim).astype(np.int64)
+    kept = count - 2 * cut
+    sums = np.concatenate((np.zeros((len(table), 1)), np.cumsum(np.nan_to_num(table), axis=1)), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        trimmed = np.where(kept > 0, (sums[rows, count - cut] - sums[rows, cut]) / kept, np.nan)
+
+    deviation = np.sort(np.abs(table - median[:, None]), axis=1)
+    stats = {'median': median, 'trimmed_mean': trimmed, 'mad': _quantile(deviation, count, 0.5)}
+    for p in percentiles:
+        stats[f'p{p:g}'] = _quantile(table, count, p / 100)
+    return stats
+
+
+def window_average(depth, values, cpt_depth, layer=None, up=WINDOW, down=WINDOW, tolerance=TOLERANCE, blank=None) -> dict:
+    """
+    Average values over the window around cpt_depth (see window_segments for the rules), in one call.
+
+    Returns the window_segments result plus 'rows' (every averaged row, repeats included), 'values' at those rows,
+    and the 'count' and 'mean' of the values ignoring nans (nan if there are none).
+
+    Parameters
+    ----------
+    depth : np.array of true depths, sorted
+
+    values : np.array of the parameter, same order as depth
+
+    cpt_depth : float depth to average at
+
+    layer : (top, base) of the geol layer the depth is in
+
+    up, down, tolerance : window around the depth, see window_segments
+
+    blank : np.array of bool, True for the rows whose value is None or "" - see window_segments
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = window_segments(depth, cpt_depth, layer, up, down, tolerance, blank)
+    rows = segment_rows(result['segments'])
+    result['rows'] = rows
+    result['values'] = values[rows]
+    found = result['values'][~np.isnan(result['values'])]
+    result['count'] = len(found)
+    result['mean'] = float(np.mean(found)) if len(found) else np.nan
+    return result
+
+
+def rolling_segments(depth, top=None, base=None, up=WINDOW, down=WINDOW, tolerance=TOLERANCE, blank=None) -> dict:
+    """
+    The window_segments rules for every row of a sounding at once, for a rolling average over the whole borehole.
+
+    Instead of a list of rows per depth, each depth's window is described by interval terms - arrays of (start, stop, sign) with
+    one entry per row - so a parameter's sum over the window is the signed sum of its prefix sums at the ends of each term
+    (see PrefixIndex.rolling). The window is everything in it, minus the rows cut at the layer (added back where both cuts overlap),
+    plus the rows added by the shifts.
+
+    Returns {'terms': [(start, stop, sign)], 'valid': False for rows with no window (nan depth or in a data gap)}.
+
+    Parameters
+    ----------
+    depth : np.array of true depths, sorted
+
+    top, base : np.array of the top and base of the geol layer each row is in (nan if it isn't in one) - None doesn't cut at layers
+
+    up, down, tolerance : window around each depth, see window_segments
+
+    blank : np.array of bool, True for the rows whose value is None or "" - not counted as cut, as in window_segments
+    """
+    depth = np.asarray(depth, dtype=np.float64)
+    rows = len(depth)
+    q = depth
+    low = q - up
+    high = q + down
+    low_edge = q - round(up + tolerance, 10)
+    high_edge = q + round(down + tolerance, 10)
+    if top is None or base is None:
+        top = np.full(rows, np.nan)
+        base = np.full(rows, np.nan)
+    top = np.asarray(top, dtype=np.float64)
+    base = np.asarray(base, dtype=np.float64)
+
+    above = np.searchsorted(depth, low, side='right')
+    min_datapoint = np.where(above > 0, above - 1, 0)
+    inside = np.searchsorted(depth, high, side='left')
+
+    #first data gap at or after each row
+    jump = np.zeros(rows + 1, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        jump[:rows - 1] = (depth[:-1] >= 0.15) & (np.mod(depth[1:], depth[:-1]) > GAP)
+    next_jump = np.minimum.accumulate(np.where(jump, np.arange(rows + 1), rows)[::-1])[::-1]
+    gap = next_jump[above]
+    has_gap = gap < np.minimum(inside, rows - 1)
+    in_gap = has_gap & (depth[np.minimum(gap, rows - 1)] == q)
+
+    edge = np.searchsorted(depth, high_edge, side='right')
+    min_datapoint = np.where(has_gap, min_datapoint + 1, min_datapoint)
+    max_datapoint = np.where(has_gap, gap, np.where(edge > inside, edge - 1, rows - 1))
+
+    low_rows = np.searchsorted(depth, low_edge, side='left')
+    min_datapoint = min_datapoint + np.maximum(0, np.minimum(max_datapoint, low_rows) - min_datapoint)
+
+    zero_count = (min_datapoint <= 0) & (max_datapoint > 0)
+    start = np.maximum(min_datapoint, 1)
+    stop = np.maximum(start, max_datapoint)
+
+    #rows cut at the base of the layer (below) and at the top of it (above), nan layers compare false so nothing is cut
+    with np.errstate(invalid='ignore'):
+        below_start = np.maximum(start, np.searchsorted(depth, base, side='left'))
+        below_stop = np.maximum(below_start, np.minimum(stop, edge))
+        above_start = np.maximum(start, low_rows)
+        above_stop = np.maximum(above_start, np.minimum(stop, np.searchsorted(depth, top, side='left')))
+    has_layer = ~np.isnan(top) & ~np.isnan(base)
+    below_stop = np.where(has_layer, below_stop, below_start)
+    above_stop = np.where(has_layer, above_stop, above_start)
+    both_start = np.maximum(above_start, below_start)
+    both_stop = np.maximum(both_start, np.minimum(above_stop, below_stop))
+
+    #rows counted as cut - every row, or only the ones that aren't blank cells
+    kept = np.arange(rows + 1) if blank is None else np.concatenate(([0], np.cumsum(~np.asarray(blank, dtype=bool))))
+    max_count = kept[below_stop] - kept[below_start]
+    min_count = (kept[above_stop] - kept[above_start]) - (kept[both_stop] - kept[both_start])
+
+    #same as window_segments, no shifting in layers thinner than the window
+    with np.errstate(invalid='ignore'):
+        thick = has_layer & ~(base - top < round(up + down - LAYER_MARGIN, 10))
+    zero_count = zero_count & thick
+    min_count = np.where(thick, min_count, 0)
+    max_count = np.where(thick, max_count, 0)
+
+    def term(first, last, active, sign):
+        first = np.where(active, first, 0)
+        last = np.where(active, np.maximum(first, last), 0)
+        return (first, last, sign)
+
+    everywhere = np.ones(rows, dtype=bool)
+    terms = [term(start, stop, everywhere, 1),
+             term(below_start, below_stop, everywhere, -1),
+             term(above_start, above_stop, everywhere, -1),
+             term(both_start, both_stop, everywhere, 1),
+             term(np.ones(rows, dtype=np.int64), np.minimum(max_datapoint + 1, rows), zero_count, 1),
+             term(min_datapoint + min_count, np.minimum(max_datapoint + min_count, rows), min_count > 0, 1),
+             term(np.maximum(min_datapoint - max_count + 1, 0), np.minimum(min_datapoint + 1, rows), max_count > 0, 1)]
+
+    return {'terms': terms, 'valid': ~np.isnan(depth) & ~in_gap}
+
+
+class PrefixIndex:
+    """
+    Cumulative sums of a sounding's parameters, so the count, mean and standard deviation over any rows or depth interval
+    are a couple of lookups instead of a scan of the data. Each parameter's sums are built (one pass, in float64 whatever the
+    values are stored as) the first time it's asked for, so parameters that are never averaged cost nothing. nans are ignored.
+
+    Values are summed relative to the parameter's mean, which keeps the sums of squares small enough not to lose precision.
+    The values themselves are kept too, for the order statistics (median, percentiles) that sums can't give, and the depths'
+    integer keys (gintdata.depth_keys), so picked depths are matched to rows exactly.
+
+    Parameters
+    ----------
+    depth : np.array of true depths, sorted
+
+    columns : dict of {parameter: np.array of values in the same order as depth}
+
+    blank : dict of {parameter: np.array of bool} True for the rows whose cell was None or "" (gintdata.blank_cells) - see window_segments
+    """
+
+    def __init__(self, depth, columns=None, blank=None):
+        self.depth = np.asarray(depth, dtype=np.float64)
+        self.keys = depth_keys(self.depth)
+        self.prefix: dict = {}
+        self.blank: dict = {}
+        self.values: dict = {}
+        for name, values in (columns or {}).items():
+            self.add(name, values, (blank or {}).get(name))
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def add(self, name, values, blank=None):
+        """Add (or replace) a parameter, e.g. a column read after the sounding was loaded - the values are kept as they are, not copied."""
+        #only kept for parameters that have empty cells
+        if blank is not None and np.any(blank):
+            self.blank[name] = np.asarray(blank, dtype=bool)
+        else:
+            self.blank.pop(name, None)
+        self.values[name] = np.asarray(values)
+        self.prefix.pop(name, None)
+
+    def _prefix(self, name) -> tuple:
+        #(shift, sums, squares, counts) of a parameter, built on first use
+        if name not in self.prefix:
+            values = self.values[name].astype(np.float64)
+            found = ~np.isnan(values)
+            shift = float(values[found].mean()) if found.any() else 0.0
+            centred = np.where(found, values - shift, 0.0)
+            self.prefix[name] = (shift, np.concatenate(([0.0], np.cumsum(centred))), np.concatenate(([0.0], np.cumsum(centred * centred))),
+                                 np.concatenate(([0], np.cumsum(found))))
+        return self.prefix[name]
+
+    def stats(self, name, segments, robust=False, percentiles=PERCENTILES, trim=TRIM) -> dict:
+        """
+        Count, mean and standard deviation (ddof=1, same as pandas) of a parameter over (start, stop) ranges of rows.
+
+        A row in more than one range counts more than once. The mean is nan if there's no data, the std is nan with fewer than 2 values.
+        With robust the median, trimmed mean, MAD and percentiles of the same rows are added (see robust_stats).
+        """
+        stats = self._sums(name, segments)
+        if robust:
+            rows = segment_rows(segments)
+            table = sorted_table(self.values[name][rows], [0], [len(rows)])
+            stats.update({key: float(value[0]) for key, value in robust_stats(table, percentiles, trim).items()})
+        return stats
+
+    def _sums(self, name, segments) -> dict:
+        (shift, sums, squares_sums, counts) = self._prefix(name)
+        total = 0.0
+        squares = 0.0
+        count = 0
+        for (start, stop) in segments:
+            total += sums[stop] - sums[start]
+            squares += squares_sums[stop] - squares_sums[start]
+            count += int(counts[stop] - counts[start])
+        if count == 0:
+            return {'count': 0, 'mean': np.nan, 'std': np.nan}
+        mean = total / count
+        std = np.sqrt(max(squares - total * mean, 0.0) / (count - 1)) if count > 1 else np.nan
+        return {'count': count, 'mean': float(shift + mean), 'std': float(std)}
+
+    def rows_between(self, top, base) -> tuple:
+        """(start, stop) of the rows with top <= depth <= base."""
+        return _rows_between(self.depth, 0, len(self.depth), float(top), float(base))
+
+    def interval(self, name, top, base) -> dict:
+        """Count, mean and std of a parameter between two depths, both included (e.g. a geol layer)."""
+        return self.stats(name, [self.rows_between(top, base)])
+
+    def rolling(self, name, top=None, base=None, up=WINDOW, down=WINDOW, tolerance=TOLERANCE) -> dict:
+        """
+        Rolling average of a parameter at every row, same window rules as window() (see rolling_segments), in a few array operations.
+
+        Returns {'count', 'mean', 'std'} as arrays in the same order as depth, nan where there's no window or no data.
+
+        Parameters
+        ----------
+        top, base : np.array of the top and base of the geol layer each row is in (nan if none)
+
+        up, down, tolerance : window around each depth, see window_segments
+        """
+        rolling = rolling_segments(self.depth, top, base, up, down, tolerance, self.blank.get(name))
+        (shift, sums, squares_sums, counts) = self._prefix(name)
+        total = np.zeros(len(self.depth))
+        squares = np.zeros(len(self.depth))
+        count = np.zeros(len(self.depth), dtype=np.int64)
+        for (start, stop, sign) in rolling['terms']:
+            total += sign * (sums[stop] - sums[start])
+            squares += sign * (squares_sums[stop] - squares_sums[start])
+            count += sign * (counts[stop] - counts[start])
+        count = np.where(rolling['valid'], count, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+            std = np.where(count > 1, np.sqrt(np.maximum(squares - total * mean, 0.0) / (count - 1)), np.nan)
+        return {'count': count, 'mean': shift + mean, 'std': std}
+
+    def layer_stats(self, names, tops, bases, robust=False, percentiles=PERCENTILES, trim=TRIM) -> dict:
+        """
+        Count, mean and std (ddof=1) of several parameters in every layer together, as {parameter: {'count', 'mean', 'std'}} of arrays
+        in layer order, nan where a layer has no data. Costs a searchsorted per layer boundary and a few lookups per parameter.
+
+        With robust the median, trimmed mean, MAD and percentiles are added, from one sorted table of the layers per parameter.
+        """
+        starts, stops = layer_rows(self.depth, tops, bases)
+        stats = {}
+        for name in names:
+            (shift, sums, squares_sums, counts) = self._prefix(name)
+            total = sums[stops] - sums[starts]
+            squares = squares_sums[stops] - squares_sums[starts]
+            count = counts[stops] - counts[starts]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, total / count, np.nan)
+                std = np.where(count > 1, np.sqrt(np.maximum(squares - total * mean, 0.0) / (count - 1)), np.nan)
+            stats[name] = {'count': count, 'mean': shift + mean, 'std': std}
+            if robust:
+                stats[name].update(robust_stats(sorted_table(self.values[name], starts, stops), percentiles, trim))
+        return stats
+
+    def sweep(self, name, windows, top=None, base=None, tolerance=TOLERANCE) -> dict:
+        """Rolling mean of a parameter for each of a list of (up, down) windows, as {(up, down): np.array}, all from the same prefix sums."""
+        return {(up, down): self.rolling(name, top, base, up, down, tolerance)['mean'] for (up, down) in windows}
+
+    def window(self, name, cpt_depth, layer=None, up=WINDOW, down=WINDOW, tolerance=TOLERANCE, robust=False, percentiles=PERCENTILES, trim=TRIM) -> dict:
+        """The window_segments result for a depth plus the count, mean and std of the parameter over it (and the robust stats with robust)."""
+        result = window_segments(self.depth, cpt_depth, layer, up, down, tolerance, self.blank.get(name))
+        result.update(self.stats(name, result['segments'], robust, percentiles, trim))
+        return result
@@ -0,0 +1,161 @@
+import os
+import abc
+import sqlite3
+import numpy as np
+import pandas as pd
+from common.gintdata import read_table, table_columns
+from common.ags4 import SCPT_COLUMNS, GEOL_COLUMNS, TEXT_COLUMNS, iter_boreholes
+
+#pyodbc and the Access driver are only needed for gINT projects, so SQLite and AGS4 still work without them (e.g. on linux)
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
+
+FILE_FILTER = 'gINT Project (*.gpj);; SQLite (*.db *.sqlite *.sqlite3);; AGS4 (*.ags)'
+
+
+class DataSource(abc.ABC):
+    """
+    Base class for a project that the POINT, STCN_DATA and GEOL tables (gINT schema) can be read from.
+
+    Subclasses implement read_table, returning a DataFrame with the same columns gINT would, and table_columns, so the rest of the app
+    doesn't need to know where the data came from. A subclass missing either can't be created.
+
+    Parameters
+    ----------
+    path : str location of the project file
+    """
+
+    def __init__(self, path):
+        self.path: str = path
+
+    @abc.abstractmethod
+    def read_table(self, table, point_ids=None, columns=None) -> pd.DataFrame:
+        """DataFrame of a table (gINT columns), only the rows of point_ids and the given columns if not None."""
+
+    @abc.abstractmethod
+    def table_columns(self, table) -> list:
+        """Every column of a table."""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AccessSource(DataSource):
+    """gINT project (.gpj) read with pyodbc and the 64-bit Microsoft Access driver."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        if pyodbc is None:
+            raise ConnectionError("Couldn't establish connection with gINT. pyodbc is not installed.")
+        try:
+            self.gint = pyodbc.connect(r'Driver={Microsoft Access Driver (*.mdb, *.accdb)};DBQ='+self.path+';')
+        except Exception as e:
+            raise ConnectionError(f"Couldn't establish connection with gINT. Please ensure you have Access Driver 64-bit installed. {e}")
+
+    def read_table(self, table, point_ids=None, columns=None) -> pd.DataFrame:
+        return read_table(self.gint, table, point_ids, columns)
+
+    def table_columns(self, table) -> list:
+        return table_columns(self.gint, table)
+
+    def close(self):
+        self.gint.close()
+
+
+class SQLiteSource(DataSource):
+    """SQLite database with the same POINT, STCN_DATA and GEOL tables as a gINT project."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.gint = sqlite3.connect(self.path)
+
+    def read_table(self, table, point_ids=None, columns=None) -> pd.DataFrame:
+        return read_table(self.gint, table, point_ids, columns)
+
+    def table_columns(self, table) -> list:
+        return table_columns(self.gint, table)
+
+    def close(self):
+        self.gint.close()
+
+
+class AGS4Source(DataSource):
+    """
+    AGS4 file read straight into the gINT schema, without importing it into gINT first.
+
+    The file is streamed once (common.ags4.iter_boreholes) into per-borehole arrays - LOCA gives POINT, SCPT gives STCN_DATA and GEOL gives GEOL.
+    SCPT_DPTH is already the true depth so it is stored in Depth with STCN_Depth = 0.
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.boreholes: dict = None
+
+    def read_table(self, table, point_ids=None, columns=None) -> pd.DataFrame:
+        if self.boreholes is None:
+            self.load()
+        if table not in self.boreholes:
+            raise ValueError(f"{table} can't be read from an AGS4 file.")
+        if columns is not None:
+            return self.read_table(table, point_ids)[columns]
+
+        blocks = self.boreholes[table]
+        if point_ids is not None:
+            point_ids = set(point_ids)
+            blocks = [(bh, n, arrays) for (bh, n, arrays) in blocks if bh in point_ids]
+
+        if table == 'POINT':
+            return pd.DataFrame({'PointID': pd.unique(np.array([bh for (bh, n, arrays) in blocks], dtype=object))})
+
+        columns = SCPT_COLUMNS if table == 'STCN_DATA' else GEOL_COLUMNS
+        data = {'PointID': np.repeat(np.array([bh for (bh, n, arrays) in blocks], dtype=object), [n for (bh, n, arrays) in blocks])}
+        for col in columns:
+            data[col] = np.concatenate([arrays[col] for (bh, n, arrays) in blocks]) if blocks else np.array([], dtype=object if col in TEXT_COLUMNS else np.float64)
+            if col == 'Depth' and table == 'STCN_DATA':
+                data['STCN_Depth'] = np.zeros(len(data['Depth']))
+        return pd.DataFrame(data)
+
+    def table_columns(self, table) -> list:
+        if table == 'POINT':
+            return ['PointID']
+        if table == 'STCN_DATA':
+            return ['PointID', 'ItemKey', 'Depth', 'STCN_Depth'] + [col for col in SCPT_COLUMNS if col not in ('ItemKey', 'Depth')]
+        if table == 'GEOL':
+            return ['PointID'] + list(GEOL_COLUMNS)
+        raise ValueError(f"{table} can't be read from an AGS4 file.")
+
+    def load(self):
+        self.boreholes = {'POINT': [], 'STCN_DATA': [], 'GEOL': []}
+        for (group, bh, n, arrays) in iter_boreholes(self.path):
+            table = {'LOCA': 'POINT', 'SCPT': 'STCN_DATA', 'GEOL': 'GEOL'}[group]
+            self.boreholes[table].append((bh, n, arrays))
+
+        #no LOCA group, use the boreholes that have data
+        if not self.boreholes['POINT']:
+            seen = dict.fromkeys(bh for (bh, n, arrays) in self.boreholes['STCN_DATA'] + self.boreholes['GEOL'])
+            self.boreholes['POINT'] = [(bh, 1, {}) for bh in seen]
+
+
+SOURCES = {'.gpj': AccessSource,
+           '.mdb': AccessSource,
+           '.accdb': AccessSource,
+           '.db': SQLiteSource,
+           '.sqlite': SQLiteSource,
+           '.sqlite3': SQLiteSource,
+           '.ags': AGS4Source}
+
+
+def open_source(path) -> DataSource:
+    """Open the right DataSource for a project file based on its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SOURCES:
+        raise ValueError(f"Can't open {os.path.basename(path)} - supported files are {', '.join(SOURCES)}")
+    return SOURCES[ext](path)
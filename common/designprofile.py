@@ -1,15 +1,349 @@
+import os
 import numpy as np
+import matplotlib
 from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
 import math
-import scipy as sc
+from scipy import stats
+from functools import lru_cache
 import sys
 import pandas as pd
 sys.stdout.reconfigure(encoding='utf-8')
 
+#confidence (%) of the upper and lower mean lines
+MEAN_CONFIDENCE = 95
+
+
+@lru_cache(maxsize=64)
+def quantile(level) -> tuple:
+    """
+    (z, upper quantile, lower quantile) of the normal distribution for a level in percent, e.g. 75 gives the z of the 75% quantile
+    and the labels "75%" and "25%" - any level above 50 and below 100 (95 for the 5%/95% characteristic values of EC7).
+    """
+    if not 50 < level < 100:
+        raise ValueError(f"The quantile has to be between 50 and 100, not {level}.")
+    return (float(stats.norm.ppf(level / 100)), f"{level:g}%", f"{100 - level:g}%")
+
+
+@lru_cache(maxsize=1024)
+def t_value(n, confidence=MEAN_CONFIDENCE) -> float:
+    """One sided t value of the Student's t distribution at confidence (%) for the mean of n observations (n - 1 degrees of freedom)."""
+    if n < 2:
+        return np.nan
+    return float(stats.t.ppf(confidence / 100, n - 1))
+
+
+def t_values(n, confidence=MEAN_CONFIDENCE) -> np.array:
+    """t_value of each count in n, each distinct count is only looked up once."""
+    counts, inverse = np.unique(np.asarray(n, dtype=np.int64), return_inverse=True)
+    return np.array([t_value(int(count), confidence) for count in counts], dtype=np.float64)[inverse]
+
+
+def linear_fit(x, y) -> tuple:
+    """
+    (slope, intercept, r) of a least squares line through (x, y), worked out the same way as scipy.stats.linregress
+    (means and the biased covariance matrix) so the numbers are the same, without the p-value and standard errors that aren't used.
+
+    The slope is nan when there are no points or all x are the same (linregress raises for those).
+    """
+    n = len(x)
+    if n == 0 or (n > 1 and np.amax(x) == np.amin(x)):
+        return (np.nan, np.nan, np.nan)
+    xy = np.array([x, y], dtype=np.float64)
+    xmean, ymean = xy.mean(axis=1)
+    xy -= np.array([[xmean], [ymean]])
+    (ssxm, ssxym), (_, ssym) = np.dot(xy, xy.T) * np.true_divide(1, n)
+    if ssxm == 0.0 or ssym == 0.0:
+        r = np.nan if ssxym == 0 else 0.0
+    else:
+        r = min(max(ssxym / np.sqrt(ssxm * ssym), -1.0), 1.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = ssxym / ssxm
+    return (slope, ymean - slope * xmean, r)
+
+
+#fields of a profile_batch result, one row per segment - top/bot values of each line and before/after outlier removal
+PROFILE_FIELDS = ['be_top', 'be_bot', 'lb_top', 'lb_bot', 'ub_top', 'ub_bot', 'upp_mean_95_top', 'upp_mean_95_bot',
+                  'low_mean_95_top', 'low_mean_95_bot', 'std_before', 'std_after', 'mean_before', 'mean_after']
+PROFILE_DTYPE = np.dtype([(field, np.float64) for field in PROFILE_FIELDS] + [('dependent', np.bool_), ('valid', np.bool_)])
+
+#column name of each field in the export, after the parameter's name (e.g. 'Qc Best Estimate TOP')
+PROFILE_COLUMNS = dict(zip(PROFILE_FIELDS, ['Best Estimate TOP', 'Best Estimate BOT', 'Lower Bounds TOP', 'Lower Bounds BOT',
+                                            'Upper Bounds TOP', 'Upper Bounds BOT',
+                                            'Mean at 95% Confidence (Upper) - TOP', 'Mean at 95% Confidence (Upper) - BOT',
+                                            'Mean at 95% Confidence (Lower) - TOP', 'Mean at 95% Confidence (Lower) - BOT',
+                                            'Standard Deviation - All Data', 'Standard Deviation - Outliers Removed',
+                                            'Mean - All Data', 'Mean - Outliers Removed']))
+
+#what a profile is derived from, one row per segment - neither depends on the quantile, so it can be re-derived for another
+#zvalue or model without fitting again (see profile_fits and profile_from_fits). dep/ind are whether each model was fitted
+FIT_FIELDS = ['std_before', 'mean_before', 'dep_top', 'dep_bot', 'dep_err', 'dep_mean_95', 'dep_std', 'dep_mean',
+              'ind_mean', 'ind_std', 'ind_mean_95']
+FIT_DTYPE = np.dtype([(field, np.float64) for field in FIT_FIELDS] + [('dep', np.bool_), ('ind', np.bool_), ('valid', np.bool_)])
+
+#models fitted for each model that can be picked, AUTO needs both to compare their standard deviations
+MODEL_FITS = {"DEP": ("DEP",), "IND": ("IND",), "AUTO": ("DEP", "IND")}
+
+def _segment_fit(seg, x, y, count, segments):
+    """Per segment count-weighted means, (slope, intercept, r) and population std of y, same arithmetic as linear_fit."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xmean = np.bincount(seg, weights=x, minlength=segments) / count
+        ymean = np.bincount(seg, weights=y, minlength=segments) / count
+        dx = x - xmean[seg]
+        dy = y - ymean[seg]
+        ssxm = np.bincount(seg, weights=dx * dx, minlength=segments) / count
+        ssxym = np.bincount(seg, weights=dx * dy, minlength=segments) / count
+        ssym = np.bincount(seg, weights=dy * dy, minlength=segments) / count
+        xmin = np.full(segments, np.inf)
+        xmax = np.full(segments, -np.inf)
+        np.minimum.at(xmin, seg, x)
+        np.maximum.at(xmax, seg, x)
+        same_x = (count > 1) & (xmin == xmax)
+        r = np.where((ssxm == 0.0) | (ssym == 0.0), np.where(ssxym == 0, np.nan, 0.0), np.clip(ssxym / np.sqrt(ssxm * ssym), -1.0, 1.0))
+        slope = np.where((count == 0) | same_x, np.nan, ssxym / ssxm)
+        r = np.where((count == 0) | same_x, np.nan, r)
+        intercept = ymean - slope * xmean
+    return {'slope': slope, 'intercept': intercept, 'r': r, 'mean': ymean, 'std': np.sqrt(ssym)}
+
+
+def _dependent_fit(seg, x, y, n, fit, top, bot, tvalue, segments) -> dict:
+    """profile_fits fields of the dependent model - outliers from the regression line, then refitted."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2_cor = (1-(1-fit['r']**2)*(n-1)/(n-1-1))
+        std_err_y_est = np.sqrt(1-r2_cor)*fit['std']
+        line = fit['slope'][seg] * x + fit['intercept'][seg]
+        keep = (y >= line - std_err_y_est[seg] * 1.96) & (y <= line + std_err_y_est[seg] * 1.96)
+        n_DEP = np.bincount(seg[keep], minlength=segments).astype(np.float64)
+        dep = _segment_fit(seg[keep], x[keep], y[keep], n_DEP, segments)
+        r2_cor_new_DEP = (1-(1-dep['r']**2)*(n_DEP-1)/(n_DEP-2))
+        std_err_y_est_new_DEP = np.sqrt(1-r2_cor_new_DEP)*dep['std']
+        mean_95 = tvalue * fit['std'] * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
+    return {'dep_top': dep['slope'] * top + dep['intercept'], 'dep_bot': dep['slope'] * bot + dep['intercept'],
+            'dep_err': std_err_y_est_new_DEP, 'dep_mean_95': mean_95, 'dep_std': dep['std'], 'dep_mean': dep['mean']}
+
+
+def _independent_fit(seg, y, n, fit, tvalue, segments) -> dict:
+    """profile_fits fields of the independent model - outliers from the mean, then the mean and std again."""
+    mean = fit['mean']
+    std = fit['std']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        keep = (y >= (mean - std * 1.96)[seg]) & (y <= (mean + std * 1.96)[seg])
+        n_IND = np.bincount(seg[keep], minlength=segments).astype(np.float64)
+        mean_new_IND = np.bincount(seg[keep], weights=y[keep], minlength=segments) / n_IND
+        dev = y[keep] - mean_new_IND[seg[keep]]
+        std_new_IND = np.sqrt(np.bincount(seg[keep], weights=dev * dev, minlength=segments) / n_IND)
+        mean_95 = tvalue * (std / np.sqrt(n))
+    return {'ind_mean': mean_new_IND, 'ind_std': std_new_IND, 'ind_mean_95': mean_95}
+
+
+def profile_fits(param, depth, offsets, models=("DEP", "IND")) -> np.array:
+    """
+    The regressions and outlier removal of profile_batch for each segment, without the quantile - see profile_from_fits.
+
+    Returns a structured array (FIT_DTYPE) with a row per segment, the fields of a model that isn't in models are nan.
+
+    Parameters
+    ----------
+    param, depth, offsets : same as profile_batch
+
+    models : the models to fit, "DEP" and/or "IND" (MODEL_FITS gives the ones a model needs)
+    """
+    param = np.asarray(param, dtype=np.float64)
+    depth = np.asarray(depth, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    segments = len(offsets) - 1
+    fits = np.zeros(max(segments, 0), dtype=FIT_DTYPE)
+    for field in FIT_FIELDS:
+        fits[field] = np.nan
+    if segments <= 0:
+        return fits
+
+    size = np.diff(offsets)
+    seg = np.repeat(np.arange(segments), size)
+    found = ~np.isnan(param[offsets[0]:offsets[-1]])
+    seg = seg[found]
+    x = depth[offsets[0]:offsets[-1]][found]
+    y = param[offsets[0]:offsets[-1]][found]
+    n = np.bincount(seg, minlength=segments).astype(np.float64)
+
+    #top and bottom depth of the data in each segment
+    first = np.concatenate(([0], np.cumsum(n)[:-1])).astype(np.int64)
+    top = np.where(n > 0, x[np.minimum(first, max(len(x) - 1, 0))] if len(x) else np.nan, np.nan)
+    bot = np.where(n > 0, x[np.maximum(np.minimum(first + n.astype(np.int64) - 1, len(x) - 1), 0)] if len(x) else np.nan, np.nan)
+
+    tvalue = t_values(n)
+
+    fit = _segment_fit(seg, x, y, n, segments)
+    fits['valid'] = (size > 4) & (n > 4) & ~np.isnan(fit['slope']) & ~(fit['r'] == 0.0)
+    fits['std_before'] = fit['std']
+    fits['mean_before'] = fit['mean']
+
+    if "DEP" in models:
+        for (field, values) in _dependent_fit(seg, x, y, n, fit, top, bot, tvalue, segments).items():
+            fits[field] = values
+        fits['dep'] = True
+    if "IND" in models:
+        for (field, values) in _independent_fit(seg, y, n, fit, tvalue, segments).items():
+            fits[field] = values
+        fits['ind'] = True
+    return fits
+
+
+def profile_from_fits(fits, model, zvalue) -> np.array:
+    """
+    The profile_batch rows (PROFILE_DTYPE) of profile_fits rows for a model and zvalue - only arithmetic on each row, no refitting.
+    The fits need the models in MODEL_FITS[model].
+    """
+    fits = np.asarray(fits, dtype=FIT_DTYPE)
+    result = np.zeros(len(fits), dtype=PROFILE_DTYPE)
+    for field in PROFILE_FIELDS:
+        result[field] = np.nan
+    #same as profile(), nothing is valid with any other model
+    if model not in MODEL_FITS:
+        return result
+    z_val = quantile(zvalue)[0]
+
+    if model == "DEP":
+        dependent = np.ones(len(fits), dtype=bool)
+    elif model == "IND":
+        dependent = np.zeros(len(fits), dtype=bool)
+    else:
+        dependent = ~(fits['ind_std'] < fits['dep_std'])
+
+    with np.errstate(invalid='ignore'):
+        dep_top = fits['dep_top']
+        dep_bot = fits['dep_bot']
+        ind = fits['ind_mean']
+        result['be_top'] = np.where(dependent, dep_top, ind)
+        result['be_bot'] = np.where(dependent, dep_bot, ind)
+        result['lb_top'] = np.where(dependent, dep_top - fits['dep_err'] * z_val, ind - fits['ind_std'] * z_val)
+        result['lb_bot'] = np.where(dependent, dep_bot - fits['dep_err'] * z_val, ind - fits['ind_std'] * z_val)
+        result['ub_top'] = np.where(dependent, dep_top + fits['dep_err'] * z_val, ind + fits['ind_std'] * z_val)
+        result['ub_bot'] = np.where(dependent, dep_bot + fits['dep_err'] * z_val, ind + fits['ind_std'] * z_val)
+        result['upp_mean_95_top'] = np.where(dependent, dep_top + fits['dep_mean_95'], ind + fits['ind_mean_95'])
+        result['upp_mean_95_bot'] = np.where(dependent, dep_bot + fits['dep_mean_95'], ind + fits['ind_mean_95'])
+        result['low_mean_95_top'] = np.where(dependent, dep_top - fits['dep_mean_95'], ind - fits['ind_mean_95'])
+        result['low_mean_95_bot'] = np.where(dependent, dep_bot - fits['dep_mean_95'], ind - fits['ind_mean_95'])
+    result['std_before'] = fits['std_before']
+    result['std_after'] = np.where(dependent, fits['dep_std'], fits['ind_std'])
+    result['mean_before'] = fits['mean_before']
+    result['mean_after'] = np.where(dependent, fits['dep_mean'], fits['ind_mean'])
+    result['dependent'] = dependent
+    result['valid'] = fits['valid']
+    for field in PROFILE_FIELDS:
+        result[field] = np.where(fits['valid'], result[field], np.nan)
+    return result
+
+
+def profile_batch(param, depth, offsets, model, zvalue) -> np.array:
+    """
+    DesignProfile.profile for many segments (e.g. every layer and parameter of a borehole) in one vectorised pass, without plotting.
+
+    The segments are concatenated into param and depth, segment i being param[offsets[i]:offsets[i + 1]]. The sums are taken
+    per segment with bincount, so the numbers match profile() to rounding rather than bit for bit. Only the models the model
+    needs are fitted (MODEL_FITS).
+
+    Returns a structured array (PROFILE_DTYPE) with a row per segment - valid is False where profile() returns None.
+
+    Parameters
+    ----------
+    param : np.array of the values of every segment, nan for no data
+
+    depth : np.array of the depths, same order as param
+
+    offsets : np.array of the start of each segment in param, plus the end of the last one
+
+    model, zvalue : same as DesignProfile
+    """
+    if model not in MODEL_FITS:
+        return profile_from_fits(np.zeros(max(len(offsets) - 1, 0), dtype=FIT_DTYPE), model, zvalue)
+    return profile_from_fits(profile_fits(param, depth, offsets, MODEL_FITS[model]), model, zvalue)
+
+
+def as_profile(row) -> list:
+    """A profile_batch row as lists of [top, bot] ([be, lb, ub, upp_mean_95, low_mean_95, std, mean]) for plotting, None if not valid."""
+    if not row['valid']:
+        return None
+    return [[row[f'{name}_top'], row[f'{name}_bot']] for name in ['be', 'lb', 'ub', 'upp_mean_95', 'low_mean_95']] + \
+           [[row['std_before'], row['std_after']], [row['mean_before'], row['mean_after']]]
+
+
+
+def draw_profile(graph, depth, param, lb, ub, be, upp_mean_95, low_mean_95, quant_low, quant_upp, name, mode):
+    """Draw a layer's data and profile lines on a matplotlib axes - the plot of DesignProfile.plotting and each page of a ProfilePdf."""
+    graph.plot(lb, [depth[0],depth[-1]],color = 'r',alpha = 0.5, label = f'lower bounds {quant_low} quantile')
+    graph.plot(ub, [depth[0],depth[-1]],color = 'g',alpha = 0.5, label = f'upper bounds {quant_upp} quantile')
+    graph.plot(be, [depth[0],depth[-1]],color = 'black',alpha = 0.5, label = 'best estimate')
+    graph.plot(upp_mean_95, [depth[0],depth[-1]],color = 'purple',alpha = 0.5, label = f'mean at 95% confidence', linestyle='dashed')
+    graph.plot(low_mean_95, [depth[0],depth[-1]],color = 'purple',alpha = 0.5, linestyle='dashed')
+    graph.set_title(f'{name} - {mode}', y=1.0, pad=35)
+    unit = str(name).split("-")[0].split("(")[0]
+    graph.scatter(param, depth, s=12, color = 'b', label = f'{unit}')
+    graph.invert_yaxis()
+    graph.legend(loc='upper center', bbox_to_anchor=(0.5, 1.05),ncol=3, fancybox=True, shadow=True)
+    graph.set_ylabel('Depth (m)')
+    graph.set_xlabel(f'{str(name).split("—")[0]}', loc='center')
+
+
+class ProfilePdf:
+    """
+    A multi-page PDF of profile plots (e.g. every layer and parameter of a borehole), drawn on one figure that's cleared for each page
+    and closed with the file.
+
+    The figure isn't made through pyplot, so nothing keeps it alive after close and it renders with Agg in a thread or worker process
+    whatever the GUI backend is.
+
+    Parameters
+    ----------
+    path : str PDF file to write, only created once a page is added
+    """
+
+    def __init__(self, path):
+        self.path: str = path
+        self.figure: Figure = Figure(figsize=(7.0,12.5))
+        FigureCanvasAgg(self.figure)
+        self.figure.subplots_adjust(left  = 0.1, right = 0.925, bottom = 0.095, top = 0.89, wspace = 0.2, hspace = 0.2)
+        self.graph = self.figure.add_subplot(1, 1, 1)
+        self.pdf: PdfPages = None
+        self.pages: int = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, param, depth, row, name, zvalue):
+        """Add a page with the plot of a valid profile_batch row for the layer's param and depth."""
+        param = np.asarray(param, dtype=np.float64)
+        depth = np.asarray(depth, dtype=np.float64)
+        found = ~np.isnan(param)
+        be, lb, ub, upp_mean_95, low_mean_95 = as_profile(row)[:5]
+        mode = "Depth Dependent" if row['dependent'] else "Independent of Depth"
+        z_val, quant_upp, quant_low = quantile(zvalue)
+        if self.pdf is None:
+            self.pdf = PdfPages(self.path)
+        #the font size is read as the artists are made, so it's set for each page without changing rcParams
+        with matplotlib.rc_context({'font.size': 8}):
+            self.graph.clear()
+            draw_profile(self.graph, depth[found], param[found], lb, ub, be, upp_mean_95, low_mean_95, quant_low, quant_upp, name, mode)
+            self.pdf.savefig(self.figure, dpi=200.0)
+        self.pages += 1
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+            self.pdf = None
+        self.figure.clear()
+
+
 class DesignProfile:    
     """
     Perform statistical analysis on two lists (x,y) for linear regression (scipy) to determine best estimate, lower and upper bounds of (x) data.
-    Removes outliers with independant or dependant models and returns list of lists with top/bot bot values of best estimate, lower bounds, upper bounds as: [[be_top,be_bot][lb_top,lb_bot][ub_top,ub_bot]]
+    Removes outliers with independant or dependant models and returns a PROFILE_DTYPE record with the top/bot values of best estimate, lower bounds, upper bounds,
+    mean at 95% confidence and the standard deviation and mean before/after removing outliers (record['be_top'], record['lb_bot'] etc.)
 
     Parameters
     ----------
@@ -31,9 +365,9 @@ class DesignProfile:
 
         -/+ used to determine lower/upper bounds
 
-    zvalue : int = 60, 65, 70, 75, 80, 85, 90, 95
+    zvalue : float above 50 and below 100
 
-        pass an int to select quantile of lower/upper bounds based on table of normal distribtion with examples:
+        pass the quantile (%) of lower/upper bounds, z is from the normal distribution (see quantile) with examples:
 
         70 = 70% & 30% quantile
 
@@ -46,357 +380,148 @@ class DesignProfile:
     plot : bool = True for plotting (x,y) with matplotlib for QA of model type or upper/lower bounds and best estimate
 
     save : str = directory to save export of plots
+
+    verbose : bool = True to print the profile values to the console
     """
     
-    def __init__(self, param, depth, name, model, zvalue, plot, save):
+    def __init__(self, param, depth, name, model, zvalue, plot, save, verbose=False):
         self.param: list = param
         self.depth: list = depth
         self.name: str = name
         self.model: str = model
-        self.zvalue: int = zvalue
+        self.zvalue: float = zvalue
         self.plot: bool = plot
         self.save: str = save
+        self.verbose: bool = verbose
         self.depth_range: list = None
         self.mode: str = None
         self.quant_upp: str = None
         self.quant_low: str = None
 
-    def profile(self) -> list:
-        NoneType= type(None)
-
-        if len(self.param) <= 4 or all(isinstance(x, NoneType) for x in self.param):
+    def profile(self) -> np.void:
+        param = np.asarray(self.param)
+        depth = np.asarray(self.depth, dtype=np.float64)
+        #only the models that can be picked are worked out, AUTO needs both to compare their standard deviations
+        dependent_model = self.model in ["DEP", "AUTO"]
+        independent_model = self.model in ["IND", "AUTO"]
+        if len(param) <= 4 or not (dependent_model or independent_model):
             return
 
-        if any(isinstance(x, str) for x in self.param):
-            param = [float(param) for iter,(param,depth) in enumerate(zip(self.param,self.depth)) if not param == ""]
-            depth = [float(depth) for iter,(param,depth) in enumerate(zip(self.param,self.depth)) if not param == ""]
-        param = [param for iter,(param,depth) in enumerate(zip(self.param,self.depth)) if not np.isnan(param)]
-        depth = [depth for iter,(param,depth) in enumerate(zip(self.param,self.depth)) if not np.isnan(param)]
-
-        if self.zvalue == 60:
-            z_val = 0.26
-            self.quant_upp = "60%"
-            self.quant_low = "40%"
-        if self.zvalue == 65:
-            z_val = 0.39
-            self.quant_upp = "65%"
-            self.quant_low = "35%"
-        if self.zvalue == 70:
-            z_val = 0.53
-            self.quant_upp = "70%"
-            self.quant_low = "30%"
-        if self.zvalue == 75:
-            z_val = 0.68
-            self.quant_upp = "75%"
-            self.quant_low = "25%"
-        if self.zvalue == 80:
-            z_val = 0.85
-            self.quant_upp = "80%"
-            self.quant_low = "20%"
-        if self.zvalue == 85:
-            z_val = 1.04
-            self.quant_upp = "85%"
-            self.quant_low = "15%"
-        if self.zvalue == 90:
-            z_val = 1.29
-            self.quant_upp = "90%"
-            self.quant_low = "10%"
-        if self.zvalue == 95:
-            z_val = 1.65
-            self.quant_upp = "95%"
-            self.quant_low = "5%"
-        
-        param = np.array(param)
-        depth = np.array(depth)
-    
+        #empty strings and None are no data, same as the nans
+        if not np.issubdtype(param.dtype, np.number):
+            param = pd.to_numeric(pd.Series(param), errors='coerce').to_numpy(dtype=np.float64)
+        param = param.astype(np.float64)
+        found = ~np.isnan(param)
+        param = param[found]
+        depth = depth[found]
+
+        z_val, self.quant_upp, self.quant_low = quantile(self.zvalue)
+
         if len(param) <= 4:
             return
 
         n = len(param) # number of observations
 
-        # select tvalue for 95% confidence based on the number of observations (sample size)
-            
-        if n <= 5:
-            tvalue = 2.015
-        if n == 6:
-            tvalue = 1.943
-        if n == 7:
-            tvalue = 1.895
-        if n == 8:
-            tvalue = 1.86
-        if n == 9:
-            tvalue = 1.833
-        if n == 10:
-            tvalue = 1.812
-        if n == 11:
-            tvalue = 1.796
-        if n == 12:
-            tvalue = 1.782
-        if n == 13:
-            tvalue = 1.771
-        if n == 14:
-            tvalue = 1.761
-        if n == 15:
-            tvalue = 1.753
-        if n == 16:
-            tvalue = 1.746
-        if n == 17:
-            tvalue = 1.74
-        if n == 18:
-            tvalue = 1.734
-        if n == 19:
-            tvalue = 1.729
-        if n == 20:
-            tvalue = 1.725
-        if n == 21:
-            tvalue = 1.721
-        if n == 22:
-            tvalue = 1.717
-        if n == 23:
-            tvalue = 1.714
-        if n == 24:
-            tvalue = 1.711
-        if n == 25:
-            tvalue = 1.708
-        if n == 26:
-            tvalue = 1.706
-        if n == 27:
-            tvalue = 1.703
-        if n == 28:
-            tvalue = 1.701
-        if n == 29:
-            tvalue = 1.699
-        if n == 30:
-            tvalue = 1.697
-        if n > 30 and n <= 35:
-            tvalue = 1.69
-        if n > 35 and n <= 40:
-            tvalue = 1.684
-        if n > 40 and n <= 45:
-            tvalue = 1.679
-        if n > 45 and n <= 50:
-            tvalue = 1.676
-        if n > 50 and n <= 60:
-            tvalue = 1.671
-        if n > 60 and n <= 70:
-            tvalue = 1.667
-        if n > 70 and n <= 80:
-            tvalue = 1.664
-        if n > 80 and n <= 100:
-            tvalue = 1.66
-        if n > 100:
-            tvalue = 1.645
-
-        inital_regression = sc.stats.linregress(depth,param)
+        # tvalue for the mean at 95% confidence based on the number of observations (sample size)
+        tvalue = t_value(n)
+
+        inital_regression = linear_fit(depth, param)
 
         if math.isnan(inital_regression[0]) or inital_regression[2] == 0.0:
-            print('help')
+            if self.verbose:
+                print(f'{self.name}: no regression through the data, not profiled')
             return
 
-        mean = np.array(param).mean()
-        std = np.array(param).std()
+        mean = param.mean()
+        std = param.std()
 
-        #print(f'''initial regression:
-#{inital_regression}''')
+        if dependent_model:
+            '''dependent model'''
 
-        r2 = inital_regression[2]**2 # R squared
-        r2_cor = (1-(1-r2)*(n-1)/(n-1-1)) # R squared corrected
-        std_err_y_est = np.sqrt(1-r2_cor)*std # standard error y estimate from R squared corrected
-        slope = inital_regression[0] # slope from linear regressions
-        intrcpt = inital_regression[1] # intercept from linear regression
+            r2 = inital_regression[2]**2 # R squared
+            r2_cor = (1-(1-r2)*(n-1)/(n-1-1)) # R squared corrected
+            std_err_y_est = np.sqrt(1-r2_cor)*std # standard error y estimate from R squared corrected
+            slope = inital_regression[0] # slope from linear regressions
+            intrcpt = inital_regression[1] # intercept from linear regression
 
-        #print(f'standard error y estimate: {std_err_y_est}')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                line = slope * depth + intrcpt
+                keep_DEP = (param >= line - std_err_y_est * 1.96) & (param <= line + std_err_y_est * 1.96)
+                param_DEP = param[keep_DEP]
+                depth_DEP = depth[keep_DEP]
 
+                profile_DEP = linear_fit(depth_DEP, param_DEP) # new dataset with outliers removed
 
-        '''dependent model'''
+                n_DEP = len(param_DEP)
+                mean_new_DEP = param_DEP.mean() if n_DEP else np.nan
+                std_new_DEP = param_DEP.std() if n_DEP else np.nan
+                r2_new_DEP = profile_DEP[2]**2
+                r2_cor_new_DEP = (1-(1-r2_new_DEP)*(n_DEP-1)/np.float64(n_DEP-2))
+                std_err_y_est_new_DEP = np.sqrt(1-r2_cor_new_DEP)*std_new_DEP
 
-        param_DEP = [param for iter,(param,depth) in enumerate(zip(param,depth)) if param >= (slope * depth + intrcpt - std_err_y_est * 1.96) and param <= (slope * depth + intrcpt + std_err_y_est * 1.96)]
-        depth_DEP = [depth for iter,(param,depth) in enumerate(zip(param,depth)) if param >= (slope * depth + intrcpt - std_err_y_est * 1.96) and param <= (slope * depth + intrcpt + std_err_y_est * 1.96)]
+        if independent_model:
+            '''independent model'''
 
-        profile_DEP = sc.stats.linregress(depth_DEP,param_DEP) # new dataset with outliers removed
+            param_IND = param[(param >= (mean - std * 1.96)) & (param <= (mean + std * 1.96))]
 
-        n_DEP = len(param_DEP)
-        mean_new_DEP = np.array(param_DEP).mean()
-        std_new_DEP = np.array(param_DEP).std()
-        r2_new_DEP = profile_DEP[2]**2
-        r2_cor_new_DEP = (1-(1-r2_new_DEP)*(n_DEP-1)/(n_DEP-2))
-        std_err_y_est_new_DEP = np.sqrt(1-r2_cor_new_DEP)*std_new_DEP
+            mean_new_IND = param_IND.mean() if len(param_IND) else np.nan # new mean on dataset with outliers removed
+            std_new_IND = param_IND.std() if len(param_IND) else np.nan # new standard deviations on dataset with outliers removed
 
+        '''auto model''' # determines best model to use based on lesser value of standard deviation of new dataset of each model 
 
-        '''independent model'''
-
-        param_IND = [param for iter,(param,depth) in enumerate(zip(param,depth)) if param >= (mean - std * 1.96) and param <= (mean + std * 1.96)]
-
-        mean_new_IND = np.array(param_IND).mean() # new mean on dataset with outliers removed
-        std_new_IND = np.array(param_IND).std() # new standard deviations on dataset with outliers removed
-
-        profile_IND = [mean_new_IND, std_new_IND]
+        dependent = not independent_model or (dependent_model and not std_new_IND < std_new_DEP)
 
-        if self.model == "DEP":
+        if dependent:
             self.mode = "Depth Dependent"
-            #print(f'''~DEPENDENT~
-#new linear regression on new dataset without outliers
-#{profile_DEP}''')
 
+            top_be = profile_DEP[0] * depth[0] + profile_DEP[1]
+            bot_be = profile_DEP[0] * depth[-1] + profile_DEP[1]
             top_lb = profile_DEP[0] * depth[0] + profile_DEP[1] - std_err_y_est_new_DEP * z_val
             top_ub = profile_DEP[0] * depth[0] + profile_DEP[1] + std_err_y_est_new_DEP * z_val
-            top_be = profile_DEP[0] * depth[0] + profile_DEP[1]
-
             bot_lb = profile_DEP[0] * depth[-1] + profile_DEP[1] - std_err_y_est_new_DEP * z_val
             bot_ub = profile_DEP[0] * depth[-1] + profile_DEP[1] + std_err_y_est_new_DEP * z_val
-            bot_be = profile_DEP[0] * depth[-1] + profile_DEP[1]
 
-            low_mean_95_top = profile_DEP[0] * depth[0] + profile_DEP[1] - tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-            low_mean_95_bot = profile_DEP[0] * depth[-1] + profile_DEP[1] - tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-
-            upp_mean_95_top = profile_DEP[0] * depth[0] + profile_DEP[1] + tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-            upp_mean_95_bot = profile_DEP[0] * depth[-1] + profile_DEP[1] + tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
+            mean_95 = tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
+            upp_mean_95 = [profile_DEP[0] * depth[0] + profile_DEP[1] + mean_95, profile_DEP[0] * depth[-1] + profile_DEP[1] + mean_95]
+            low_mean_95 = [profile_DEP[0] * depth[0] + profile_DEP[1] - mean_95, profile_DEP[0] * depth[-1] + profile_DEP[1] - mean_95]
 
             std2 = std_new_DEP
             mean2 = mean_new_DEP
 
-            print('------------------------------------------')
-            print(self.name,self.mode)
-            print(f'Best Estimate | TOP: {top_be}, BOT: {bot_be}')
-            print(f'Lower Bounds | TOP: {top_lb}, BOT: {bot_lb}')
-            print(f'Upper Bounds | TOP: {top_ub}, BOT: {bot_ub}')
-            print(f'Upper Mean 95% | TOP: {upp_mean_95_top}, BOT: {upp_mean_95_bot}')
-            print(f'Lower Mean 95% | TOP: {low_mean_95_top}, BOT: {low_mean_95_bot}')
-            print(f'Standard deviation (Before): {std}, (After): {std2}')
-            print(f'Mean (Before): {mean}, (After): {mean2}')
-            print('------------------------------------------')
-            lb = [top_lb, bot_lb]
-            ub = [top_ub, bot_ub]
-            be = [top_be, bot_be]
-            upp_mean_95 = [upp_mean_95_top, upp_mean_95_bot]
-            low_mean_95 = [low_mean_95_top, low_mean_95_bot]
-            std_arr = [std, std2]
-            mean_arr = [mean, mean2]
-
-        if self.model == "IND":
+        else:
             self.mode = "Independent of Depth"
-            #print(f'''~INDEPENDENT~
-#independent mean and standard deviation:
-#{profile_IND}''')
-            
-            top_lb = profile_IND[0] - profile_IND[1] * z_val
-            top_ub = profile_IND[0] + profile_IND[1] * z_val
-            top_be = profile_IND[0] 
 
-            bot_lb = profile_IND[0] - profile_IND[1] * z_val
-            bot_ub = profile_IND[0] + profile_IND[1] * z_val
-            bot_be = profile_IND[0] 
+            top_be = bot_be = mean_new_IND
+            top_lb = bot_lb = mean_new_IND - std_new_IND * z_val
+            top_ub = bot_ub = mean_new_IND + std_new_IND * z_val
 
-            low_mean_95_top_bot = mean_new_IND - tvalue * (std / np.sqrt(n))
-            upp_mean_95_top_bot = mean_new_IND + tvalue * (std / np.sqrt(n))
+            upp_mean_95 = [mean_new_IND + tvalue * (std / np.sqrt(n))] * 2
+            low_mean_95 = [mean_new_IND - tvalue * (std / np.sqrt(n))] * 2
 
             std2 = std_new_IND
             mean2 = mean_new_IND
 
+        if self.verbose:
             print('------------------------------------------')
             print(self.name,self.mode)
             print(f'Best Estimate | TOP: {top_be}, BOT: {bot_be}')
             print(f'Lower Bounds | TOP: {top_lb}, BOT: {bot_lb}')
             print(f'Upper Bounds | TOP: {top_ub}, BOT: {bot_ub}')
-            print(f'Upper Mean 95% | TOP: {upp_mean_95_top_bot}, BOT: {upp_mean_95_top_bot}')
-            print(f'Lower Mean 95% | TOP: {low_mean_95_top_bot}, BOT: {low_mean_95_top_bot}')
+            print(f'Upper Mean 95% | TOP: {upp_mean_95[0]}, BOT: {upp_mean_95[1]}')
+            print(f'Lower Mean 95% | TOP: {low_mean_95[0]}, BOT: {low_mean_95[1]}')
             print(f'Standard deviation (Before): {std}, (After): {std2}')
             print(f'Mean (Before): {mean}, (After): {mean2}')
             print('------------------------------------------')
-            lb = [top_lb, bot_lb]
-            ub = [top_ub, bot_ub]
-            be = [top_be, bot_be]
-            upp_mean_95 = [upp_mean_95_top_bot, upp_mean_95_top_bot]
-            low_mean_95 = [low_mean_95_top_bot, low_mean_95_top_bot]
-            std_arr = [std, std2]
-            mean_arr = [mean, mean2]
-
-        '''auto model''' # determines best model to use based on lesser value of standard deviation of new dataset of each model 
-
-        if self.model == "AUTO":
-            if std_new_IND < std_new_DEP:
-                self.mode = "Independent of Depth"
-                #print(f'''~INDEPENDENT~
-#independant mean and standard deviation:
-#{profile_IND}''')
-                
-                top_lb = profile_IND[0] - profile_IND[1] * z_val
-                top_ub = profile_IND[0] + profile_IND[1] * z_val
-                top_be = profile_IND[0] 
-
-                bot_lb = profile_IND[0] - profile_IND[1] * z_val
-                bot_ub = profile_IND[0] + profile_IND[1] * z_val
-                bot_be = profile_IND[0] 
-
-                low_mean_95_top_bot = mean_new_IND - tvalue * (std / np.sqrt(n))
-                upp_mean_95_top_bot = mean_new_IND + tvalue * (std / np.sqrt(n))
-
-                std2 = std_new_IND
-                mean2 = mean_new_IND
-
-                print('------------------------------------------')
-                print(self.name,self.mode)
-                print(f'Best Estimate | TOP: {top_be}, BOT: {bot_be}')
-                print(f'Lower Bounds | TOP: {top_lb}, BOT: {bot_lb}')
-                print(f'Upper Bounds | TOP: {top_ub}, BOT: {bot_ub}')
-                print(f'Upper Mean 95% | TOP: {upp_mean_95_top_bot}, BOT: {upp_mean_95_top_bot}')
-                print(f'Lower Mean 95% | TOP: {low_mean_95_top_bot}, BOT: {low_mean_95_top_bot}')
-                print(f'Standard deviation (Before): {std}, (After): {std2}')
-                print(f'Mean (Before): {mean}, (After): {mean2}')
-                print('------------------------------------------')
-                lb = [top_lb, bot_lb]
-                ub = [top_ub, bot_ub]
-                be = [top_be, bot_be]
-                upp_mean_95 = [upp_mean_95_top_bot, upp_mean_95_top_bot]
-                low_mean_95 = [low_mean_95_top_bot, low_mean_95_top_bot]
-                std_arr = [std, std2]
-                mean_arr = [mean, mean2]
-
-            else:
-                self.mode = "Depth Dependent"
-                #print(f'''~DEPENDENT~
-#new linear regression on new dataset without outliers:
-#{profile_DEP}''')
-
-                top_lb = profile_DEP[0] * depth[0] + profile_DEP[1] - std_err_y_est_new_DEP * z_val
-                top_ub = profile_DEP[0] * depth[0] + profile_DEP[1] + std_err_y_est_new_DEP * z_val
-                top_be = profile_DEP[0] * depth[0] + profile_DEP[1]
-
-                bot_lb = profile_DEP[0] * depth[-1] + profile_DEP[1] - std_err_y_est_new_DEP * z_val
-                bot_ub = profile_DEP[0] * depth[-1] + profile_DEP[1] + std_err_y_est_new_DEP * z_val
-                bot_be = profile_DEP[0] * depth[-1] + profile_DEP[1]
-
-                low_mean_95_top = profile_DEP[0] * depth[0] + profile_DEP[1] - tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-                low_mean_95_bot = profile_DEP[0] * depth[-1] + profile_DEP[1] - tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-
-                upp_mean_95_top = profile_DEP[0] * depth[0] + profile_DEP[1] + tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-                upp_mean_95_bot = profile_DEP[0] * depth[-1] + profile_DEP[1] + tvalue * std * (np.sqrt((1 / n) + (3 * n / (n * n - 1))))
-
-                std2 = std_new_DEP
-                mean2 = mean_new_DEP
-
-                print('------------------------------------------')
-                print(self.name,self.mode)
-                print(f'Best Estimate | TOP: {top_be}, BOT: {bot_be}')
-                print(f'Lower Bounds | TOP: {top_lb}, BOT: {bot_lb}')
-                print(f'Upper Bounds | TOP: {top_ub}, BOT: {bot_ub}')
-                print(f'Upper Mean 95% | TOP: {upp_mean_95_top}, BOT: {upp_mean_95_bot}')
-                print(f'Lower Mean 95% | TOP: {low_mean_95_top}, BOT: {low_mean_95_bot}')
-                print(f'Standard deviation (Before): {std}, (After): {std2}')
-                print(f'Mean (Before): {mean}, (After): {mean2}')
-                print('------------------------------------------')
-                lb = [top_lb, bot_lb]
-                ub = [top_ub, bot_ub]
-                be = [top_be, bot_be]
-                upp_mean_95 = [upp_mean_95_top, upp_mean_95_bot]
-                low_mean_95 = [low_mean_95_top, low_mean_95_bot]
-                std_arr = [std, std2]
-                mean_arr = [mean, mean2]
+        lb = [top_lb, bot_lb]
+        ub = [top_ub, bot_ub]
+        be = [top_be, bot_be]
 
         if self.plot == True:
             self.plotting(depth, param, lb, ub, be, upp_mean_95, low_mean_95, self.quant_low, self.quant_upp, self.name, self.mode, self.save)
 
-        return [be, lb, ub, upp_mean_95, low_mean_95, std_arr, mean_arr]
+        #same layout as a profile_batch row
+        return np.array((top_be, bot_be, top_lb, bot_lb, top_ub, bot_ub, *upp_mean_95, *low_mean_95, std, std2, mean, mean2, dependent, True),
+                        dtype=PROFILE_DTYPE)[()]
     
     
     def plotting(self, depth, param, lb, ub, be, upp_mean_95, low_mean_95, quant_low, quant_upp, name, mode, save):
@@ -404,24 +529,13 @@ class DesignProfile:
         plt.rcParams.update({'font.size': 8})
         fig, graph = plt.subplots(1, 1, figsize=(7.0,12.5))
         fig.canvas.manager.set_window_title('Profile Lines')
-        fig.tight_layout()
-
-        plt.subplots_adjust(left  = 0.1, right = 0.925, bottom = 0.095, top = 0.89, wspace = 0.2, hspace = 0.2)
-
-        graph.plot(lb, [depth[0],depth[-1]],color = 'r',alpha = 0.5, label = f'lower bounds {quant_low} quantile')
-        graph.plot(ub, [depth[0],depth[-1]],color = 'g',alpha = 0.5, label = f'upper bounds {quant_upp} quantile')
-        graph.plot(be, [depth[0],depth[-1]],color = 'black',alpha = 0.5, label = 'best estimate')
-        graph.plot(upp_mean_95, [depth[0],depth[-1]],color = 'purple',alpha = 0.5, label = f'mean at 95% confidence', linestyle='dashed')
-        graph.plot(low_mean_95, [depth[0],depth[-1]],color = 'purple',alpha = 0.5, linestyle='dashed')
-        graph.set_title(f'{name} - {mode}', y=1.0, pad=35)
-        unit = str(name).split("-")[0].split("(")[0]
-        graph.scatter(param, depth, s=12, color = 'b', label = f'{unit}')
-        graph.invert_yaxis()
-        graph.legend(loc='upper center', bbox_to_anchor=(0.5, 1.05),ncol=3, fancybox=True, shadow=True)
-        graph.set_ylabel('Depth (m)')
-        graph.set_xlabel(f'{str(name).split("—")[0]}', loc='center')
-        plt.savefig(f'{save}\{name} {mode}.pdf', dpi=200.0)
-        #plt.show()
+
+        fig.subplots_adjust(left  = 0.1, right = 0.925, bottom = 0.095, top = 0.89, wspace = 0.2, hspace = 0.2)
+
+        draw_profile(graph, depth, param, lb, ub, be, upp_mean_95, low_mean_95, quant_low, quant_upp, name, mode)
+        fig.savefig(os.path.join(save, f'{name} {mode}.pdf'), dpi=200.0)
+        #closed once saved so pyplot doesn't keep every figure
+        plt.close(fig)
 
 #TESTING
 # df = pd.read_excel("50.xlsx", sheet_name="MC")
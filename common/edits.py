@@ -0,0 +1,104 @@
+import numpy as np
+from common.averaging import PERCENTILES, TRIM, sorted_table, robust_stats
+
+
+class PointEdits:
+    """
+    The points of an averaging window with a mask of the ones still included, for taking outliers out of get_avg_val's plot.
+
+    Removing points only clears them in the mask and subtracts them from running sums, so the recalculated mean costs O(1) per
+    removed point instead of rebuilding the lists, and each removal is kept on an undo stack (and redo stack once undone).
+
+    Parameters
+    ----------
+    values : np.array of the parameter at each point, nan for no data
+
+    depth : np.array of the depth of each point
+
+    rows : np.array of the sounding row of each point
+    """
+
+    def __init__(self, values, depth, rows):
+        self.values: np.array = np.asarray(values, dtype=np.float64)
+        self.depth: np.array = np.asarray(depth, dtype=np.float64)
+        self.rows: np.array = np.asarray(rows, dtype=np.int64)
+        self.mask: np.array = np.ones(len(self.values), dtype=bool)
+        self.found: np.array = ~np.isnan(self.values)
+
+        #summed relative to the starting mean, same as PrefixIndex, so the sum of squares keeps its precision
+        self.shift: float = float(self.values[self.found].mean()) if self.found.any() else 0.0
+        self.centred: np.array = np.where(self.found, self.values - self.shift, 0.0)
+        self.total: float = float(self.centred.sum())
+        self.squares: float = float((self.centred * self.centred).sum())
+        self.count: int = int(self.found.sum())
+        self.kept: int = len(self.values)
+
+        self.undo_stack: list = []
+        self.redo_stack: list = []
+
+    def __len__(self):
+        return self.kept
+
+    @property
+    def x(self) -> np.array:
+        return self.values[self.mask]
+
+    @property
+    def y(self) -> np.array:
+        return self.depth[self.mask]
+
+    @property
+    def kept_rows(self) -> np.array:
+        return self.rows[self.mask]
+
+    def remove(self, start, stop) -> int:
+        """Take the included points start:stop (positions as plotted) out, returns how many were removed."""
+        points = np.flatnonzero(self.mask)[start:stop]
+        if not len(points):
+            return 0
+        self._set(points, False)
+        self.undo_stack.append(points)
+        self.redo_stack.clear()
+        return len(points)
+
+    def undo(self) -> bool:
+        if not self.undo_stack:
+            return False
+        points = self.undo_stack.pop()
+        self._set(points, True)
+        self.redo_stack.append(points)
+        return True
+
+    def redo(self) -> bool:
+        if not self.redo_stack:
+            return False
+        points = self.redo_stack.pop()
+        self._set(points, False)
+        self.undo_stack.append(points)
+        return True
+
+    def _set(self, points, include):
+        sign = 1 if include else -1
+        self.mask[points] = include
+        self.total += sign * float(self.centred[points].sum())
+        self.squares += sign * float((self.centred[points] * self.centred[points]).sum())
+        self.count += sign * int(self.found[points].sum())
+        self.kept += sign * len(points)
+
+    def stats(self, robust=False, percentiles=PERCENTILES, trim=TRIM) -> dict:
+        """
+        Count, mean and std (ddof=1) of the included points from the running sums, nan if there's no data (std with fewer than 2).
+
+        With robust the median, trimmed mean, MAD and percentiles of the included points are added (see averaging.robust_stats).
+        """
+        if self.count == 0:
+            stats = {'count': 0, 'mean': np.nan, 'std': np.nan}
+        else:
+            mean = self.total / self.count
+            std = np.sqrt(max(self.squares - self.total * mean, 0.0) / (self.count - 1)) if self.count > 1 else np.nan
+            stats = {'count': self.count, 'mean': float(self.shift + mean), 'std': float(std)}
+        if robust:
+            values = self.values[self.mask & self.found]
+            table = sorted_table(values, [0], [len(values)])
+            stats.update({key: float(value[0]) for key, value in robust_stats(table, percentiles, trim).items()})
+        return stats
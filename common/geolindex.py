@@ -0,0 +1,92 @@
+import numpy as np
+
+#the geology unit columns that can be picked with unit_selector
+GEOL_UNITS = ['GEOL_GEOL', 'GEOL_GEO2']
+
+
+class BoreholeLayers:
+    """
+    A borehole's GEOL layers as arrays sorted by top depth, with the unitised layers and layer descriptions built once per unit column.
+
+    Parameters
+    ----------
+    geol : DataFrame of the borehole's GEOL rows (Depth, GEOL_BASE, GEOL_LEG and the GEOL_UNITS)
+    """
+
+    def __init__(self, geol):
+        geol = geol.sort_values(by=['Depth']).reset_index(drop=True)
+
+        layer_leg = [str(x) for x in geol['GEOL_LEG']]
+        layer_leg = [x.split("-")[1] if not x == "" and "-" in x else x for x in layer_leg]
+        layers = list(zip(list(geol['Depth']), list(geol['GEOL_BASE'])))
+
+        self.unitised_layers: dict = {}
+        self.descriptions: dict = {}
+        self.unitised: dict = {}
+        for col in GEOL_UNITS:
+            #a missing unit column is treated as not unitised
+            units = list(geol[col]) if col in geol.columns else [""] * len(layers)
+            self.unitised[col] = all(v for v in units)
+            #same as before - layers with the same top and base collapse into one, the last one's units kept
+            self.unitised_layers[col] = dict(zip(layers, zip(units, layer_leg)))
+            self.descriptions[col] = [describe(layer, unit) for (layer, unit) in self.unitised_layers[col].items()]
+
+        keys = list(self.unitised_layers[GEOL_UNITS[0]])
+        self.top = np.array([float(layer[0]) for layer in keys], dtype=np.float64)
+        self.base = np.array([float(layer[1]) for layer in keys], dtype=np.float64)
+        self.keys: list = keys
+
+    def find(self, depth) -> int:
+        """
+        Position (in keys) of the layer a depth falls in, or None if it isn't in a layer.
+
+        Tops and bases are inclusive, where two layers share a boundary the deeper one is used (the last match in top order).
+        """
+        x = int(np.searchsorted(self.top, float(depth), side='right')) - 1
+        while x >= 0 and self.base[x] < float(depth):
+            x -= 1
+        return x if x >= 0 else None
+
+    def find_all(self, depths) -> tuple:
+        """(top, base) arrays of the layer each of depths falls in (same pick as find), nan where it isn't in a layer."""
+        depths = np.asarray(depths, dtype=np.float64)
+        x = np.searchsorted(self.top, depths, side='right') - 1
+        x = np.where(np.isnan(depths), -1, x)
+        found = (x >= 0) & (self.base[np.maximum(x, 0)] >= depths)
+        #overlapping layers - the last match can be further up, look those up one at a time
+        for row in np.flatnonzero(~found & (x > 0)):
+            layer = self.find(depths[row])
+            found[row] = layer is not None
+            x[row] = -1 if layer is None else layer
+        x = np.where(found, x, -1)
+        top = np.where(x >= 0, self.top[np.maximum(x, 0)], np.nan)
+        base = np.where(x >= 0, self.base[np.maximum(x, 0)], np.nan)
+        return (top, base)
+
+
+def describe(layer, unit) -> str:
+    """Description of a layer for the geol_layers list, e.g. "(0.0m -  2.5m) Unit: A | Soil Type: SAND"."""
+    split_layer_top = str(layer).split(",")[0]
+    split_layer_bot = str(layer).split(",")[1]
+    split_layer_bot = split_layer_bot[:-1]
+    if unit[0] == "":
+        return str(f"{split_layer_top}m - {split_layer_bot}m) Soil Type: {unit[1]}")
+    return str(f"{split_layer_top}m - {split_layer_bot}m) Unit: {unit[0]} | Soil Type: {unit[1]}")
+
+
+class GeolIndex:
+    """
+    GEOL layers for every borehole in a project, built once when the project is loaded so picking depths
+    or changing the unit column doesn't sort and rebuild the layers again.
+
+    Parameters
+    ----------
+    geol_by_bh : dict of {PointID: GEOL DataFrame}
+    """
+
+    def __init__(self, geol_by_bh):
+        self.boreholes: dict = {bh: BoreholeLayers(geol) for bh, geol in geol_by_bh.items() if not geol.empty}
+
+    def get(self, bh) -> BoreholeLayers:
+        """The borehole's layers, or None if it has no GEOL."""
+        return self.boreholes.get(bh)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+#tables read from each gINT project
+GINT_TABLES = ['POINT', 'STCN_DATA', 'GEOL']
+
+#columns each table is loaded with - the averaged parameters and what's needed to place them,
+#anything else in STCN_DATA (temperatures, inclinations etc.) is only read for a borehole when it's picked in the parameter list
+PROJECT_COLUMNS = {'POINT': ['PointID'],
+                   'STCN_DATA': ['PointID', 'ItemKey', 'Depth', 'STCN_Depth', 'STCN_QC', 'STCN_FS', 'STCN_U', 'STCN_Qnet', 'STCN_FCRO', 'STCN_SBTi'],
+                   'GEOL': ['PointID', 'Depth', 'GEOL_BASE', 'GEOL_LEG', 'GEOL_GEOL', 'GEOL_GEO2']}
+
+#true depths are kept to the centimetre, depths are matched on integer keys of depth * DEPTH_SCALE so they compare exactly
+DEPTH_SCALE = 100
+NO_DEPTH = np.iinfo(np.int64).min
+
+#key fields of a STCN_DATA row, used to line up columns read later with the rows already loaded
+CPT_KEYS = ['PointID', 'ItemKey', 'Depth']
+
+#STCN_DATA columns that aren't parameters to average
+CPT_NOT_PARAMS = ['GintRecID', 'PointID', 'ItemKey', 'Depth', 'STCN_Depth', 'true_depth']
+
+#Access has a hard limit on the length of a query, so long PointID lists are sent in chunks
+CHUNK_SIZE = 250
+
+
+def read_table(gint, table, point_ids=None, columns=None, chunk_size=CHUNK_SIZE):
+    """
+    Read a gINT table for the whole project, or a list of boreholes, in as few queries as possible.
+
+    Parameters
+    ----------
+    gint : open pyodbc connection to the gINT project
+
+    table : str name of the gINT table (e.g. "STCN_DATA", "GEOL")
+
+    point_ids : list of PointIDs to read - None reads the whole table in a single query
+
+    columns : list of columns to read - None reads them all (SELECT *)
+
+    chunk_size : int number of PointIDs sent per WHERE PointID IN (...) query
+    """
+    fields = "*" if columns is None else ", ".join(f"[{col}]" for col in columns)
+
+    if point_ids is None:
+        return pd.read_sql(f"SELECT {fields} FROM {table}", gint)
+
+    point_ids = list(point_ids)
+    frames = []
+    for x in range(0, len(point_ids), chunk_size):
+        ids = ",".join(f"""'{str(bh).replace("'", "''")}'""" for bh in point_ids[x:x + chunk_size])
+        frames.append(pd.read_sql(f"SELECT {fields} FROM {table} WHERE PointID IN ({ids})", gint))
+
+    if not frames:
+        return pd.read_sql(f"SELECT {fields} FROM {table} WHERE 1=0", gint)
+    return pd.concat(frames, ignore_index=True)
+
+
+def table_columns(gint, table) -> list:
+    """Column names of a gINT table, without reading any rows."""
+    cursor = gint.cursor()
+    cursor.execute(f"SELECT * FROM {table} WHERE 1=0")
+    columns = [x[0] for x in cursor.description]
+    cursor.close()
+    return columns
+
+
+def cpt_params(columns) -> list:
+    """The parameters that can be averaged out of a list of STCN_DATA columns, in table order."""
+    return [col for col in columns if col not in CPT_NOT_PARAMS]
+
+
+def blank_cells(values) -> np.array:
+    """True for the cells left empty in gINT (None or an empty string), as opposed to numbers, other text and nan."""
+    values = np.asarray(values)
+    if values.dtype != object:
+        return np.zeros(len(values), dtype=bool)
+    return np.fromiter((v is None or (isinstance(v, str) and v == '') for v in values), dtype=bool, count=len(values))
+
+
+def split_by_point(data, point_ids):
+    """
+    Split a bulk loaded table into a dict of {PointID: DataFrame} with a single groupby.
+
+    Boreholes with no rows get an empty DataFrame with the same columns, same as a per borehole query would return.
+    """
+    groups = {bh: df.reset_index(drop=True) for bh, df in data.groupby('PointID', sort=False)}
+    empty = data.iloc[0:0]
+    return {bh: groups[bh] if bh in groups else empty.copy() for bh in point_ids}
+
+
+def depth_keys(depth) -> np.array:
+    """Integer keys (whole centimetres) of depths given as numbers or numeric strings, NO_DEPTH where there's no depth."""
+    depth = np.atleast_1d(np.asarray(depth, dtype=np.float64))
+    found = ~np.isnan(depth)
+    keys = np.full(len(depth), NO_DEPTH, dtype=np.int64)
+    keys[found] = np.rint(depth[found] * DEPTH_SCALE)
+    return keys
+
+
+def depth_key(depth) -> int:
+    """Key of a single depth, e.g. the text of a depth_table item."""
+    return int(depth_keys([float(depth)])[0])
+
+
+def add_true_depth(cpt_data):
+    """
+    Add the true_depth column (Depth + STCN_Depth) to a borehole's STCN_DATA and sort by it.
+
+    The true depth is rounded through its integer key, so it is exactly key / DEPTH_SCALE - the same values the old
+    round, format to 2dp and parse back gave, without formatting every row.
+    """
+    cpt_data = cpt_data.drop(columns=['GintRecID'], errors='ignore').reset_index(drop=True)
+
+    keys = depth_keys(cpt_data['Depth'] + cpt_data['STCN_Depth'])
+    cpt_data['true_depth'] = np.where(keys == NO_DEPTH, np.nan, keys / DEPTH_SCALE)
+    cpt_data.sort_values(by=['true_depth'], inplace=True)
+    return cpt_data
@@ -0,0 +1,46 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class Loader(QThread):
+    """
+    Run func(*args, progress=..., cancelled=...) on a background thread so the window doesn't freeze while data is read and prepared.
+
+    Each load is tagged with a request number and the window only uses a result if its number is still the latest one, so a load that has been
+    superseded (e.g. another borehole was clicked) is interrupted and whatever it returns is dropped.
+
+    Parameters
+    ----------
+    request : int number of the load, handed back with every signal
+
+    func : function doing the work - must accept progress (callable taking a message) and cancelled (callable returning bool) keywords
+
+    args : passed on to func
+    """
+    loaded = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    progress = pyqtSignal(int, str)
+
+    def __init__(self, request, func, *args, parent=None):
+        super(Loader, self).__init__(parent)
+        self.request: int = request
+        self.func = func
+        self.args: tuple = args
+
+    def run(self):
+        try:
+            result = self.func(*self.args, progress=self.report, cancelled=self.isInterruptionRequested)
+        except Exception as e:
+            self.failed.emit(self.request, str(e))
+            return
+        if not self.isInterruptionRequested():
+            self.loaded.emit(self.request, result)
+
+    def report(self, message):
+        self.progress.emit(self.request, message)
+
+    def cancel(self):
+        try:
+            self.requestInterruption()
+        except RuntimeError:
+            #already finished and deleted
+            pass
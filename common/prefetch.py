@@ -0,0 +1,58 @@
+from collections import OrderedDict
+from common.project import prepare_cpt
+
+
+class SoundingCache:
+    """
+    Bounded in-memory cache of prepared boreholes (the output of prepare_cpt), least recently used dropped first.
+
+    Parameters
+    ----------
+    size : int maximum number of boreholes kept
+    """
+
+    def __init__(self, size=16):
+        self.size: int = size
+        self.items: OrderedDict = OrderedDict()
+
+    def __contains__(self, bh):
+        return bh in self.items
+
+    def get(self, bh):
+        if bh not in self.items:
+            return None
+        self.items.move_to_end(bh)
+        return self.items[bh]
+
+    def put(self, bh, cpt):
+        self.items[bh] = cpt
+        self.items.move_to_end(bh)
+        while len(self.items) > self.size:
+            self.items.popitem(last=False)
+
+    def clear(self):
+        self.items.clear()
+
+
+def neighbours(point_ids, bh, n) -> list:
+    """The n boreholes either side of bh, nearest first and alternating next/previous (next, previous, 2nd next, 2nd previous...)."""
+    if bh not in point_ids:
+        return []
+    x = point_ids.index(bh)
+    near = []
+    for step in range(1, n + 1):
+        if x + step < len(point_ids):
+            near.append(point_ids[x + step])
+        if x - step >= 0:
+            near.append(point_ids[x - step])
+    return near
+
+
+def prefetch_cpt(cpt_by_bh, params=None, progress=print, cancelled=lambda: False) -> dict:
+    """Prepare several boreholes ahead of time, returns {PointID: prepared borehole} (or None if cancelled)."""
+    prepared = {}
+    for bh, sounding in cpt_by_bh.items():
+        if cancelled():
+            return None
+        prepared[bh] = prepare_cpt(sounding, params)
+    return prepared
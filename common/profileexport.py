@@ -0,0 +1,251 @@
+import os
+import hashlib
+import multiprocessing
+import threading
+from collections import OrderedDict
+import numpy as np
+from common.averaging import layer_rows, segment_rows
+from common.designprofile import FIT_FIELDS, FIT_DTYPE, MODEL_FITS, ProfilePdf, profile_fits, profile_from_fits
+
+#parameters profiled in the export, with the name used for their plots and their heading in the export
+PROFILE_PARAMS = [('STCN_QC', 'qc (kPa)', 'Qc'), ('STCN_FS', 'fs (MPa)', 'Fs'), ('STCN_U', 'u (kPa)', 'U'),
+                  ('STCN_Qnet', 'qnet (MPa)', 'Qnet'), ('STCN_FCRO', 'fr (-)', 'Fr'), ('STCN_SBTi', 'ic (-)', 'Ic')]
+
+#fields of each model in a profile_fits row, with the flag of whether it was fitted
+MODEL_FIELDS = {"DEP": ('dep', [field for field in FIT_FIELDS if field.startswith('dep_')]),
+                "IND": ('ind', [field for field in FIT_FIELDS if field.startswith('ind_')])}
+
+
+class ProfileCache:
+    """
+    Bounded in-memory cache of profile_fits rows by (PointID, layer top, layer base, parameter, hash of the layer's data),
+    least recently used dropped first.
+
+    The fits don't depend on the quantile, so changing quant_box (or model_box, once both models are fitted) re-derives the
+    export with profile_from_fits instead of fitting every layer again. A layer whose data changes hashes differently, so it's fitted again.
+
+    Exports run on a Loader thread while loading a project clears the cache from the GUI thread, so get, put and clear hold a lock.
+
+    Parameters
+    ----------
+    size : int maximum number of layer and parameter fits kept
+    """
+
+    def __init__(self, size=20000):
+        self.size: int = size
+        self.items: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
+
+    def get(self, keys, models) -> np.array:
+        """FIT_DTYPE array of the fits of keys, None unless every one is cached with each of models fitted."""
+        with self.lock:
+            fits = []
+            for key in keys:
+                fit = self.items.get(key)
+                if fit is None or not all(fit[MODEL_FIELDS[model][0]] for model in models):
+                    return None
+                fits.append(fit)
+            for key in keys:
+                self.items.move_to_end(key)
+            return np.array(fits, dtype=FIT_DTYPE)
+
+    def put(self, keys, fits):
+        """Cache the fits of keys, keeping a model fitted before that these fits don't have."""
+        with self.lock:
+            for (key, fit) in zip(keys, fits):
+                old = self.items.get(key)
+                fit = fit.copy()
+                if old is not None:
+                    for (flag, fields) in MODEL_FIELDS.values():
+                        if old[flag] and not fit[flag]:
+                            for field in fields:
+                                fit[field] = old[field]
+                            fit[flag] = True
+                self.items[key] = fit
+                self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+def borehole_layers(bh, sounding, layers, geol_unit) -> tuple:
+    """
+    (layer labels 'bh|top to base - soil type', unitised layers, start rows, stop rows) of a borehole's geol layers in the sounding,
+    layers is its BoreholeLayers (geol_index.get(bh)) - no layers if None.
+    """
+    if layers is None:
+        return ([], {}, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    unitised_layers = layers.unitised_layers[geol_unit]
+    layer_keys = list(unitised_layers)
+    starts, stops = layer_rows(sounding.depth, [float(layer[0]) for layer in layer_keys], [float(layer[1]) for layer in layer_keys])
+    labels = [f'{bh}|{layer[0]}m to {layer[1]}m - {unit[1]}' for (layer, unit) in unitised_layers.items()]
+    return (labels, unitised_layers, starts, stops)
+
+
+def _param_values(sounding, col) -> np.array:
+    #a parameter the borehole doesn't have is all no data, so its columns are dropped from the export
+    return sounding[col] if col in sounding else np.full(len(sounding), np.nan)
+
+
+def fit_keys(bh, sounding, layers, geol_unit) -> tuple:
+    """(layer labels, ProfileCache key of each parameter and layer of a borehole in the order of profile_borehole's fits raveled)."""
+    (labels, unitised_layers, starts, stops) = borehole_layers(bh, sounding, layers, geol_unit)
+    #the depths are the same for every parameter, so each layer's are only hashed once
+    depths = [hashlib.blake2b(np.ascontiguousarray(sounding.depth[start:stop]), digest_size=16).digest() for (start, stop) in zip(starts, stops)]
+    keys = []
+    for (col, label, heading) in PROFILE_PARAMS:
+        values = _param_values(sounding, col)
+        for (layer, start, stop, depth) in zip(unitised_layers, starts, stops, depths):
+            digest = hashlib.blake2b(np.ascontiguousarray(values[start:stop]), digest_size=16)
+            digest.update(depth)
+            keys.append((bh, float(layer[0]), float(layer[1]), col, digest.hexdigest()))
+    return (labels, keys)
+
+
+def profile_borehole(bh, sounding, layers, geol_unit, model, zvalue, plot=False, save="") -> tuple:
+    """
+    Fit every geol layer of a borehole for each of PROFILE_PARAMS in one profile_fits, saving a PDF of each profile if plot.
+
+    Returns (layer labels 'bh|top to base - soil type', FIT_DTYPE array of shape (len(PROFILE_PARAMS), layers)) fitted with the models
+    model needs - profile_from_fits gives the profiles.
+
+    Parameters
+    ----------
+    bh : PointID of the borehole
+
+    sounding : Sounding of the borehole
+
+    layers : BoreholeLayers of the borehole (geol_index.get(bh)), None if it has no GEOL
+
+    geol_unit : unit column the layers are picked by (GEOL_GEOL or GEOL_GEO2)
+
+    model, zvalue : same as DesignProfile
+
+    plot, save : save the profiles of the borehole as one PDF ('bh CPT Profiles.pdf', a page per layer and parameter) in the save directory
+    """
+    if sounding.empty:
+        print(f'no cpt data for this bh: {bh}')
+    if layers is None:
+        print(f'no geol for this bh: {bh}')
+    (labels, unitised_layers, starts, stops) = borehole_layers(bh, sounding, layers, geol_unit)
+
+    #the layers' rows of each parameter one after another, so every layer and parameter is fitted in one call
+    rows = segment_rows(list(zip(starts, stops)))
+    offsets = np.concatenate(([0], np.cumsum(np.tile(stops - starts, len(PROFILE_PARAMS)))))
+    fits = profile_fits(np.concatenate([_param_values(sounding, col)[rows] for (col, label, heading) in PROFILE_PARAMS]),
+                        np.tile(sounding.depth[rows], len(PROFILE_PARAMS)), offsets,
+                        MODEL_FITS.get(model, ())).reshape(len(PROFILE_PARAMS), len(labels))
+
+    if plot:
+        profiles = profile_from_fits(fits.ravel(), model, zvalue).reshape(fits.shape)
+        with ProfilePdf(os.path.join(save, f'{bh} CPT Profiles.pdf')) as pdf:
+            for (x, (layer, unit)) in enumerate(unitised_layers.items()):
+                for (p, (col, label, heading)) in enumerate(PROFILE_PARAMS):
+                    if profiles[p][x]['valid']:
+                        pdf.add(sounding[col][starts[x]:stops[x]], sounding.depth[starts[x]:stops[x]], profiles[p][x],
+                                f'{label} — {bh} {layer[0]}m to {layer[1]}m - {unit[1]} {unit[0]}', zvalue)
+    return (labels, fits)
+
+
+def _start_worker():
+    #workers only save plots to file, they never show a window (ProfilePdf doesn't use pyplot, this is for anything else that does)
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def export_profiles(cpt_by_bh, geol_index, bhs, geol_unit, model, zvalue, plot=False, save="", workers=1, cache=None,
+                    progress=print, cancelled=lambda: False) -> tuple:
+    """
+    profile_borehole for each of bhs, spread over a pool of processes - one borehole per task.
+
+    Boreholes with every layer already in cache are derived from it without fitting (unless plotting), the rest are fitted and added to it.
+    Results are put back in the order of bhs whatever order the boreholes finish in, and progress is reported as each one finishes.
+    Returns (layer labels, PROFILE_DTYPE array of shape (len(PROFILE_PARAMS), layers)) of every borehole one after another, or None if
+    cancelled (the worker processes are terminated, so boreholes still being profiled are dropped too).
+
+    Parameters
+    ----------
+    cpt_by_bh : dict of {PointID: Sounding}
+
+    geol_index : GeolIndex of the project
+
+    bhs : list of PointIDs to export, in the order they're wanted
+
+    geol_unit, model, zvalue, plot, save : see profile_borehole
+
+    workers : int number of processes, 0 uses every core and 1 profiles the boreholes in this process - starting the processes
+    costs more than profiling a few boreholes, so a pool only pays off for large projects or with plot
+
+    cache : ProfileCache kept between exports, None fits every borehole
+    """
+    models = MODEL_FITS.get(model, ())
+    results = [None] * len(bhs)
+    keys = [None] * len(bhs)
+    todo = []
+    finished = 0
+    for (x, bh) in enumerate(bhs):
+        if cancelled():
+            return None
+        if cache is None:
+            todo.append(x)
+            continue
+        (labels, keys[x]) = fit_keys(bh, cpt_by_bh[bh], geol_index.get(bh), geol_unit)
+        fits = None if plot else cache.get(keys[x], models)
+        if fits is None:
+            todo.append(x)
+            continue
+        results[x] = (labels, fits.reshape(len(PROFILE_PARAMS), len(labels)))
+        finished += 1
+    if finished:
+        progress(f"Profiled {finished} of {len(bhs)} boreholes from the cache...")
+
+    def done(x, result):
+        results[x] = result
+        if cache is not None:
+            cache.put(keys[x], result[1].ravel())
+
+    workers = workers if workers > 0 else (os.cpu_count() or 1)
+    workers = min(workers, max(len(todo), 1))
+
+    if workers == 1:
+        for x in todo:
+            if cancelled():
+                return None
+            bh = bhs[x]
+            done(x, profile_borehole(bh, cpt_by_bh[bh], geol_index.get(bh), geol_unit, model, zvalue, plot, save))
+            finished += 1
+            progress(f"Profiled {finished} of {len(bhs)} boreholes...")
+        return _join(results, model, zvalue)
+
+    #spawned rather than forked so the workers don't inherit the GUI (a frozen exe needs multiprocessing.freeze_support in main)
+    pool = multiprocessing.get_context('spawn').Pool(workers, initializer=_start_worker)
+    try:
+        pending = {x: pool.apply_async(profile_borehole, (bhs[x], cpt_by_bh[bhs[x]], geol_index.get(bhs[x]), geol_unit, model, zvalue, plot, save))
+                   for x in todo}
+        while pending:
+            next(iter(pending.values())).wait(0.25)
+            if cancelled():
+                return None
+            for x in [x for (x, result) in pending.items() if result.ready()]:
+                done(x, pending.pop(x).get())
+                finished += 1
+                progress(f"Profiled {finished} of {len(bhs)} boreholes...")
+    finally:
+        #terminated rather than closed, so a cancelled export doesn't wait for the boreholes still running
+        pool.terminate()
+        pool.join()
+    return _join(results, model, zvalue)
+
+
+def _join(results, model, zvalue) -> tuple:
+    #the profiles are only derived here, from fits fitted now or taken from the cache
+    labels = [label for (bh_labels, fits) in results for label in bh_labels]
+    fits = np.concatenate([fits for (bh_labels, fits) in results], axis=1) if results else np.zeros((len(PROFILE_PARAMS), 0), dtype=FIT_DTYPE)
+    return (labels, profile_from_fits(fits.ravel(), model, zvalue).reshape(fits.shape))
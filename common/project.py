@@ -0,0 +1,115 @@
+import os
+import pandas as pd
+from common.gintdata import GINT_TABLES, PROJECT_COLUMNS, CPT_KEYS, split_by_point, cpt_params
+from common.datasource import open_source
+from common.geolindex import GeolIndex
+from common.averaging import WINDOW, PrefixIndex
+from common.sounding import Sounding
+
+#cached alongside the tables - every column of each table in the project, so the full parameter list is known without opening it
+SCHEMA_TABLE = 'COLUMNS'
+
+
+def load_project(path, cache, refresh=False, progress=print, cancelled=lambda: False) -> dict:
+    """
+    Read POINT, STCN_DATA and GEOL for a project (from the cache while it's up to date) and split them by PointID.
+
+    Only the PROJECT_COLUMNS of each table are read, other STCN_DATA columns are read per borehole with load_columns when they're needed.
+
+    Returns {'point_id': sorted PointIDs, 'cpt_by_bh': {PointID: Sounding of its STCN_DATA}, 'geol_by_bh': {PointID: GEOL}, 'geol_index': GeolIndex of the layers,
+    'params': every STCN_DATA parameter}, or None if cancelled.
+    """
+    if refresh:
+        cache.clear(path)
+
+    tables = cache.load(path, GINT_TABLES + [SCHEMA_TABLE])
+
+    if tables is None:
+        tables = {}
+        schema = {'table': [], 'column': []}
+        #gINT (Access), SQLite or AGS4 depending on the file extension
+        with open_source(path) as source:
+            for table in GINT_TABLES:
+                if cancelled():
+                    return None
+                progress(f"Reading {table} from {os.path.basename(path)}...")
+                columns = source.table_columns(table)
+                schema['table'] += [table] * len(columns)
+                schema['column'] += columns
+                tables[table] = source.read_table(table, columns=[col for col in PROJECT_COLUMNS[table] if col in columns])
+        tables[SCHEMA_TABLE] = pd.DataFrame(schema)
+
+        progress(f"Caching {os.path.basename(path)}...")
+        cache.store(path, tables)
+        progress("Loaded gINT.")
+    else:
+        progress("Loaded gINT from cache.")
+
+    point_id = tables['POINT']['PointID'].tolist()
+    point_id = sorted(point_id)
+
+    schema = tables[SCHEMA_TABLE]
+    params = cpt_params(schema.loc[schema['table'] == 'STCN_DATA', 'column'].tolist())
+
+    #keep each borehole's data in memory so selecting a borehole or exporting doesn't go back to gINT - as compact arrays sorted by true depth
+    cpt_by_bh = {}
+    for (bh, cpt_data) in split_by_point(tables['STCN_DATA'], point_id).items():
+        if cancelled():
+            return None
+        cpt_by_bh[bh] = Sounding.from_frame(cpt_data, bh)
+    geol_by_bh = split_by_point(tables['GEOL'], point_id)
+    return {'point_id': point_id,
+            'cpt_by_bh': cpt_by_bh,
+            'geol_by_bh': geol_by_bh,
+            'geol_index': GeolIndex(geol_by_bh),
+            'params': params}
+
+
+def prepare_cpt(sounding, params=None, progress=print, cancelled=lambda: False) -> dict:
+    """
+    Prepare a borehole's Sounding for the depth and parameter lists - builds the depth strings, headers and PrefixIndex.
+
+    params lists every parameter in the project's STCN_DATA for the headers, including ones not loaded yet - None uses the loaded columns.
+
+    Returns {'sounding', 'depth_list', 'headers', 'index': PrefixIndex of the loaded parameters}, or None if cancelled.
+    """
+    if cancelled():
+        return None
+
+    #true_depth is already whole centimetres (see add_true_depth), the list is straight from the array
+    depth_list = [str(x) for x in sounding.depth.tolist()]
+
+    cpt_headers = list(params) if params is not None else sounding.params
+
+    return {'sounding': sounding, 'depth_list': depth_list, 'headers': cpt_headers, 'index': cpt_index(sounding)}
+
+
+def cpt_index(sounding) -> PrefixIndex:
+    """PrefixIndex of every parameter in a Sounding, sharing its arrays."""
+    return PrefixIndex(sounding.depth, sounding.columns, sounding.blank)
+
+
+def load_columns(path, bh, columns, progress=print, cancelled=lambda: False) -> pd.DataFrame:
+    """Read extra STCN_DATA columns for one borehole, with CPT_KEYS to line them up with the rows already loaded (see Sounding.add_columns)."""
+    progress(f"Reading {', '.join(columns)} for {bh}...")
+    with open_source(path) as source:
+        return source.read_table('STCN_DATA', [bh], columns=CPT_KEYS + [col for col in columns if col not in CPT_KEYS])
+
+
+def rolling_table(index, layers=None, up=WINDOW, down=WINDOW) -> pd.DataFrame:
+    """
+    Rolling average of every parameter in a sounding at each of its depths, with the same layer-aware window as get_avg_val.
+
+    Parameters
+    ----------
+    index : PrefixIndex of the sounding
+
+    layers : BoreholeLayers of the borehole (geol_index.get(bh)) - None doesn't cut the windows at layers
+
+    up, down : float window above and below each depth (m), given in the column names
+    """
+    top, base = layers.find_all(index.depth) if layers is not None else (None, None)
+    table = {'Depth (m)': index.depth}
+    for name in index.values:
+        table[f'{name} mean ({up}m above, {down}m below)'] = index.rolling(name, top, base, up, down)['mean']
+    return pd.DataFrame(table)
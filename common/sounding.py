@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from common.gintdata import CPT_KEYS, add_true_depth, blank_cells, cpt_params
+
+
+class Sounding:
+    """
+    A borehole's STCN_DATA as one contiguous float array per parameter on a shared, sorted true depth array, kept in place of
+    the full DataFrame (object columns of mixed empty strings and floats) so a whole project can stay in memory.
+
+    Empty strings and other text are stored as nan, with a mask of the cells left empty (None or "") for the parameters that have
+    any, since the averaging window treats those differently from nan (see averaging.window_segments). The ItemKey and Depth of
+    each row are kept to line up columns read later. Values are float64 by default so they show and export as gINT has them,
+    float32 halves their size where that matters more - the depths stay float64 for their integer keys.
+
+    Parameters
+    ----------
+    point_id : PointID of the borehole
+
+    depth : np.array of true depths, sorted
+
+    columns : dict of {parameter: np.array of values in the same order as depth}
+
+    item_key : np.array of the ItemKey of each row
+
+    sample_depth : np.array of the Depth (top of the push) of each row
+
+    dtype : numpy dtype the values are stored as
+    """
+    __slots__ = ('point_id', 'depth', 'columns', 'blank', 'item_key', 'sample_depth', 'dtype')
+
+    def __init__(self, point_id, depth, columns, item_key, sample_depth, dtype=np.float64):
+        self.point_id = point_id
+        self.depth: np.array = np.ascontiguousarray(depth, dtype=np.float64)
+        self.dtype = dtype
+        self.columns: dict = {}
+        self.blank: dict = {}
+        self.item_key: np.array = np.asarray(item_key)
+        self.sample_depth: np.array = np.ascontiguousarray(sample_depth, dtype=np.float64)
+        for name, values in columns.items():
+            self.add(name, values)
+
+    @classmethod
+    def from_frame(cls, cpt_data, point_id=None, dtype=np.float64):
+        """Sounding of a borehole's STCN_DATA DataFrame (true_depth is added and the rows sorted if it hasn't been done)."""
+        if 'true_depth' not in cpt_data.columns:
+            cpt_data = add_true_depth(cpt_data)
+        if point_id is None and len(cpt_data):
+            point_id = cpt_data['PointID'].iloc[0]
+        return cls(point_id, cpt_data['true_depth'].to_numpy(dtype=np.float64),
+                   {col: cpt_data[col] for col in cpt_params(cpt_data.columns)},
+                   cpt_data['ItemKey'].to_numpy(), cpt_data['Depth'].to_numpy(dtype=np.float64), dtype)
+
+    def __len__(self):
+        return len(self.depth)
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name) -> np.array:
+        return self.columns[name]
+
+    @property
+    def empty(self) -> bool:
+        return len(self.depth) == 0
+
+    @property
+    def params(self) -> list:
+        return list(self.columns)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.depth.nbytes + self.sample_depth.nbytes + self.item_key.nbytes + sum(values.nbytes for values in self.columns.values())
+                + sum(mask.nbytes for mask in self.blank.values()))
+
+    def add(self, name, values):
+        """Add (or replace) a parameter, text is treated as no data."""
+        blank = blank_cells(values)
+        if blank.any():
+            self.blank[name] = blank
+        else:
+            self.blank.pop(name, None)
+        self.columns[name] = np.ascontiguousarray(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64), dtype=self.dtype)
+
+    def add_columns(self, extra):
+        """Add columns read later for the borehole (extra, including CPT_KEYS - see project.load_columns), keeping the row order."""
+        keys = pd.DataFrame({'PointID': self.point_id, 'ItemKey': self.item_key, 'Depth': self.sample_depth})
+        extra = extra.drop(columns=[col for col in extra.columns if col in self.columns]).drop_duplicates(subset=CPT_KEYS)
+        merged = keys.merge(extra, on=CPT_KEYS, how='left')
+        for col in cpt_params(extra.columns):
+            self.add(col, merged[col])
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import threading
+import hashlib
+import numpy as np
+import pandas as pd
+
+#bytes read from the start and end of the project file for the quick content hash
+HASH_SAMPLE = 64 * 1024
+
+#how object (text) columns are stored - "str" for text/None only, "mixed" for text mixed with numbers (e.g. beacon gint)
+NONE, STR, FLOAT, INT, BOOL = 0, 1, 2, 3, 4
+
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'AvgCPT', 'cache')
+
+
+class TableCache:
+    """
+    Persistent on-disk cache of gINT tables, stored column by column in uncompressed .npz files so they load without pyodbc.
+
+    A project's snapshot is only used while the .gpj still has the same modified time, size and quick content hash (first and last 64 KB),
+    otherwise it is re-read from gINT. When the cache grows past max_size the least recently used projects are evicted.
+
+    Loads, prefetches and exports run on their own Loader threads and share one cache, so load, store and clear (and the index
+    and evictions they do) hold a lock - one thread can't evict files another is reading or lose its index update.
+
+    Parameters
+    ----------
+    cache_dir : str directory to keep the snapshots in - created if it doesn't exist
+
+    max_size : int total size of the cache in bytes
+    """
+
+    def __init__(self, cache_dir=None, max_size=2048 * 1024 * 1024):
+        self.cache_dir: str = cache_dir or default_cache_dir()
+        self.max_size: int = max_size
+        self.index_file: str = os.path.join(self.cache_dir, 'index.json')
+        #reentrant, load clears a project that has changed
+        self.lock = threading.RLock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def load(self, path, tables) -> dict:
+        """Return {table: DataFrame} from the cache, or None if any table is missing or the project has changed."""
+        with self.lock:
+            index = self._read_index()
+            key = self.project_key(path)
+            entry = index.get(key)
+
+            if entry is None or not all(t in entry['tables'] for t in tables):
+                return None
+            if entry['fingerprint'] != self.fingerprint(path):
+                print(f"gINT has changed since it was cached, reloading {os.path.basename(path)}...")
+                self.clear(path)
+                return None
+
+            try:
+                data = {t: self._read_table(os.path.join(self.cache_dir, key, f'{t}.npz')) for t in tables}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Couldn't read cache for {os.path.basename(path)}, reloading from gINT. {e}")
+                self.clear(path)
+                return None
+
+            entry['last_used'] = time.time()
+            self._write_index(index)
+            return data
+
+    def store(self, path, data):
+        """Snapshot {table: DataFrame} for the project at path, then evict old projects if the cache is too big."""
+        with self.lock:
+            key = self.project_key(path)
+            folder = os.path.join(self.cache_dir, key)
+            os.makedirs(folder, exist_ok=True)
+
+            for table, df in data.items():
+                self._write_table(os.path.join(folder, f'{table}.npz'), df)
+
+            index = self._read_index()
+            index[key] = {'path': os.path.abspath(path),
+                          'fingerprint': self.fingerprint(path),
+                          'tables': sorted(data.keys()),
+                          'size': sum(os.path.getsize(os.path.join(folder, f)) for f in os.listdir(folder)),
+                          'last_used': time.time()}
+            self._evict(index, keep=key)
+            self._write_index(index)
+
+    def clear(self, path=None):
+        """Remove the snapshot for one project, or the whole cache when path is None (forces a refresh from gINT)."""
+        with self.lock:
+            index = self._read_index()
+            keys = list(index) if path is None else [self.project_key(path)]
+            for key in keys:
+                self._remove(key)
+                index.pop(key, None)
+            self._write_index(index)
+
+    def project_key(self, path) -> str:
+        return hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode('utf-8')).hexdigest()
+
+    def fingerprint(self, path) -> list:
+        stat = os.stat(path)
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            sha.update(f.read(HASH_SAMPLE))
+            if stat.st_size > HASH_SAMPLE:
+                f.seek(max(stat.st_size - HASH_SAMPLE, HASH_SAMPLE))
+                sha.update(f.read(HASH_SAMPLE))
+        return [stat.st_mtime_ns, stat.st_size, sha.hexdigest()]
+
+    def _evict(self, index, keep):
+        total = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda k: index[k]['last_used']):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            print(f"Evicting {index[key]['path']} from the gINT cache.")
+            total -= index[key]['size']
+            self._remove(key)
+            del index[key]
+
+    def _remove(self, key):
+        folder = os.path.join(self.cache_dir, key)
+        if os.path.isdir(folder):
+            for f in os.listdir(folder):
+                os.remove(os.path.join(folder, f))
+            os.rmdir(folder)
+
+    def _read_index(self) -> dict:
+        try:
+            with open(self.index_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, index):
+        tmp = self.index_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_file)
+
+    @staticmethod
+    def _write_table(fname, df):
+        arrays = {'__columns__': np.array([str(c) for c in df.columns], dtype=str)}
+        kinds = []
+
+        for x, col in enumerate(df.columns):
+            values = df[col].to_numpy()
+            if values.dtype.kind in 'biufmM':
+                kinds.append('num')
+                arrays[f'c{x}'] = values
+            elif all(v is None or isinstance(v, str) for v in values):
+                kinds.append('str')
+                arrays[f'c{x}'] = np.array(['' if v is None else v for v in values], dtype=str)
+                arrays[f'n{x}'] = np.array([v is None for v in values], dtype=bool)
+            else:
+                #mixed column, keep the python type of each value so empty strings and numbers round-trip
+                kinds.append('mixed')
+                codes = np.empty(len(values), dtype=np.int8)
+                text = []
+                for i, v in enumerate(values):
+                    if v is None:
+                        codes[i] = NONE
+                    elif isinstance(v, (bool, np.bool_)):
+                        codes[i] = BOOL
+                    elif isinstance(v, (int, np.integer)):
+                        codes[i] = INT
+                    elif isinstance(v, (float, np.floating)):
+                        codes[i] = FLOAT
+                    else:
+                        codes[i] = STR
+                    text.append('' if v is None else str(v))
+                arrays[f'c{x}'] = np.array(text, dtype=str)
+                arrays[f'k{x}'] = codes
+
+        arrays['__kinds__'] = np.array(kinds, dtype=str)
+
+        tmp = fname + '.tmp.npz'
+        np.savez(tmp, **arrays)
+        os.replace(tmp, fname)
+
+    @staticmethod
+    def _read_table(fname) -> pd.DataFrame:
+        data = {}
+        with np.load(fname, allow_pickle=False) as npz:
+            columns = [str(c) for c in npz['__columns__']]
+            kinds = [str(k) for k in npz['__kinds__']]
+            for x, (col, kind) in enumerate(zip(columns, kinds)):
+                values = npz[f'c{x}']
+                if kind == 'num':
+                    data[col] = values
+                elif kind == 'str':
+                    values = values.astype(object)
+                    values[npz[f'n{x}']] = None
+                    data[col] = values
+                else:
+                    convert = {NONE: lambda v: None, STR: str, FLOAT: float, INT: int, BOOL: lambda v: v == 'True'}
+                    data[col] = np.array([convert[c](v) for c, v in zip(npz[f'k{x}'], values.tolist())], dtype=object)
+        return pd.DataFrame(data, columns=columns)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from common.ags4 import iter_boreholes
+from common.datasource import AGS4Source
+
+SCPT_UNITS = {'gint': ['MPa', 'MPa', 'kPa', 'MPa'], 'ags': ['kPa', 'kPa', 'MPa', 'kPa']}
+
+
+def ags4_file(tmp_path, units) -> str:
+    """A small AGS4 file with two CPT boreholes, resistances and pore pressure given in units (qc, fs, u2, qnet)."""
+    (qc, fs, u2, qnet) = units
+    lines = ['"GROUP","PROJ"',
+             '"HEADING","PROJ_ID","PROJ_NAME"',
+             '"UNIT","",""',
+             '"TYPE","ID","X"',
+             '"DATA","P1","Test"',
+             '',
+             '"GROUP","LOCA"',
+             '"HEADING","LOCA_ID","LOCA_TYPE"',
+             '"UNIT","",""',
+             '"TYPE","ID","PA"',
+             '"DATA","BH1","CPT"',
+             '"DATA","BH2","CPT"',
+             '',
+             '"GROUP","SCPT"',
+             '"HEADING","LOCA_ID","SCPG_TESN","SCPT_DPTH","SCPT_RES","SCPT_FRES","SCPT_PWP2","SCPT_QNET","SCPT_FRR","SCPT_IC"',
+             f'"UNIT","","","m","{qc}","{fs}","{u2}","{qnet}","%",""',
+             '"TYPE","ID","X","2DP","2DP","3DP","3DP","2DP","2DP","2DP"',
+             '"DATA","BH1","1","0.02","1.50","0.020","0.050","1.40","1.33","2.10"',
+             '"DATA","BH1","1","0.04","2.00","","-0.010","1.90","","2.20"',
+             '"DATA","BH2","1","1.00","3.00","0.030","0.250","2.80","1.00","1.90"',
+             '',
+             '"GROUP","GEOL"',
+             '"HEADING","LOCA_ID","GEOL_TOP","GEOL_BASE","GEOL_LEG","GEOL_GEOL","GEOL_GEO2"',
+             '"UNIT","","m","m","","",""',
+             '"TYPE","ID","2DP","2DP","PA","PA","PA"',
+             '"DATA","BH1","0.00","0.50","1-SAND","A",""',
+             '"DATA","BH2","0.00","2.00","2-CLAY","B",""']
+    path = tmp_path / f'{u2}.ags'
+    path.write_text('\r\n'.join(lines) + '\r\n', encoding='utf-8')
+    return str(path)
+
+
+def scpt(path) -> dict:
+    return {bh: arrays for (group, bh, n, arrays) in iter_boreholes(path) if group == 'SCPT'}
+
+
+def test_kpa_resistances_and_mpa_pore_pressure_are_converted(tmp_path):
+    boreholes = scpt(ags4_file(tmp_path, SCPT_UNITS['ags']))
+    assert list(boreholes) == ['BH1', 'BH2']
+    bh1 = boreholes['BH1']
+    np.testing.assert_allclose(bh1['Depth'], [0.02, 0.04])
+    np.testing.assert_allclose(bh1['STCN_QC'], [0.0015, 0.002])
+    np.testing.assert_allclose(bh1['STCN_Qnet'], [0.0014, 0.0019])
+    np.testing.assert_allclose(bh1['STCN_FS'][:1], [0.00002])
+    assert np.isnan(bh1['STCN_FS'][1])
+    #pore pressure to kPa, as gINT has it
+    np.testing.assert_allclose(bh1['STCN_U'], [50.0, -10.0])
+    np.testing.assert_allclose(boreholes['BH2']['STCN_U'], [250.0])
+    #dimensionless columns aren't scaled
+    np.testing.assert_allclose(bh1['STCN_FCRO'][:1], [1.33])
+    np.testing.assert_allclose(bh1['STCN_SBTi'], [2.1, 2.2])
+    assert list(bh1['ItemKey']) == ['1', '1']
+
+
+def test_gint_units_are_kept(tmp_path):
+    bh1 = scpt(ags4_file(tmp_path, SCPT_UNITS['gint']))['BH1']
+    np.testing.assert_allclose(bh1['STCN_QC'], [1.5, 2.0])
+    np.testing.assert_allclose(bh1['STCN_U'], [0.05, -0.01])
+
+
+def test_source_reads_gint_tables(tmp_path):
+    source = AGS4Source(ags4_file(tmp_path, SCPT_UNITS['ags']))
+    assert list(source.read_table('POINT')['PointID']) == ['BH1', 'BH2']
+
+    stcn = source.read_table('STCN_DATA')
+    assert list(stcn['PointID']) == ['BH1', 'BH1', 'BH2']
+    np.testing.assert_allclose(stcn['STCN_U'], [50.0, -10.0, 250.0])
+    np.testing.assert_allclose(stcn['STCN_Depth'], 0.0)
+    assert list(source.read_table('STCN_DATA', point_ids=['BH2'])['PointID']) == ['BH2']
+
+    geol = source.read_table('GEOL')
+    assert list(geol['GEOL_LEG']) == ['1-SAND', '2-CLAY']
+    np.testing.assert_allclose(geol['GEOL_BASE'], [0.5, 2.0])
+    with pytest.raises(ValueError):
+        source.read_table('SCPG')
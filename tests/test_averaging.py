@@ -0,0 +1,257 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from common.averaging import GAP, PrefixIndex, robust_stats, rolling_segments, sorted_table, window_average, window_segments
+from common.gintdata import blank_cells
+from common.project import cpt_index
+from common.sounding import Sounding
+
+#the default window, a short one and an asymmetric one
+WINDOWS = [(0.5, 0.5), (0.25, 0.25), (0.3, 0.8)]
+
+
+def is_blank(value) -> bool:
+    return value is None or (isinstance(value, str) and value == "")
+
+
+def loop_average(depth, values, cpt_depth, layer, up=0.5, down=0.5, tolerance=0.01) -> list:
+    """
+    The values get_avg_val averaged for a depth, with the row loops it had before window_segments (0.5/0.51 as up/down/tolerance),
+    None if the depth is in a data gap. values are the cells as gINT gives them - floats, nan, None or "".
+    """
+    rows = len(depth)
+    q = float(cpt_depth)
+    avg_list = []
+    zero_count = 0
+    max_count = 0
+    min_count = 0
+
+    min_datapoint = 0
+    max_datapoint = rows - 1
+    for row in range(0, rows):
+        if np.isnan(depth[row]):
+            pass
+        elif depth[row] <= q - up:
+            min_datapoint = row
+        elif depth[row] >= q + down and not depth[row] > q + round(down + tolerance, 10):
+            max_datapoint = row
+        elif depth[row] > q + round(down + tolerance, 10):
+            break
+        elif not row == rows - 1:
+            if not depth[row] < 0.15:
+                if depth[row + 1] % depth[row] > GAP:
+                    if depth[row] == q:
+                        return None
+                    min_datapoint += 1
+                    max_datapoint = row
+                    break
+
+    for row in range(min_datapoint, max_datapoint):
+        if depth[row] < q - round(up + tolerance, 10):
+            min_datapoint += 1
+
+    for row in range(min_datapoint, max_datapoint):
+        if row <= 0:
+            zero_count += 1
+        #empty cells are skipped before the layer is checked, so they're never counted as cut
+        elif not is_blank(values[row]):
+            if depth[row] >= layer[1] and not depth[row] > q + round(down + tolerance, 10):
+                max_count += 1
+            elif depth[row] < layer[0] and not depth[row] < q - round(up + tolerance, 10):
+                min_count += 1
+            else:
+                avg_list.append(float(values[row]))
+
+    if layer[1] - layer[0] < round(up + down - 0.001, 10):
+        zero_count = 0
+        min_count = 0
+        max_count = 0
+
+    if not zero_count == 0:
+        for row in range(0 + zero_count, max_datapoint + zero_count):
+            if row >= rows:
+                break
+            elif not is_blank(values[row]):
+                avg_list.append(float(values[row]))
+
+    if not min_count == 0:
+        for row in range(min_datapoint + min_count, max_datapoint + min_count):
+            if row >= rows or row < 0:
+                break
+            elif not is_blank(values[row]):
+                avg_list.append(float(values[row]))
+
+    if not max_count == 0:
+        for row in range(min_datapoint, min_datapoint - max_count, -1):
+            if 0 <= row < rows and not is_blank(values[row]):
+                avg_list.insert(0, float(values[row]))
+
+    return [x for x in avg_list if not np.isnan(x)]
+
+
+def random_sounding(rng, rows=400) -> tuple:
+    """
+    (depth, cells, layers) of a sounding at 2cm steps with a few data gaps and random geol layers, the cells as gINT gives them -
+    mostly floats, some nan and some left empty (None or "").
+    """
+    steps = np.where(rng.random(rows) < 0.02, rng.uniform(0.2, 0.6, rows), 0.02)
+    depth = np.round(rng.uniform(0.0, 0.3) + np.cumsum(steps), 2)
+    cells = (rng.normal(5.0, 2.0, rows) + depth * 0.3).astype(object)
+    pick = rng.random(rows)
+    cells[pick < 0.05] = np.nan
+    cells[(pick >= 0.05) & (pick < 0.1)] = None
+    cells[(pick >= 0.1) & (pick < 0.15)] = ""
+    bounds = np.round(np.sort(rng.uniform(depth[0], depth[-1], 5)), 2)
+    bounds = np.concatenate(([0.0], bounds, [round(depth[-1] + 1.0, 2)]))
+    return (depth, cells, list(zip(bounds[:-1], bounds[1:])))
+
+
+def numeric(cells) -> np.array:
+    return pd.to_numeric(pd.Series(cells), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def layer_of(layers, depth) -> tuple:
+    for (top, base) in layers:
+        if top <= depth < base:
+            return (top, base)
+    return layers[-1]
+
+
+def check_window(result, expected):
+    if expected is None:
+        assert result['gap']
+        return
+    assert not result['gap']
+    found = result['values'][~np.isnan(result['values'])]
+    assert len(found) == len(expected)
+    if expected:
+        assert result['mean'] == pytest.approx(np.mean(expected), rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('up, down', WINDOWS)
+def test_window_matches_row_loops(seed, up, down):
+    rng = np.random.default_rng(seed)
+    (depth, cells, layers) = random_sounding(rng)
+    (values, blank) = (numeric(cells), blank_cells(cells))
+
+    for row in rng.choice(len(depth), 60, replace=False):
+        layer = layer_of(layers, depth[row])
+        result = window_average(depth, values, depth[row], layer, up, down, blank=blank)
+        check_window(result, loop_average(depth, cells, depth[row], layer, up, down))
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('up, down', WINDOWS)
+def test_prefix_window_matches_row_loops(seed, up, down):
+    rng = np.random.default_rng(seed)
+    (depth, cells, layers) = random_sounding(rng)
+    #through a Sounding, the way the app builds it, so the empty cells' mask comes from the sounding
+    index = cpt_index(Sounding('BH1', depth, {'value': cells}, np.ones(len(depth)), depth))
+
+    for row in rng.choice(len(depth), 60, replace=False):
+        layer = layer_of(layers, depth[row])
+        expected = loop_average(depth, cells, depth[row], layer, up, down)
+        result = index.window('value', depth[row], layer, up, down)
+        if expected is None:
+            assert result['gap']
+            assert result['count'] == 0
+            continue
+        assert result['count'] == len(expected)
+        if expected:
+            assert result['mean'] == pytest.approx(np.mean(expected), rel=1e-9, abs=1e-9)
+        if len(expected) > 1:
+            assert result['std'] == pytest.approx(np.std(expected, ddof=1), rel=1e-7, abs=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('up, down', WINDOWS)
+def test_rolling_matches_window(seed, up, down):
+    rng = np.random.default_rng(seed)
+    (depth, cells, layers) = random_sounding(rng)
+    index = PrefixIndex(depth, {'value': numeric(cells)}, {'value': blank_cells(cells)})
+    top, base = np.array([layer_of(layers, d) for d in depth]).T
+
+    rolling = index.rolling('value', top, base, up, down)
+    valid = rolling_segments(depth, top, base, up, down, blank=blank_cells(cells))['valid']
+    for row in range(len(depth)):
+        result = index.window('value', depth[row], (top[row], base[row]), up, down)
+        assert valid[row] == (not result['gap'])
+        assert rolling['count'][row] == (result['count'] if valid[row] else 0)
+        if valid[row] and result['count']:
+            assert rolling['mean'][row] == pytest.approx(result['mean'], rel=1e-9, abs=1e-9)
+        else:
+            assert np.isnan(rolling['mean'][row])
+
+
+def test_rolling_without_layers_matches_window():
+    (depth, cells, layers) = random_sounding(np.random.default_rng(7))
+    index = PrefixIndex(depth, {'value': numeric(cells)}, {'value': blank_cells(cells)})
+    rolling = index.rolling('value')
+    for row in range(len(depth)):
+        result = index.window('value', depth[row])
+        assert rolling['count'][row] == (0 if result['gap'] else result['count'])
+        if not result['gap'] and result['count']:
+            assert rolling['mean'][row] == pytest.approx(result['mean'], rel=1e-9, abs=1e-9)
+
+
+def test_depth_is_matched_on_its_key():
+    #depths that aren't exactly a whole centimetre as floats, e.g. 0.06000000000000001
+    depth = np.arange(1, 151) * 0.02
+    result = window_segments(depth, 1.2, (0.0, 3.0))
+    assert result['at'] == 59
+    assert window_segments(depth, '0.06')['at'] == 2
+    assert window_segments(depth, 1.21)['at'] is None
+
+    #a depth right at a data gap has nothing to average
+    gapped = np.concatenate((depth, [depth[-1] + 1.0]))
+    assert window_segments(gapped, depth[-1] + 1e-9)['gap']
+
+
+def test_robust_stats_match_numpy():
+    rng = np.random.default_rng(3)
+    values = rng.lognormal(1.0, 0.6, 300)
+    values[rng.random(300) < 0.1] = np.nan
+    starts = [0, 40, 100, 250, 299, 10]
+    stops = [30, 41, 290, 300, 299, 12]
+    robust = robust_stats(sorted_table(values, starts, stops), [10, 90], 0.1)
+    for (x, (start, stop)) in enumerate(zip(starts, stops)):
+        found = values[start:stop][~np.isnan(values[start:stop])]
+        if len(found) == 0:
+            assert np.isnan(robust['median'][x])
+            continue
+        assert robust['median'][x] == pytest.approx(np.median(found))
+        assert robust['p10'][x] == pytest.approx(np.percentile(found, 10))
+        assert robust['p90'][x] == pytest.approx(np.percentile(found, 90))
+        assert robust['trimmed_mean'][x] == pytest.approx(stats.trim_mean(found, 0.1))
+        assert robust['mad'][x] == pytest.approx(np.median(np.abs(found - np.median(found))))
+
+
+def test_blank_cells_are_not_counted_as_cut():
+    depth = np.round(np.arange(1, 151) * 0.02, 2)
+    cells = (10.0 + np.arange(150) * 0.1).astype(object)
+    layer = (1.0, 3.0)
+    #the rows of the window above the top of the layer
+    above = np.flatnonzero((depth >= 0.69) & (depth < 1.0))
+
+    missing = cells.copy()
+    missing[above] = np.nan
+    result = window_segments(depth, 1.2, layer, blank=blank_cells(missing))
+    assert result['cut_above'] == len(above)
+    check_window(window_average(depth, numeric(missing), 1.2, layer, blank=blank_cells(missing)), loop_average(depth, missing, 1.2, layer))
+
+    for empty in [None, ""]:
+        blanks = cells.copy()
+        blanks[above] = empty
+        result = window_segments(depth, 1.2, layer, blank=blank_cells(blanks))
+        #nothing counted as cut, so the window isn't shifted down into the layer
+        assert result['cut_above'] == 0
+        assert max(stop for (start, stop) in result['segments']) == int(np.searchsorted(depth, 1.7))
+        check_window(window_average(depth, numeric(blanks), 1.2, layer, blank=blank_cells(blanks)), loop_average(depth, blanks, 1.2, layer))
+
+
+def test_blank_cells():
+    np.testing.assert_array_equal(blank_cells(np.array([1.0, None, '', 'x', np.nan, 0], dtype=object)),
+                                  [False, True, True, False, False, False])
+    assert not blank_cells(np.array([1.0, np.nan])).any()
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from scipy import stats
+from common.designprofile import PROFILE_FIELDS, DesignProfile, as_profile, linear_fit, profile_batch, quantile, t_value, t_values
+
+
+def list_profile(param, depth, model, zvalue) -> list:
+    """
+    The numbers DesignProfile.profile gave with its list comprehensions and scipy.stats.linregress, before it was vectorised -
+    with z and t from quantile and t_value, which replaced its tables.
+    """
+    param = [float(p) for p in param]
+    depth = [d for (p, d) in zip(param, depth) if not np.isnan(p)]
+    param = np.array([p for p in param if not np.isnan(p)])
+    depth = np.array(depth)
+    n = len(param)
+    if n <= 4:
+        return None
+    (z, tvalue) = (quantile(zvalue)[0], t_value(n))
+    regression = stats.linregress(depth, param)
+    mean = param.mean()
+    std = param.std()
+    r2_cor = 1 - (1 - regression[2]**2) * (n - 1) / (n - 2)
+    std_err = np.sqrt(1 - r2_cor) * std
+
+    param_DEP = [p for (p, d) in zip(param, depth) if regression[0] * d + regression[1] - std_err * 1.96 <= p <= regression[0] * d + regression[1] + std_err * 1.96]
+    depth_DEP = [d for (p, d) in zip(param, depth) if regression[0] * d + regression[1] - std_err * 1.96 <= p <= regression[0] * d + regression[1] + std_err * 1.96]
+    DEP = stats.linregress(depth_DEP, param_DEP)
+    n_DEP = len(param_DEP)
+    std_DEP = np.array(param_DEP).std()
+    std_err_DEP = np.sqrt(1 - (1 - (1 - DEP[2]**2) * (n_DEP - 1) / (n_DEP - 2))) * std_DEP
+
+    param_IND = np.array([p for p in param if mean - std * 1.96 <= p <= mean + std * 1.96])
+    (mean_IND, std_IND) = (param_IND.mean(), param_IND.std())
+
+    if model == 'DEP' or (model == 'AUTO' and not std_IND < std_DEP):
+        be = [DEP[0] * depth[0] + DEP[1], DEP[0] * depth[-1] + DEP[1]]
+        mean_95 = tvalue * std * np.sqrt(1 / n + 3 * n / (n * n - 1))
+        return [be, [b - std_err_DEP * z for b in be], [b + std_err_DEP * z for b in be], [b + mean_95 for b in be], [b - mean_95 for b in be],
+                [std, std_DEP], [mean, np.mean(param_DEP)]]
+    mean_95 = tvalue * std / np.sqrt(n)
+    return [[mean_IND] * 2, [mean_IND - std_IND * z] * 2, [mean_IND + std_IND * z] * 2, [mean_IND + mean_95] * 2, [mean_IND - mean_95] * 2,
+            [std, std_IND], [mean, mean_IND]]
+
+
+def random_segments(rng, segments=12) -> list:
+    """(param, depth) of segments like a borehole's layers - trends, outliers, missing values and a few too short to profile."""
+    found = []
+    for seg in range(segments):
+        rows = int(rng.choice([3, 6, 40, 150]))
+        depth = np.sort(rng.uniform(seg * 5.0, seg * 5.0 + 5.0, rows))
+        param = rng.normal(10.0, 2.0, rows) + depth * rng.uniform(-1.0, 1.0)
+        param[rng.random(rows) < 0.05] = rng.normal(40.0, 5.0)
+        param[rng.random(rows) < 0.05] = np.nan
+        found.append((param, depth))
+    return found
+
+
+@pytest.mark.parametrize('model', ['DEP', 'IND', 'AUTO'])
+@pytest.mark.parametrize('zvalue', [75, 90, 95, 97.5])
+def test_profile_matches_list_version(model, zvalue):
+    for (param, depth) in random_segments(np.random.default_rng(int(zvalue))):
+        expected = list_profile(param, depth, model, zvalue)
+        result = DesignProfile(param, depth, 'test', model, zvalue, False, '').profile()
+        if expected is None:
+            assert result is None
+            continue
+        assert result['valid']
+        for (got, want) in zip(as_profile(result), expected):
+            np.testing.assert_allclose(got, want, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('model', ['DEP', 'IND', 'AUTO'])
+@pytest.mark.parametrize('zvalue', [75, 90, 95, 97.5])
+def test_profile_matches_batch(model, zvalue):
+    segments = random_segments(np.random.default_rng(int(zvalue * 10)))
+    offsets = np.concatenate(([0], np.cumsum([len(param) for (param, depth) in segments])))
+    batch = profile_batch(np.concatenate([param for (param, depth) in segments]), np.concatenate([depth for (param, depth) in segments]),
+                          offsets, model, zvalue)
+    assert len(batch) == len(segments)
+
+    for (row, (param, depth)) in zip(batch, segments):
+        profile = DesignProfile(param, depth, 'test', model, zvalue, False, '').profile()
+        if profile is None:
+            assert not row['valid']
+            continue
+        assert row['valid']
+        assert row['dependent'] == profile['dependent']
+        for field in PROFILE_FIELDS:
+            assert row[field] == pytest.approx(profile[field], rel=1e-9, abs=1e-9), field
+
+
+def test_unknown_model_is_not_valid():
+    (param, depth) = random_segments(np.random.default_rng(0))[2]
+    assert DesignProfile(param, depth, 'test', 'NONE', 95, False, '').profile() is None
+    assert not profile_batch(param, depth, [0, len(param)], 'NONE', 95)['valid'].any()
+
+
+def test_empty_strings_are_no_data():
+    rng = np.random.default_rng(1)
+    (param, depth) = (rng.normal(10.0, 2.0, 20), np.arange(20) * 0.1)
+    cells = param.astype(object)
+    cells[[2, 5]] = ''
+    cells[7] = None
+    keep = np.ones(20, dtype=bool)
+    keep[[2, 5, 7]] = False
+    result = DesignProfile(cells, depth, 'test', 'IND', 95, False, '').profile()
+    np.testing.assert_allclose(result['mean_before'], param[keep].mean())
+    assert DesignProfile(cells[:4], depth[:4], 'test', 'IND', 95, False, '').profile() is None
+
+
+def test_linear_fit_matches_linregress():
+    rng = np.random.default_rng(2)
+    x = rng.uniform(0.0, 10.0, 50)
+    y = 3.0 * x + rng.normal(0.0, 1.0, 50)
+    np.testing.assert_allclose(linear_fit(x, y), stats.linregress(x, y)[:3])
+    assert np.isnan(linear_fit(np.ones(5), y[:5])[0])
+
+
+def test_quantiles_and_t_values():
+    assert quantile(95) == (pytest.approx(1.6448536269514722), '95%', '5%')
+    assert quantile(97.5)[1:] == ('97.5%', '2.5%')
+    with pytest.raises(ValueError):
+        quantile(50)
+    for n in [2, 5, 30, 1000]:
+        assert t_value(n) == pytest.approx(stats.t.ppf(0.95, n - 1))
+    assert np.isnan(t_value(1))
+    np.testing.assert_allclose(t_values([5, 2, 5, 30]), [t_value(5), t_value(2), t_value(5), t_value(30)])
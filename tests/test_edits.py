@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from common.edits import PointEdits
+
+
+def points(rows=40) -> PointEdits:
+    rng = np.random.default_rng(rows)
+    values = rng.normal(50.0, 5.0, rows)
+    values[[1, rows // 2]] = np.nan
+    return PointEdits(values, np.round(np.arange(rows) * 0.02, 2), np.arange(100, 100 + rows))
+
+
+def check_stats(edits):
+    #the running sums against the included points worked out again
+    found = edits.x[~np.isnan(edits.x)]
+    result = edits.stats(robust=True, percentiles=[10, 90], trim=0.1)
+    assert result['count'] == len(found)
+    assert result['mean'] == pytest.approx(np.mean(found), rel=1e-12)
+    assert result['std'] == pytest.approx(np.std(found, ddof=1), rel=1e-9)
+    assert result['median'] == pytest.approx(np.median(found))
+    assert result['p90'] == pytest.approx(np.percentile(found, 90))
+
+
+def test_remove_undo_redo_keep_the_running_sums():
+    edits = points()
+    check_stats(edits)
+    assert edits.remove(0, 5) == 5
+    check_stats(edits)
+    #positions are of the points still plotted, so this is rows 15 to 24
+    assert edits.remove(10, 20) == 10
+    np.testing.assert_array_equal(edits.kept_rows, np.concatenate((np.arange(105, 115), np.arange(125, 140))))
+    assert len(edits) == 25
+    check_stats(edits)
+
+    assert edits.undo()
+    assert len(edits) == 35
+    check_stats(edits)
+    assert edits.undo()
+    assert not edits.undo()
+    np.testing.assert_array_equal(edits.kept_rows, np.arange(100, 140))
+    check_stats(edits)
+
+    assert edits.redo()
+    np.testing.assert_array_equal(edits.y, np.round(np.arange(5, 40) * 0.02, 2))
+    check_stats(edits)
+
+
+def test_new_removal_clears_redo():
+    edits = points()
+    edits.remove(0, 3)
+    edits.undo()
+    edits.remove(30, 40)
+    assert not edits.redo()
+    assert edits.remove(40, 50) == 0
+    assert edits.undo_stack and len(edits) == 30
+    check_stats(edits)
+
+
+def test_removing_everything():
+    edits = points(4)
+    edits.remove(0, 4)
+    result = edits.stats()
+    assert result['count'] == 0
+    assert np.isnan(result['mean']) and np.isnan(result['std'])
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from common.geolindex import BoreholeLayers, GeolIndex
+
+
+def geol(layers, units=None) -> pd.DataFrame:
+    """GEOL rows of one borehole from (top, base, legend) layers, in the order given."""
+    units = units or ['A'] * len(layers)
+    return pd.DataFrame({'PointID': 'BH1',
+                         'Depth': [top for (top, base, leg) in layers],
+                         'GEOL_BASE': [base for (top, base, leg) in layers],
+                         'GEOL_LEG': [leg for (top, base, leg) in layers],
+                         'GEOL_GEOL': units,
+                         'GEOL_GEO2': [''] * len(layers)})
+
+
+#out of order, with a gap between 4.0 and 4.5 and a last layer inside the one above it
+LAYERS = [(2.0, 4.0, '2-CLAY'), (0.0, 2.0, '1-SAND'), (4.5, 8.0, '3-GRAVEL'), (6.0, 7.0, '4-PEAT')]
+
+
+def test_layers_are_sorted_by_top():
+    layers = BoreholeLayers(geol(LAYERS))
+    assert layers.keys == [(0.0, 2.0), (2.0, 4.0), (4.5, 8.0), (6.0, 7.0)]
+    np.testing.assert_array_equal(layers.top, [0.0, 2.0, 4.5, 6.0])
+    np.testing.assert_array_equal(layers.base, [2.0, 4.0, 8.0, 7.0])
+    assert layers.unitised_layers['GEOL_GEOL'][(2.0, 4.0)] == ('A', 'CLAY')
+
+
+def test_find_at_layer_boundaries():
+    layers = BoreholeLayers(geol(LAYERS))
+    assert layers.find(0.0) == 0
+    assert layers.find(1.99) == 0
+    #a shared boundary belongs to the deeper layer
+    assert layers.find(2.0) == 1
+    assert layers.find('2.00') == 1
+    #the base of a layer is still in it when nothing starts there
+    assert layers.find(4.0) == 1
+    assert layers.find(4.5) == 2
+    assert layers.find(8.0) == 2
+
+
+def test_find_outside_layers():
+    layers = BoreholeLayers(geol(LAYERS))
+    assert layers.find(-0.01) is None
+    assert layers.find(4.2) is None
+    assert layers.find(8.01) is None
+
+
+def test_find_in_overlapping_layers():
+    layers = BoreholeLayers(geol(LAYERS))
+    assert layers.find(6.5) == 3
+    #below the inner layer's base, back in the one around it
+    assert layers.find(7.5) == 2
+
+
+def test_find_all_matches_find():
+    layers = BoreholeLayers(geol(LAYERS))
+    depths = np.array([-0.01, 0.0, 1.99, 2.0, 4.0, 4.2, 4.5, 6.5, 7.5, 8.0, 8.01, np.nan])
+    (top, base) = layers.find_all(depths)
+    for (depth, t, b) in zip(depths, top, base):
+        x = None if np.isnan(depth) else layers.find(depth)
+        if x is None:
+            assert np.isnan(t) and np.isnan(b)
+        else:
+            assert (t, b) == layers.keys[x]
+
+
+def test_unitised():
+    layers = BoreholeLayers(geol(LAYERS[:2], units=['A', '']))
+    assert not layers.unitised['GEOL_GEOL']
+    assert not layers.unitised['GEOL_GEO2']
+    assert BoreholeLayers(geol(LAYERS[:2])).unitised['GEOL_GEOL']
+    assert layers.descriptions['GEOL_GEOL'] == ['(0.0m -  2.0m) Soil Type: SAND', '(2.0m -  4.0m) Unit: A | Soil Type: CLAY']
+
+
+def test_index_skips_boreholes_without_geol():
+    index = GeolIndex({'BH1': geol(LAYERS), 'BH2': geol([])})
+    assert index.get('BH1').find(3.0) == 1
+    assert index.get('BH2') is None
+    assert index.get('BH3') is None
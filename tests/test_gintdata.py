@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+from common.gintdata import NO_DEPTH, add_true_depth, depth_key, depth_keys
+
+
+def old_true_depth(cpt_data) -> pd.Series:
+    """true_depth the way add_true_depth made it before the depth keys - round, sort, format to 2dp and parse back."""
+    cpt_data = cpt_data.reset_index(drop=True)
+    cpt_data['true_depth'] = (cpt_data['Depth'] + cpt_data['STCN_Depth']).round(2)
+    cpt_data.sort_values(by=['true_depth'], inplace=True)
+    cpt_data['true_depth'] = pd.to_numeric(cpt_data['true_depth'].map('{:,.2f}'.format))
+    return cpt_data['true_depth']
+
+
+def test_depth_keys():
+    np.testing.assert_array_equal(depth_keys([0.0, 0.06000000000000001, 1.005 - 1e-12, 12.345, np.nan]), [0, 6, 100, 1234, NO_DEPTH])
+    assert depth_key('2.00') == depth_key(2.0) == 200
+    assert depth_key(0.1 + 0.2) == depth_key(0.3)
+
+
+def test_true_depth_matches_old_round_trip():
+    rng = np.random.default_rng(0)
+    rows = 500
+    cpt_data = pd.DataFrame({'PointID': 'BH1',
+                             'Depth': rng.choice([0.0, 10.0, 25.5], rows),
+                             'STCN_Depth': np.cumsum(rng.choice([0.01, 0.02, 0.03], rows)) * rng.choice([1.0, 1.0000001], rows)})
+    new = add_true_depth(cpt_data.copy())
+    old = old_true_depth(cpt_data.copy())
+    np.testing.assert_array_equal(new['true_depth'].to_numpy(), old.to_numpy())
+    np.testing.assert_array_equal(new.index, old.index)
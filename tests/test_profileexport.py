@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+from common import profileexport
+from common.designprofile import PROFILE_FIELDS
+from common.geolindex import GeolIndex
+from common.profileexport import PROFILE_PARAMS, ProfileCache, export_profiles, fit_keys
+from common.sounding import Sounding
+
+LAYERS = [(0.0, 2.0, '1-SAND'), (2.0, 5.0, '2-CLAY'), (5.0, 9.0, '3-GRAVEL')]
+
+
+def project(rng, bhs=('BH1', 'BH2', 'BH3'), rows=400) -> tuple:
+    """(cpt_by_bh, geol_index) of a few boreholes at 2cm steps with every parameter, through the same layers."""
+    cpt_by_bh = {}
+    geol = {}
+    for bh in bhs:
+        depth = np.round(0.02 + np.arange(rows) * 0.02, 2)
+        columns = {col: rng.normal(5.0, 1.0, rows) + depth * rng.uniform(0.0, 1.0) for (col, label, heading) in PROFILE_PARAMS}
+        cpt_by_bh[bh] = Sounding(bh, depth, columns, np.ones(rows), depth)
+        geol[bh] = pd.DataFrame({'PointID': bh,
+                                 'Depth': [top for (top, base, leg) in LAYERS],
+                                 'GEOL_BASE': [base for (top, base, leg) in LAYERS],
+                                 'GEOL_LEG': [leg for (top, base, leg) in LAYERS],
+                                 'GEOL_GEOL': ['A'] * len(LAYERS),
+                                 'GEOL_GEO2': [''] * len(LAYERS)})
+    return (cpt_by_bh, GeolIndex(geol))
+
+
+def export(cpt_by_bh, geol_index, model, zvalue, cache=None) -> tuple:
+    return export_profiles(cpt_by_bh, geol_index, list(cpt_by_bh), 'GEOL_GEOL', model, zvalue, cache=cache, progress=lambda message: None)
+
+
+def assert_same_profiles(result, expected):
+    assert result[0] == expected[0]
+    for field in PROFILE_FIELDS:
+        np.testing.assert_allclose(result[1][field], expected[1][field], equal_nan=True)
+    for field in ['dependent', 'valid']:
+        np.testing.assert_array_equal(result[1][field], expected[1][field])
+
+
+@pytest.fixture
+def fitted(monkeypatch):
+    """The boreholes profile_borehole has fitted, in order."""
+    calls = []
+    profile_borehole = profileexport.profile_borehole
+    def counted(*args, **kwargs):
+        calls.append(args[0])
+        return profile_borehole(*args, **kwargs)
+    monkeypatch.setattr(profileexport, 'profile_borehole', counted)
+    return calls
+
+
+@pytest.mark.parametrize('model', ["DEP", "IND", "AUTO"])
+def test_cached_export_matches_fitted(fitted, model):
+    (cpt_by_bh, geol_index) = project(np.random.default_rng(1))
+    cache = ProfileCache()
+    export(cpt_by_bh, geol_index, model, 95, cache)
+    assert len(fitted) == 3
+    assert len(cache) == 3 * len(LAYERS) * len(PROFILE_PARAMS)
+
+    #another quantile is derived from the same fits
+    cached = {zvalue: export(cpt_by_bh, geol_index, model, zvalue, cache) for zvalue in [95, 75]}
+    assert len(fitted) == 3
+    for (zvalue, result) in cached.items():
+        assert_same_profiles(result, export(cpt_by_bh, geol_index, model, zvalue))
+
+
+def test_models_are_merged(fitted):
+    (cpt_by_bh, geol_index) = project(np.random.default_rng(2))
+    cache = ProfileCache()
+    export(cpt_by_bh, geol_index, "IND", 90, cache)
+    #the IND fits don't have DEP, so AUTO fits again
+    export(cpt_by_bh, geol_index, "AUTO", 90, cache)
+    assert len(fitted) == 6
+    #and then has both, DEP and IND are taken from the cache
+    export(cpt_by_bh, geol_index, "DEP", 90, cache)
+    cached = export(cpt_by_bh, geol_index, "IND", 90, cache)
+    assert len(fitted) == 6
+    assert_same_profiles(cached, export(cpt_by_bh, geol_index, "IND", 90))
+
+    #putting DEP only fits again keeps the IND ones that were there
+    bh = 'BH1'
+    (labels, keys) = fit_keys(bh, cpt_by_bh[bh], geol_index.get(bh), 'GEOL_GEOL')
+    dep = profileexport.profile_borehole(bh, cpt_by_bh[bh], geol_index.get(bh), 'GEOL_GEOL', "DEP", 90)[1].ravel()
+    cache.put(keys, dep)
+    assert cache.get(keys, ("DEP", "IND")) is not None
+
+
+def test_changed_data_is_fitted_again(fitted):
+    (cpt_by_bh, geol_index) = project(np.random.default_rng(3))
+    cache = ProfileCache()
+    export(cpt_by_bh, geol_index, "DEP", 95, cache)
+    (labels, before) = fit_keys('BH2', cpt_by_bh['BH2'], geol_index.get('BH2'), 'GEOL_GEOL')
+
+    edited = cpt_by_bh['BH2']['STCN_QC'].copy()
+    edited[10] += 1.0
+    cpt_by_bh['BH2'].add('STCN_QC', edited)
+    (labels, after) = fit_keys('BH2', cpt_by_bh['BH2'], geol_index.get('BH2'), 'GEOL_GEOL')
+    #only the first layer of qc has changed
+    assert [x for (x, (old, new)) in enumerate(zip(before, after)) if old != new] == [0]
+
+    assert_same_profiles(export(cpt_by_bh, geol_index, "DEP", 95, cache), export(cpt_by_bh, geol_index, "DEP", 95))
+    assert fitted[3:] == ['BH2', 'BH1', 'BH2', 'BH3']
+
+
+def test_least_recently_used_fits_are_dropped():
+    (cpt_by_bh, geol_index) = project(np.random.default_rng(4))
+    layer_fits = len(LAYERS) * len(PROFILE_PARAMS)
+    cache = ProfileCache(size=2 * layer_fits)
+    keys = {bh: fit_keys(bh, cpt_by_bh[bh], geol_index.get(bh), 'GEOL_GEOL')[1] for bh in cpt_by_bh}
+    fits = {bh: profileexport.profile_borehole(bh, cpt_by_bh[bh], geol_index.get(bh), 'GEOL_GEOL', "DEP", 95)[1].ravel() for bh in cpt_by_bh}
+
+    cache.put(keys['BH1'], fits['BH1'])
+    cache.put(keys['BH2'], fits['BH2'])
+    #BH1 is used again, so BH2 is the oldest when BH3 is added
+    assert cache.get(keys['BH1'], ("DEP",)) is not None
+    cache.put(keys['BH3'], fits['BH3'])
+    assert len(cache) == 2 * layer_fits
+    assert cache.get(keys['BH2'], ("DEP",)) is None
+    assert cache.get(keys['BH1'], ("DEP",)) is not None
+    assert cache.get(keys['BH3'], ("DEP",)) is not None
+
+    cache.clear()
+    assert len(cache) == 0
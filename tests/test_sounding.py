@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from common.project import cpt_index
+from common.sounding import Sounding
+
+
+def stcn_data() -> pd.DataFrame:
+    """STCN_DATA of one borehole as gINT gives it - two pushes out of order, object columns of floats, None and ""."""
+    return pd.DataFrame({'PointID': 'BH1',
+                         'ItemKey': ['2', '2', '1', '1'],
+                         'Depth': [1.0, 1.0, 0.0, 0.0],
+                         'STCN_Depth': [0.02, 0.04, 0.02, 0.04],
+                         'STCN_QC': np.array([1.23, None, 3.99999998, ''], dtype=object),
+                         'STCN_FS': np.array([0.01, 0.02, np.nan, 0.04], dtype=object)})
+
+
+def test_values_are_kept_as_gint_has_them():
+    sounding = Sounding.from_frame(stcn_data())
+    assert sounding.point_id == 'BH1'
+    np.testing.assert_array_equal(sounding.depth, [0.02, 0.04, 1.02, 1.04])
+    assert sounding['STCN_QC'].dtype == np.float64
+    #float64 by default, so values show and export without float32 noise
+    assert sounding['STCN_QC'][0] == 3.99999998
+    assert str(sounding['STCN_QC'][2]) == '1.23'
+    assert np.isnan(sounding['STCN_QC'][[1, 3]]).all()
+    assert Sounding.from_frame(stcn_data(), dtype=np.float32)['STCN_QC'].dtype == np.float32
+
+
+def test_empty_cells_are_masked():
+    sounding = Sounding.from_frame(stcn_data())
+    np.testing.assert_array_equal(sounding.blank['STCN_QC'], [False, True, False, True])
+    #nan isn't an empty cell, and parameters without any aren't given a mask
+    assert 'STCN_FS' not in sounding.blank
+    index = cpt_index(sounding)
+    np.testing.assert_array_equal(index.blank['STCN_QC'], sounding.blank['STCN_QC'])
+    assert index.values['STCN_QC'] is sounding['STCN_QC']
+
+
+def test_columns_read_later_line_up():
+    sounding = Sounding.from_frame(stcn_data())
+    extra = pd.DataFrame({'PointID': 'BH1',
+                          'ItemKey': ['1', '2', '2', '1'],
+                          'Depth': [0.0, 1.0, 1.0, 0.0],
+                          'STCN_U': np.array([10.0, None, 30.0, 40.0], dtype=object)})
+    #rows are matched on CPT_KEYS only, so a duplicate key takes the first row
+    sounding.add_columns(extra)
+    assert sounding.params == ['STCN_QC', 'STCN_FS', 'STCN_U']
+    np.testing.assert_array_equal(sounding['STCN_U'][:2], [10.0, 10.0])
+    assert np.isnan(sounding['STCN_U'][2:]).all()
+    np.testing.assert_array_equal(sounding.blank['STCN_U'], [False, False, True, True])
+    assert sounding.nbytes > 0
@@ -0,0 +1,97 @@
+import types
+import numpy as np
+import pandas as pd
+import pytest
+from common import tablecache
+from common.tablecache import TableCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    #last_used from a counter, so which project was used last doesn't depend on the timer resolution
+    ticks = iter(range(1, 1000))
+    monkeypatch.setattr(tablecache, 'time', types.SimpleNamespace(time=lambda: next(ticks)))
+
+
+def project(tmp_path, name, content=b'gint project'):
+    path = tmp_path / name
+    path.write_bytes(content)
+    return str(path)
+
+
+def stcn_data(rows=50):
+    rng = np.random.default_rng(rows)
+    return pd.DataFrame({'PointID': ['BH1'] * rows,
+                         'Depth': np.round(np.arange(rows) * 0.02, 2),
+                         'ItemKey': np.arange(rows, dtype=np.int64),
+                         'STCN_QC': rng.normal(5.0, 1.0, rows)})
+
+
+def test_round_trip_keeps_column_types(tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    path = project(tmp_path, 'a.gpj')
+    mixed = pd.DataFrame({'PointID': ['BH1', 'BH2', None, ''],
+                          'Depth': [0.0, 0.5, np.nan, 1.25],
+                          'Count': np.array([1, 2, 3, 4], dtype=np.int64),
+                          'STCN_QC': np.array([1.5, '', None, 7], dtype=object),
+                          'Flag': np.array([True, 'x', 2.5, None], dtype=object)})
+    cache.store(path, {'STCN_DATA': mixed})
+
+    loaded = cache.load(path, ['STCN_DATA'])['STCN_DATA']
+    assert list(loaded.columns) == list(mixed.columns)
+    assert loaded['Count'].dtype == np.int64
+    np.testing.assert_array_equal(loaded['Depth'], mixed['Depth'])
+    for col in ['PointID', 'STCN_QC', 'Flag']:
+        assert [(type(v), v) for v in loaded[col]] == [(type(v), v) for v in mixed[col]]
+
+
+def test_missing_table_is_a_miss(tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    path = project(tmp_path, 'a.gpj')
+    cache.store(path, {'POINT': pd.DataFrame({'PointID': ['BH1']})})
+    assert cache.load(path, ['POINT', 'GEOL']) is None
+    assert cache.load(project(tmp_path, 'b.gpj'), ['POINT']) is None
+
+
+def test_changed_project_is_reloaded(tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    path = project(tmp_path, 'a.gpj')
+    cache.store(path, {'STCN_DATA': stcn_data()})
+    assert cache.load(path, ['STCN_DATA']) is not None
+
+    project(tmp_path, 'a.gpj', b'gint project, edited')
+    assert cache.load(path, ['STCN_DATA']) is None
+    assert cache.project_key(path) not in cache._read_index()
+    assert not (tmp_path / 'cache' / cache.project_key(path)).exists()
+
+
+def test_least_recently_used_project_is_evicted(tmp_path, clock):
+    cache = TableCache(str(tmp_path / 'cache'))
+    paths = [project(tmp_path, f'{name}.gpj') for name in 'abc']
+    cache.store(paths[0], {'STCN_DATA': stcn_data()})
+    size = cache._read_index()[cache.project_key(paths[0])]['size']
+    cache.max_size = 2 * size + size // 2
+
+    cache.store(paths[1], {'STCN_DATA': stcn_data()})
+    #a is used again, so b is the oldest when c is added
+    assert cache.load(paths[0], ['STCN_DATA']) is not None
+    cache.store(paths[2], {'STCN_DATA': stcn_data()})
+
+    index = cache._read_index()
+    assert cache.project_key(paths[0]) in index
+    assert cache.project_key(paths[1]) not in index
+    assert cache.project_key(paths[2]) in index
+    assert cache.load(paths[1], ['STCN_DATA']) is None
+    pd.testing.assert_frame_equal(cache.load(paths[2], ['STCN_DATA'])['STCN_DATA'], stcn_data())
+
+
+def test_clear(tmp_path):
+    cache = TableCache(str(tmp_path / 'cache'))
+    paths = [project(tmp_path, f'{name}.gpj') for name in 'ab']
+    for path in paths:
+        cache.store(path, {'STCN_DATA': stcn_data()})
+    cache.clear(paths[0])
+    assert cache.load(paths[0], ['STCN_DATA']) is None
+    assert cache.load(paths[1], ['STCN_DATA']) is not None
+    cache.clear()
+    assert cache._read_index() == {}